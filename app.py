@@ -1,6 +1,6 @@
 #version 1.0.0
 
-from flask import Flask, render_template, request, redirect, url_for, session, g, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, session, g, jsonify, send_from_directory, Response, stream_with_context
 import sqlite3
 import os
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -9,6 +9,11 @@ from functools import wraps
 from dotenv import load_dotenv
 import math
 import re
+import json
+import time
+import hashlib
+import tempfile
+import click
 
 # Load environment variables first
 load_dotenv()
@@ -19,24 +24,46 @@ if SKIP_DB_INIT:
     print("SKIP_DB_INIT environment variable set. Database initialization will be skipped.")
 
 # Only import database modules after checking SKIP_DB_INIT
-from models import User, Post, Comment, BlogLike, CommentLike, CVDownload, VisitorStat, Notification, CVVerification
+from models import User, Post, Comment, BlogLike, CommentLike, CVDownload, VisitorStat, Notification, CVVerification, SiteCounter
 from db_init import get_db_connection, init_db, create_admin_user1, db
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail, Message
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from sqlalchemy.sql import text
+from sqlalchemy import inspect
 from flask_migrate import Migrate
+from write_buffer import WriteBuffer
+from mail_queue import MailQueue
+from bot_filter import BotFilter
+from notification_stream import NotificationHub
+from cache import SingleFlight
+from page_cache import PageCache, MemoryBackend, DiskBackend
+from static_files import StaticFiles
+import assets
+import images
+from markupsafe import Markup, escape
+from concurrent.futures import ThreadPoolExecutor
 
 # Make sure we import the models for migrations
 from models_for_migrate import User as UserModel, Post as PostModel, Comment as CommentModel
 from models_for_migrate import BlogLike as BlogLikeModel, CommentLike as CommentLikeModel
 from models_for_migrate import CVDownload as CVDownloadModel, VisitorStat as VisitorStatModel
 from models_for_migrate import Notification as NotificationModel, CVVerification as CVVerificationModel
+from models_for_migrate import PostMonth as PostMonthModel, SiteCounter as SiteCounterModel
+from models_for_migrate import KnownVisitor as KnownVisitorModel
+from models_for_migrate import VisitorDailyStat as VisitorDailyStatModel, VisitorDailyPage as VisitorDailyPageModel
+from models_for_migrate import VisitorDailySketch as VisitorDailySketchModel
 
 # Initialize app first, before any database operations
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_for_blog')
 
+# Answer scanner probes (WordPress paths, .php, dotfiles) with a bare 404 before Flask handles them
+app.config['BOT_FILTER_ENABLED'] = os.environ.get('BOT_FILTER_ENABLED', 'True').lower() == 'true'
+bot_filter = BotFilter(app.wsgi_app)
+if app.config['BOT_FILTER_ENABLED']:
+    app.wsgi_app = bot_filter
+
 # Configure app before database initialization
 database_url = os.environ.get('DATABASE_URL')
 if database_url and database_url.startswith('postgres'):
@@ -53,6 +80,9 @@ else:
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Number of posts shown per page on the blog listing
+app.config['POSTS_PER_PAGE'] = int(os.environ.get('POSTS_PER_PAGE', 10))
+
 # Initialize SQLAlchemy with app
 db.init_app(app)
 
@@ -70,7 +100,16 @@ def health_check():
             "timestamp": datetime.now().isoformat(),
             "app_name": "Portfolio Application",
             "env": os.environ.get('FLASK_ENV', 'production'),
-            "skip_db_init": SKIP_DB_INIT
+            "skip_db_init": SKIP_DB_INIT,
+            "visit_buffer": visit_buffer.stats(),
+            "notification_outbox": notification_outbox.stats(),
+            "cv_downloads": cv_download_buffer.stats(),
+            "mail_queue": mail_queue.stats(),
+            "notification_stream": notification_hub.stats(),
+            "analytics_summary": analytics_summary_flight.stats(),
+            "page_cache": page_cache.stats(),
+            "static_files": static_server.stats(),
+            "user_cache": User.cache.stats()
         }), 200
     except Exception as e:
         print(f"Health check error: {e}")
@@ -205,9 +244,325 @@ app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER') or os.
 # Initialize mail
 mail = Mail(app)
 
+# Configure the background mail queue. To test offline, run `python smtp_sink.py` and set
+# MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=False
+app.config['MAIL_QUEUE_ENABLED'] = os.environ.get('MAIL_QUEUE_ENABLED', 'True').lower() == 'true'
+app.config['MAIL_QUEUE_SIZE'] = int(os.environ.get('MAIL_QUEUE_SIZE', 500))
+app.config['MAIL_BATCH_SIZE'] = int(os.environ.get('MAIL_BATCH_SIZE', 20))
+app.config['MAIL_MAX_ATTEMPTS'] = int(os.environ.get('MAIL_MAX_ATTEMPTS', 5))
+app.config['MAIL_RETRY_BACKOFF'] = float(os.environ.get('MAIL_RETRY_BACKOFF', 2.0))
+app.config['MAIL_RETRY_MAX_BACKOFF'] = float(os.environ.get('MAIL_RETRY_MAX_BACKOFF', 300.0))
+# Seconds the SMTP connection is kept open with nothing to send
+app.config['MAIL_IDLE_TIMEOUT'] = float(os.environ.get('MAIL_IDLE_TIMEOUT', 60.0))
+
+def report_mail_status(results):
+    """Record the delivery results of verification emails (keyed by verification id)"""
+    CVVerification.update_email_statuses(results)
+
+# Outgoing mail is queued here and sent by a background thread over one SMTP
+# connection that stays open between messages
+mail_queue = MailQueue(
+    'mail',
+    mail.connect,
+    report_mail_status,
+    context_func=app.app_context,
+    max_size=app.config['MAIL_QUEUE_SIZE'],
+    batch_size=app.config['MAIL_BATCH_SIZE'],
+    max_attempts=app.config['MAIL_MAX_ATTEMPTS'],
+    backoff=app.config['MAIL_RETRY_BACKOFF'],
+    max_backoff=app.config['MAIL_RETRY_MAX_BACKOFF'],
+    idle_timeout=app.config['MAIL_IDLE_TIMEOUT']
+)
+
+def send_verification_email(verification_id, message):
+    """
+    Queue a verification email for the mail worker.
+    Returns False only if it had to be sent inline (queue disabled or full) and that failed.
+    """
+    if app.config['MAIL_QUEUE_ENABLED'] and mail_queue.put(message, key=verification_id):
+        return True
+    try:
+        mail.send(message)
+    except Exception as e:
+        print(f"Error sending email: {e}")
+        CVVerification.update_email_statuses([(verification_id, CVVerification.EMAIL_FAILED, 1, str(e))])
+        return False
+    CVVerification.update_email_statuses([(verification_id, CVVerification.EMAIL_SENT, 1, None)])
+    return True
+
 # Initialize the serializer for token generation
 serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'])
 
+# Configure visitor tracking write-behind buffer
+app.config['VISIT_BUFFER_ENABLED'] = os.environ.get('VISIT_BUFFER_ENABLED', 'True').lower() == 'true'
+app.config['VISIT_BUFFER_SIZE'] = int(os.environ.get('VISIT_BUFFER_SIZE', 10000))
+app.config['VISIT_BATCH_SIZE'] = int(os.environ.get('VISIT_BATCH_SIZE', 100))
+app.config['VISIT_FLUSH_INTERVAL'] = float(os.environ.get('VISIT_FLUSH_INTERVAL', 2.0))
+
+def flush_visits(visits):
+    """Write a batch of buffered visits (view milestones are notified in the same transaction). Returns False if it failed"""
+    with app.app_context():
+        return VisitorStat.record_visits(visits)[1] is not None
+
+# Visits are queued here and written in batches by a background thread
+visit_buffer = WriteBuffer(
+    'visits',
+    flush_visits,
+    max_size=app.config['VISIT_BUFFER_SIZE'],
+    batch_size=app.config['VISIT_BATCH_SIZE'],
+    flush_interval=app.config['VISIT_FLUSH_INTERVAL']
+)
+
+# Configure the admin notification outbox
+app.config['NOTIFICATION_OUTBOX_ENABLED'] = os.environ.get('NOTIFICATION_OUTBOX_ENABLED', 'True').lower() == 'true'
+app.config['NOTIFICATION_OUTBOX_SIZE'] = int(os.environ.get('NOTIFICATION_OUTBOX_SIZE', 1000))
+app.config['NOTIFICATION_BATCH_SIZE'] = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 50))
+app.config['NOTIFICATION_FLUSH_INTERVAL'] = float(os.environ.get('NOTIFICATION_FLUSH_INTERVAL', 1.0))
+
+def flush_notifications(notifications):
+    """Write a batch of queued admin notifications. Returns False if it failed"""
+    with app.app_context():
+        return Notification.write_batch(notifications) is not None
+
+# Notifications that are not part of a model transaction are queued here,
+# so requests don't wait on the insert, and written in batches by a background thread
+notification_outbox = WriteBuffer(
+    'notifications',
+    flush_notifications,
+    max_size=app.config['NOTIFICATION_OUTBOX_SIZE'],
+    batch_size=app.config['NOTIFICATION_BATCH_SIZE'],
+    flush_interval=app.config['NOTIFICATION_FLUSH_INTERVAL']
+)
+
+# Configure the CV download write-behind buffer
+app.config['CV_DOWNLOAD_BUFFER_ENABLED'] = os.environ.get('CV_DOWNLOAD_BUFFER_ENABLED', 'True').lower() == 'true'
+app.config['CV_DOWNLOAD_BUFFER_SIZE'] = int(os.environ.get('CV_DOWNLOAD_BUFFER_SIZE', 1000))
+app.config['CV_DOWNLOAD_BATCH_SIZE'] = int(os.environ.get('CV_DOWNLOAD_BATCH_SIZE', 50))
+app.config['CV_DOWNLOAD_FLUSH_INTERVAL'] = float(os.environ.get('CV_DOWNLOAD_FLUSH_INTERVAL', 1.0))
+
+def flush_cv_downloads(downloads):
+    """Write a batch of queued CV downloads together with their admin notifications. Returns False if it failed"""
+    with app.app_context():
+        return CVDownload.record_downloads(downloads) == len(downloads)
+
+# CV downloads are queued here, so the file is sent without waiting on the
+# download row and notification, and written in batches by a background thread
+cv_download_buffer = WriteBuffer(
+    'cv_downloads',
+    flush_cv_downloads,
+    max_size=app.config['CV_DOWNLOAD_BUFFER_SIZE'],
+    batch_size=app.config['CV_DOWNLOAD_BATCH_SIZE'],
+    flush_interval=app.config['CV_DOWNLOAD_FLUSH_INTERVAL']
+)
+
+def record_cv_download(reason, username, is_anonymous, user_id=None, ip_address=None, email=None, is_verified=False):
+    """Record a CV download and its admin notification off the request path"""
+    download = {
+        "reason": reason,
+        "user_id": user_id,
+        "username": username,
+        "is_anonymous": is_anonymous,
+        "ip_address": ip_address,
+        "email": email,
+        "is_verified": is_verified,
+        "created_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    if app.config['CV_DOWNLOAD_BUFFER_ENABLED'] and cv_download_buffer.put(download):
+        return
+    # Buffer disabled or full: write it now
+    flush_cv_downloads([download])
+
+# Configure the admin notification stream (Server-Sent Events)
+app.config['NOTIFICATION_STREAM_POLL_INTERVAL'] = float(os.environ.get('NOTIFICATION_STREAM_POLL_INTERVAL', 2.0))
+app.config['NOTIFICATION_STREAM_BACKLOG'] = int(os.environ.get('NOTIFICATION_STREAM_BACKLOG', 100))
+app.config['NOTIFICATION_STREAM_KEEPALIVE'] = float(os.environ.get('NOTIFICATION_STREAM_KEEPALIVE', 15.0))
+# Streams end after this many seconds and the browser reconnects with Last-Event-ID
+app.config['NOTIFICATION_STREAM_MAX_AGE'] = float(os.environ.get('NOTIFICATION_STREAM_MAX_AGE', 300.0))
+# Keep below the gunicorn thread count so streams can't starve normal requests
+app.config['NOTIFICATION_STREAM_MAX_CLIENTS'] = int(os.environ.get('NOTIFICATION_STREAM_MAX_CLIENTS', 16))
+
+def fetch_notifications(after_id):
+    """Load notifications newer than after_id for the stream hub"""
+    with app.app_context():
+        return Notification.get_since(after_id, limit=app.config['NOTIFICATION_STREAM_BACKLOG'])
+
+# Open streams in this worker share one poller instead of each querying the database
+notification_hub = NotificationHub(
+    'notification-stream',
+    fetch_notifications,
+    poll_interval=app.config['NOTIFICATION_STREAM_POLL_INTERVAL'],
+    backlog=app.config['NOTIFICATION_STREAM_BACKLOG']
+)
+
+# Configure the analytics summary
+app.config['ANALYTICS_SUMMARY_WORKERS'] = int(os.environ.get('ANALYTICS_SUMMARY_WORKERS', 4))
+
+# The summary's independent aggregate queries run side by side, each in its own
+# app context (and so its own session and pooled connection)
+analytics_summary_executor = ThreadPoolExecutor(
+    max_workers=app.config['ANALYTICS_SUMMARY_WORKERS'],
+    thread_name_prefix='analytics-summary'
+)
+# Concurrent summary requests in a worker share one computation
+analytics_summary_flight = SingleFlight()
+
+def run_in_app_context(func, *args):
+    """Run func in a fresh app context, for work handed to a thread pool"""
+    with app.app_context():
+        return func(*args)
+
+# Configure the rendered page cache (home and blog pages)
+app.config['PAGE_CACHE_ENABLED'] = os.environ.get('PAGE_CACHE_ENABLED', 'True').lower() == 'true'
+# 'memory' (per worker LRU) or 'disk' (shared by the workers on a host)
+app.config['PAGE_CACHE_BACKEND'] = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+app.config['PAGE_CACHE_DIR'] = os.environ.get('PAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'portfolio_page_cache'))
+app.config['PAGE_CACHE_SIZE'] = int(os.environ.get('PAGE_CACHE_SIZE', 500))
+app.config['PAGE_CACHE_TTL'] = int(os.environ.get('PAGE_CACHE_TTL', 300))
+
+def page_tag_versions(tags):
+    """
+    Current page cache tag versions, kept in site_counters so every worker sees invalidations.
+    Read on the request's session, so it is called from inside a request.
+    """
+    versions = SiteCounter.get_many([SiteCounter.PAGE_TAG_PREFIX + tag for tag in tags], conn=db.session)
+    return {tag: versions[SiteCounter.PAGE_TAG_PREFIX + tag] for tag in tags}
+
+page_cache_backend = None
+if app.config['PAGE_CACHE_BACKEND'] == 'disk':
+    try:
+        page_cache_backend = DiskBackend(app.config['PAGE_CACHE_DIR'], max_entries=app.config['PAGE_CACHE_SIZE'])
+    except OSError as e:
+        print(f"Error opening page cache directory, using the memory backend: {e}")
+if page_cache_backend is None:
+    page_cache_backend = MemoryBackend(max_size=app.config['PAGE_CACHE_SIZE'])
+page_cache = PageCache(page_cache_backend, page_tag_versions, ttl=app.config['PAGE_CACHE_TTL'])
+
+# Configure fingerprinted static assets (built with `python assets.py` or `flask build-assets`)
+app.config['ASSET_FINGERPRINTS_ENABLED'] = os.environ.get('ASSET_FINGERPRINTS_ENABLED', 'True').lower() == 'true'
+app.config['ASSET_MANIFEST'] = assets.load_manifest(app.static_folder) if app.config['ASSET_FINGERPRINTS_ENABLED'] else {}
+# Hashed files never change, so browsers can keep them for a year without revalidating
+app.config['ASSET_CACHE_CONTROL'] = 'public, max-age=31536000, immutable'
+# Load each bundle's source files separately instead of the minified bundle, for debugging
+app.config['ASSET_BUNDLES_DEBUG'] = os.environ.get('ASSET_BUNDLES_DEBUG', str(app.debug)).lower() == 'true'
+# Resized AVIF/WebP variants of static/images (built with `python images.py` or `flask build-assets`)
+app.config['RESPONSIVE_IMAGES_ENABLED'] = os.environ.get('RESPONSIVE_IMAGES_ENABLED', 'True').lower() == 'true'
+app.config['IMAGE_MANIFEST'] = images.load_manifest(app.static_folder) if app.config['RESPONSIVE_IMAGES_ENABLED'] else {}
+
+# Serve static/ from a WSGI layer in front of Flask: small files and their gzip/brotli
+# variants from memory, large files through the server's sendfile, with Range support
+app.config['STATIC_SERVER_ENABLED'] = os.environ.get('STATIC_SERVER_ENABLED', 'True').lower() == 'true'
+app.config['STATIC_MEMORY_MAX_FILE_SIZE'] = int(os.environ.get('STATIC_MEMORY_MAX_FILE_SIZE', 256 * 1024))
+app.config['STATIC_MEMORY_LIMIT'] = int(os.environ.get('STATIC_MEMORY_LIMIT', 64 * 1024 * 1024))
+# Files that are not fingerprinted are revalidated with their ETag on every use
+app.config['STATIC_CACHE_CONTROL'] = os.environ.get('STATIC_CACHE_CONTROL', 'no-cache')
+static_server = StaticFiles(
+    app.wsgi_app,
+    app.static_folder,
+    prefix=app.static_url_path + '/',
+    cache_control=app.config['STATIC_CACHE_CONTROL'],
+    immutable_prefix=assets.DIST_DIR + '/',
+    immutable_cache_control=app.config['ASSET_CACHE_CONTROL'],
+    memory_max_file_size=app.config['STATIC_MEMORY_MAX_FILE_SIZE'],
+    memory_limit=app.config['STATIC_MEMORY_LIMIT']
+)
+if app.config['STATIC_SERVER_ENABLED']:
+    app.wsgi_app = static_server
+
+# The CV, relative to static/. Behind nginx (or Apache/lighttpd) set CV_SENDFILE_MODE to
+# x-accel-redirect (with an internal location at CV_ACCEL_REDIRECT_PREFIX mapped to static/)
+# or x-sendfile, and the front-end server sends the file itself
+app.config['CV_FILE'] = 'pdf/Mohamad_Arouni_CV.pdf'
+app.config['CV_SENDFILE_MODE'] = os.environ.get('CV_SENDFILE_MODE', '').lower()
+app.config['CV_ACCEL_REDIRECT_PREFIX'] = os.environ.get('CV_ACCEL_REDIRECT_PREFIX', '/protected/')
+
+def send_cv():
+    """
+    The CV file response: handed to the front-end server in a sendfile mode, otherwise
+    from the static file layer's cached entry (ETag, Range, memory or sendfile)
+    """
+    filename = app.config['CV_FILE']
+    mode = app.config['CV_SENDFILE_MODE']
+    if mode == 'x-accel-redirect':
+        response = Response(mimetype='application/pdf')
+        response.headers['X-Accel-Redirect'] = app.config['CV_ACCEL_REDIRECT_PREFIX'].rstrip('/') + '/' + filename
+        return response
+    if mode == 'x-sendfile':
+        response = Response(mimetype='application/pdf')
+        response.headers['X-Sendfile'] = os.path.join(app.static_folder, *filename.split('/'))
+        return response
+
+    served = static_server.respond(request.environ, filename)
+    if served is None:
+        # Missing file: let Flask produce its usual 404
+        return send_from_directory(app.static_folder, filename)
+    status, headers, body = served
+    # direct_passthrough hands a file_wrapper body straight to the server
+    return Response(body, status=status, headers=headers, direct_passthrough=True)
+
+# Part of every content ETag, so a deploy (new templates or JSON shape) changes them all
+app.config['CONTENT_VERSION'] = (os.environ.get('RAILWAY_GIT_COMMIT_SHA') or os.environ.get('APP_VERSION')
+                                 or str(int(os.path.getmtime(__file__))))
+
+def content_etag(*parts):
+    """Strong ETag from the deploy's content version and whatever identifies the representation"""
+    key = ':'.join(str(part) for part in (app.config['CONTENT_VERSION'],) + parts)
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+def validated_response(response, etag):
+    """Attach the ETag and make clients revalidate before reusing the response"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache' if session.get('user_id') else 'no-cache'
+    return response
+
+def serve_cached_page(tags, render):
+    """
+    Serve a page from the rendered page cache, or render it and store it.
+    Entries are keyed on path, query string and auth state (anonymous, or user and role)
+    and expire when one of their tags is invalidated by a write (see Post.page_tags).
+    Responses carry an ETag built from the same tag versions, so a browser revalidating
+    an unchanged page gets a 304 after one counter lookup, before the cache or the view runs.
+    Views set g.page_cache_skip for responses that must not be stored (e.g. error pages).
+    """
+    # Flashed messages are rendered once, so those pages are never cached or revalidated
+    if request.method != 'GET' or '_flashes' in session:
+        return render()
+    
+    if session.get('user_id'):
+        auth_state = f"user:{session['user_id']}:{session.get('role')}"
+    else:
+        auth_state = 'anonymous'
+    key = f"{request.path}?{request.query_string.decode('utf-8', 'replace')}|{auth_state}"
+    
+    try:
+        # Read the versions before rendering, so a write during the render expires the entry
+        versions = page_cache.versions(tags)
+    except Exception as e:
+        print(f"Error reading page cache: {e}")
+        return render()
+    
+    # The tag versions are the page's content version: answer 304 before any rendering
+    etag = content_etag(key, sorted(versions.items()))
+    if request.if_none_match.contains(etag):
+        return validated_response(Response(status=304), etag)
+    
+    entry = page_cache.get(key, versions) if app.config['PAGE_CACHE_ENABLED'] else None
+    if entry is not None:
+        response = Response(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+        response.headers['X-Page-Cache'] = 'HIT'
+        return validated_response(response, etag)
+    
+    response = app.make_response(render())
+    if response.status_code != 200 or response.direct_passthrough or g.get('page_cache_skip'):
+        return response
+    if app.config['PAGE_CACHE_ENABLED']:
+        page_cache.set(key, {
+            'body': response.get_data(as_text=True),
+            'status': response.status_code,
+            'mimetype': response.mimetype
+        }, versions)
+        response.headers['X-Page-Cache'] = 'MISS'
+    return validated_response(response, etag)
+
 # Custom template filter for newlines to <br>
 @app.template_filter('nl2br')
 def nl2br(s):
@@ -243,50 +598,21 @@ def load_logged_in_user():
     user_id = session.get('user_id')
     if user_id:
         try:
-            g.user = User.get_by_id(user_id)
+            # Slim record from the per-worker cache; no query when it is hot
+            g.user = User.get_cached(user_id, session.get('user_version'))
+            if g.user and session.get('user_version') != g.user['version']:
+                # Role or profile changed since login, refresh the copies kept in the session
+                session['user_version'] = g.user['version']
+                session['username'] = g.user['username']
+                session['role'] = g.user['role']
         except Exception as e:
             print(f"Error loading user: {e}")
             # Don't let user loading failures break the site
             session.pop('user_id', None)
     
-    # Define patterns to exclude from visitor tracking (bot traffic, WordPress scans, etc.)
-    excluded_patterns = [
-        '/wp-admin/',
-        '/wordpress/',
-        '/wp-includes/',
-        '/wp-content/',
-        '/wp/',
-        '/cms/',
-        '/shop/',
-        '/site/',
-        '/test/',
-        '/2019/',
-        '/wp1/',
-        '/blog/wp-',
-        '.php',
-        '/xmlrpc.php',
-        '/robots.txt',
-        '/sitemap.xml',
-        '/favicon.ico',
-        '/apple-touch-icon',
-        '/.well-known/',
-        '/static/',
-        '/api/',
-        '/admin',
-        '/post/anonymous_like/',
-        '/post/like/',
-        '/post/unlike/', 
-        '/post/comment/'
-    ]
-    
-    # Check if this is a legitimate page visit (not bot traffic or admin actions)
-    should_track = True
-    
-    # Don't track if it matches excluded patterns
-    for pattern in excluded_patterns:
-        if pattern in request.path:
-            should_track = False
-            break
+    # Check if this is a legitimate page visit (not bot traffic, assets or API calls)
+    page_category, _ = VisitorStat.classify_page(request.path)
+    should_track = page_category not in VisitorStat.UNTRACKED_CATEGORIES
     
     # Don't track if it's a POST request (form submissions, API calls)
     if request.method != 'GET':
@@ -299,66 +625,62 @@ def load_logged_in_user():
     # Only track legitimate page views
     if should_track:
         try:
-            # Get IP address and clean it
+            # Get IP address; it is cleaned up when the batch is written
             ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+            visit = {
+                'ip_address': ip,
+                'page_visited': request.path,
+                'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            }
             
-            # Clean up IP - many proxies add multiple IPs separated by commas
-            if ip and ',' in ip:
-                # Take the first IP (usually the client's real IP)
-                ip = ip.split(',')[0].strip()
-            
-            # Truncate if too long for database
-            if ip and len(ip) > 45:  # VARCHAR(45) in database
-                ip = ip[:45]
-            
-            visitor_id = VisitorStat.record_visit(ip, request.path)
-            
-            # Check for view count milestones, but handle errors gracefully
-            if visitor_id:
-                try:
-                    conn = get_db_connection()
-                    # Use a separate transaction
-                    result = conn.execute(text('SELECT COUNT(*) as count FROM visitor_stats')).fetchone()
-                    
-                    # Access count safely - try both mapping and index access
-                    total_views = 0
-                    try:
-                        if hasattr(result, "_mapping"):
-                            total_views = result._mapping["count"]
-                        else:
-                            # Try accessing by position - count is the first column
-                            total_views = result[0]
-                    except Exception as count_error:
-                        print(f"Error accessing count: {count_error}")
-                    
-                    # Check for various milestones
-                    should_notify = False
-                    if total_views in [1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]:
-                        should_notify = True
-                    elif total_views > 10000 and total_views % 10000 == 0:
-                        should_notify = True
-                    elif total_views > 5000 and total_views % 5000 == 0:
-                        should_notify = True
-                    elif total_views > 1000 and total_views % 1000 == 0:
-                        should_notify = True
-                    elif total_views > 500 and total_views % 500 == 0:
-                        should_notify = True
-                    elif total_views > 100 and total_views % 100 == 0:
-                        should_notify = True
-                    
-                    if should_notify:
-                        try:
-                            Notification.create_view_milestone_notification(total_views)
-                        except Exception as notif_error:
-                            print(f"Error creating milestone notification: {notif_error}")
-                
-                except Exception as view_error:
-                    print(f"Error checking view count: {view_error}")
-                    # Don't let visitor tracking break the site
+            if app.config['VISIT_BUFFER_ENABLED']:
+                # Queue the visit; it is written off the request path
+                visit_buffer.put(visit)
+            else:
+                flush_visits([visit])
         except Exception as ip_error:
             print(f"Error tracking visit: {ip_error}")
             # Don't let visitor tracking break the site
 
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """Make url_for('static', filename=...) point at the content-hashed copy when there is one"""
+    if endpoint == 'static' and app.config['ASSET_MANIFEST']:
+        hashed = app.config['ASSET_MANIFEST'].get(values.get('filename'))
+        if hashed:
+            values['filename'] = hashed
+
+@app.after_request
+def cache_fingerprinted_assets(response):
+    """Serve content-hashed static files as immutable (when Flask serves static/ itself)"""
+    if request.endpoint == 'static' and response.status_code in (200, 206, 304):
+        filename = (request.view_args or {}).get('filename', '')
+        if filename.startswith(assets.DIST_DIR + '/'):
+            response.headers['Cache-Control'] = app.config['ASSET_CACHE_CONTROL']
+    return response
+
+def bundle_urls(name, kind):
+    """URLs of a bundle: the minified bundle once built, otherwise its source files in order"""
+    key = assets.bundle_path(name, kind)
+    if key in app.config['ASSET_MANIFEST'] and not app.config['ASSET_BUNDLES_DEBUG']:
+        return [url_for('static', filename=key)]
+    return [url_for('static', filename=path) for path in assets.BUNDLES[kind][name]]
+
+@app.template_global()
+def css_bundle(name):
+    """Stylesheet tag(s) for a CSS bundle from assets.BUNDLES"""
+    return Markup('\n'.join(f'<link rel="stylesheet" href="{escape(url)}">' for url in bundle_urls(name, 'css')))
+
+@app.template_global()
+def js_bundle(name):
+    """Script tag(s) for a JS bundle from assets.BUNDLES"""
+    return Markup('\n'.join(f'<script src="{escape(url)}"></script>' for url in bundle_urls(name, 'js')))
+
+@app.template_global()
+def image_variants(path):
+    """The built variants of an image under static/, or None to use the original (see images.py)"""
+    return app.config['IMAGE_MANIFEST'].get(path)
+
 @app.context_processor
 def inject_current_year():
     return {"current_year": datetime.now().year}
@@ -373,14 +695,18 @@ def home():
                               error_message="Database is currently unavailable. Please try again later.",
                               error_title="Database Error")
     
+    return serve_cached_page(Post.page_tags(), render_home)
+
+def render_home():
     try:
         # Get the latest blog posts
         latest_posts = Post.get_latest(2)
         
-        # Get comments and like count for each post
+        # Get comments and like counts for all posts in one batch
+        engagement = Post.load_engagement([post['id'] for post in latest_posts],
+                                          g.user['id'] if g.user else None)
         for post in latest_posts:
-            post['comments'] = Comment.get_for_post(post['id'])
-            post['like_count'] = BlogLike.get_count_for_post(post['id'])
+            post.update(engagement[post['id']])
         
         # Check for download parameter to trigger CV download via JS
         download_cv = request.args.get('download') == 'cv'
@@ -392,6 +718,7 @@ def home():
                               error_message=error_message)
     except Exception as e:
         print(f"Error rendering home page: {e}")
+        g.page_cache_skip = True
         # Return a simplified error response
         return render_template('error.html',
                              error_message="Error loading the home page. Please try again later.",
@@ -406,50 +733,48 @@ def view_blog():
                               error_message="Database is currently unavailable. Please try again later.",
                               error_title="Database Error")
     
+    # If a specific post is highlighted in the query parameters, increment its view count
+    # (here, so it is counted when the page comes from the cache too)
+    highlighted_post_id = request.args.get('post_id')
+    if highlighted_post_id and highlighted_post_id.isdigit():
+        try:
+            Post.increment_view_count(int(highlighted_post_id))
+        except Exception as view_error:
+            print(f"Error incrementing view count: {view_error}")
+    
+    return serve_cached_page(Post.page_tags(), render_blog)
+
+def render_blog():
     try:
         # Get month filter from query params
         filter_month = request.args.get('month', None)
         
-        # Get posts with filter
-        posts = Post.get_all(filter_month)
+        # Get one page of posts using the (created_at, id) cursors from the query params
+        posts, older_cursor, newer_cursor = Post.get_page(
+            filter_month,
+            before=request.args.get('before'),
+            after=request.args.get('after'),
+            page_size=app.config['POSTS_PER_PAGE']
+        )
         
         # Get available months for filter dropdown
         available_months = Post.get_available_months()
         
-        # For each post, get its comments and like count
+        # Load comments, like counts and liked-by-user flags for all posts in one batch
+        engagement = Post.load_engagement([post['id'] for post in posts],
+                                          g.user['id'] if g.user else None)
         for post in posts:
-            try:
-                post['comments'] = Comment.get_for_post(post['id'])
-                post['like_count'] = BlogLike.get_count_for_post(post['id'])
-                
-                # Check if current user has liked this post
-                if g.user:
-                    post['user_has_liked'] = BlogLike.has_user_liked(post['id'], g.user['id'])
-                else:
-                    post['user_has_liked'] = False
-            except Exception as post_error:
-                print(f"Error processing post {post.get('id', 'unknown')}: {post_error}")
-                # Set defaults for missing data
-                if 'comments' not in post:
-                    post['comments'] = []
-                if 'like_count' not in post:
-                    post['like_count'] = 0
-                post['user_has_liked'] = False
-        
-        # If a specific post is highlighted in the query parameters, increment its view count
-        highlighted_post_id = request.args.get('post_id')
-        if highlighted_post_id and highlighted_post_id.isdigit():
-            try:
-                Post.increment_view_count(int(highlighted_post_id))
-            except Exception as view_error:
-                print(f"Error incrementing view count: {view_error}")
+            post.update(engagement[post['id']])
         
         return render_template('view_blog.html', posts=posts, 
                                available_months=available_months,
-                               filter_month=filter_month)
+                               filter_month=filter_month,
+                               older_cursor=older_cursor,
+                               newer_cursor=newer_cursor)
     
     except Exception as e:
         print(f"Error rendering blog page: {e}")
+        g.page_cache_skip = True
         # Return a simplified error response
         return render_template('error.html',
                                error_message="Error loading the blog page. Please try again later.",
@@ -457,23 +782,20 @@ def view_blog():
 
 @app.route('/blog/post/<int:post_id>')
 def view_post(post_id):
+    # Increment view count (a no-op for a missing post, which redirects below)
+    Post.increment_view_count(post_id)
+    
+    return serve_cached_page(Post.page_tags(post_id), lambda: render_post(post_id))
+
+def render_post(post_id):
     # Get the post
     post = Post.get_by_id(post_id)
     if not post:
         return redirect(url_for('view_blog'))
     
-    # Increment view count
-    Post.increment_view_count(post_id)
-    
-    # Get comments and like count
-    post['comments'] = Comment.get_for_post(post['id'])
-    post['like_count'] = BlogLike.get_count_for_post(post['id'])
-    
-    # Check if current user has liked this post
-    if g.user:
-        post['user_has_liked'] = BlogLike.has_user_liked(post['id'], g.user['id'])
-    else:
-        post['user_has_liked'] = False
+    # Get comments, like count and liked-by-user flag
+    engagement = Post.load_engagement([post['id']], g.user['id'] if g.user else None)
+    post.update(engagement[post['id']])
     
     return render_template('view_blog.html', posts=[post], single_post=True)
 
@@ -495,6 +817,7 @@ def login():
             session['user_id'] = user['id']
             session['username'] = user['username']
             session['role'] = user['role']
+            session['user_version'] = user['version']
             
             # Debug prints after session update
             print("\nSession after update:")
@@ -571,6 +894,7 @@ def register():
             session['user_id'] = user['id']
             session['username'] = user['username']
             session['role'] = user['role']
+            session['user_version'] = user['version']
             
             # Return success response or redirect
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -675,12 +999,6 @@ def delete_comment(comment_id):
 def like_post(post_id):
     """Add a like to a blog post"""
     try:
-        # Check if the post exists
-        post = Post.get_by_id(post_id)
-        if not post:
-            print(f"Post not found: {post_id}")
-            return jsonify({'success': False, 'error': 'Post not found'}), 404
-        
         # Get the user info if logged in
         user_id = session.get('user_id')
         username = session.get('username')
@@ -688,28 +1006,21 @@ def like_post(post_id):
         
         print(f"Adding like to post {post_id} by user {username} (ID: {user_id}, anonymous: {is_anonymous})")
         
-        # Store like
-        like_id = BlogLike.create(post_id, user_id, username, is_anonymous)
+        # Store like - also checks the post exists and returns the new like count
+        result = BlogLike.create(post_id, user_id, username, is_anonymous)
+        if result is None:
+            print(f"Post not found: {post_id}")
+            return jsonify({'success': False, 'error': 'Post not found'}), 404
         
         # If like was successful, return success
-        if like_id:
-            try:
-                # Create notification
-                notif_id = Notification.create_post_like_notification(username, is_anonymous, post['title'])
-                print(f"Created notification ID: {notif_id}")
-            except Exception as e:
-                print(f"Error creating notification: {e}")
-                # Continue even if notification fails
-            
-            # Get updated like count - use a fresh connection to ensure we see the committed changes
-            like_count = BlogLike.get_count_for_post(post_id)
-            print(f"Updated like count: {like_count}")
-            return jsonify({'success': True, 'like_count': like_count})
+        # (the admin notification is written in the same transaction as the like)
+        if result['like_id']:
+            print(f"Updated like count: {result['like_count']}")
+            return jsonify({'success': True, 'like_count': result['like_count']})
         else:
-            # User may have already liked this post - still return current count
-            like_count = BlogLike.get_count_for_post(post_id)
+            # User has already liked this post - still return current count
             print("Like not created - user may have already liked this post")
-            return jsonify({'success': False, 'error': 'Already liked', 'like_count': like_count}), 400
+            return jsonify({'success': False, 'error': 'Already liked', 'like_count': result['like_count']}), 400
     except Exception as e:
         print(f"Error in like_post: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -718,12 +1029,6 @@ def like_post(post_id):
 def anonymous_like_post(post_id):
     """Add an anonymous like to a blog post"""
     try:
-        # Check if the post exists
-        post = Post.get_by_id(post_id)
-        if not post:
-            print(f"Post not found: {post_id}")
-            return jsonify({'success': False, 'error': 'Post not found'}), 404
-        
         # Get the data from the request
         data = request.get_json()
         username = data.get('username', 'Anonymous')
@@ -734,28 +1039,21 @@ def anonymous_like_post(post_id):
         
         print(f"Adding anonymous like to post {post_id} by {username} (ID: {anonymous_id}, IP: {ip})")
         
-        # Try to store the anonymous like
-        like_id = BlogLike.create_anonymous(post_id, username, anonymous_id, ip)
+        # Try to store the anonymous like - also checks the post exists and returns the new like count
+        result = BlogLike.create_anonymous(post_id, username, anonymous_id, ip)
+        if result is None:
+            print(f"Post not found: {post_id}")
+            return jsonify({'success': False, 'error': 'Post not found'}), 404
         
         # If like was successful, return success
-        if like_id:
-            try:
-                # Create notification
-                notif_id = Notification.create_post_like_notification(username, True, post['title'])
-                print(f"Created notification ID: {notif_id}")
-            except Exception as e:
-                print(f"Error creating notification: {e}")
-                # Continue even if notification fails
-            
-            # Get updated like count - use a fresh connection to ensure we see the committed changes
-            like_count = BlogLike.get_count_for_post(post_id)
-            print(f"Updated like count: {like_count}")
-            return jsonify({'success': True, 'like_count': like_count})
+        # (the admin notification is written in the same transaction as the like)
+        if result['like_id']:
+            print(f"Updated like count: {result['like_count']}")
+            return jsonify({'success': True, 'like_count': result['like_count']})
         else:
-            # Error creating like or already liked - still return current count
-            like_count = BlogLike.get_count_for_post(post_id)
+            # Already liked from this anonymous ID or IP - still return current count
             print("Anonymous like not created - user may have already liked this post")
-            return jsonify({'success': False, 'error': 'Already liked', 'like_count': like_count}), 400
+            return jsonify({'success': False, 'error': 'Already liked', 'like_count': result['like_count']}), 400
     except Exception as e:
         print(f"Error in anonymous_like_post: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -766,58 +1064,37 @@ def unlike_post(post_id):
     """Remove a user's like from a blog post"""
     user_id = session.get('user_id')
     
-    # Try to delete the like
-    success = BlogLike.delete(post_id=post_id, user_id=user_id)
-    
-    # Always return the current like count, regardless of success
-    like_count = BlogLike.get_count_for_post(post_id)
+    # Try to delete the like - returns the new like count if one was removed
+    like_count = BlogLike.delete(post_id=post_id, user_id=user_id)
     
-    if success:
+    if like_count is not None:
         return jsonify({'success': True, 'like_count': like_count})
     else:
+        like_count = BlogLike.get_count_for_post(post_id)
         return jsonify({'success': False, 'error': 'Like not found', 'like_count': like_count}), 404
 
 @app.route('/comment/like/<int:comment_id>', methods=['POST'])
 @login_required
 def like_comment(comment_id):
     """Add a like to a comment"""
-    user_id = session.get('user_id')
-    username = session.get('username')
-    
-    # Add the like
-    like_id = CommentLike.create(comment_id, user_id)
-    
-    # Always get the current like count
-    like_count = CommentLike.get_count_for_comment(comment_id)
-    
-    if like_id:
-        # Get the post info for notification
-        conn = get_db_connection()
-        comment_info = conn.execute(text('''
-            SELECT c.post_id, p.title 
-            FROM comments c
-            JOIN posts p ON c.post_id = p.id
-            WHERE c.id = :comment_id
-        '''), {"comment_id": comment_id}).fetchone()
+    try:
+        user_id = session.get('user_id')
+        username = session.get('username')
         
-        title = "Unknown Post"
-        if comment_info:
-            try:
-                # Try different ways to access title
-                if hasattr(comment_info, "_mapping"):
-                    title = comment_info._mapping["title"]
-                else:
-                    # Second column should be title
-                    title = comment_info[1]
-            except Exception as e:
-                print(f"Error getting post title: {e}")
-            
-            # Create notification
-            Notification.create_comment_like_notification(username, False, title)
+        # Add the like and its admin notification - returns the current like count in one go
+        result = CommentLike.create(comment_id, user_id, username)
+        if result is None:
+            print(f"Comment not found: {comment_id}")
+            return jsonify({'success': False, 'error': 'Comment not found'}), 404
         
-        return jsonify({'success': True, 'like_count': like_count})
-    else:
-        return jsonify({'success': False, 'error': 'Already liked or comment not found', 'like_count': like_count}), 400
+        if result['like_id']:
+            return jsonify({'success': True, 'like_count': result['like_count']})
+        else:
+            # User has already liked this comment - still return current count
+            return jsonify({'success': False, 'error': 'Already liked', 'like_count': result['like_count']}), 400
+    except Exception as e:
+        print(f"Error in like_comment: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/comment/unlike/<int:comment_id>', methods=['POST'])
 @login_required
@@ -825,15 +1102,13 @@ def unlike_comment(comment_id):
     """Remove a like from a comment"""
     user_id = session.get('user_id')
     
-    # Delete the like
-    success = CommentLike.delete(comment_id, user_id)
-    
-    # Always get the current like count
-    like_count = CommentLike.get_count_for_comment(comment_id)
+    # Delete the like - returns the new like count if one was removed
+    like_count = CommentLike.delete(comment_id, user_id)
     
-    if success:
+    if like_count is not None:
         return jsonify({'success': True, 'like_count': like_count})
     else:
+        like_count = CommentLike.get_count_for_comment(comment_id)
         return jsonify({'success': False, 'error': 'Like not found', 'like_count': like_count}), 404
 
 @app.route('/comment/author-like/<int:comment_id>', methods=['POST'])
@@ -885,14 +1160,11 @@ def download_cv():
     is_anonymous = not user_id
     ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
     
-    # Record the download
-    CVDownload.create(reason, user_id, ip)
-    
-    # Create notification
-    Notification.create_cv_download_notification(username, is_anonymous, reason)
+    # Queue the download and its notification; they are written off the request path
+    record_cv_download(reason, username, is_anonymous, user_id=user_id, ip_address=ip)
     
     # Serve the CV file
-    return send_from_directory('static/pdf', 'Mohamad_Arouni_CV.pdf')
+    return send_cv()
 
 # Admin dashboard routes
 @app.route('/analytics')
@@ -952,7 +1224,9 @@ def visitor_analytics():
                               error_title="Database Error")
                               
     try:
-        analytics = VisitorStat.get_analytics()
+        # Admins can ask for an exact unique visitor count (?exact=1) for audits
+        exact = request.args.get('exact') == '1' and session.get('role') == 'admin'
+        analytics = VisitorStat.get_analytics(exact=exact)
         
         # If there was an error and analytics is None, provide a default empty structure
         if analytics is None:
@@ -1140,54 +1414,186 @@ def user_analytics():
                               error_message="Error loading user analytics. Please try again later.",
                               error_title="Analytics Error")
 
+def notifications_etag(*parts):
+    """
+    ETag for a notifications response: the notifications version plus whatever
+    selects the representation (cursors, limit, viewer role)
+    """
+    return content_etag('notifications', Notification.get_version(), session.get('role'), *parts)
+
+def conditional_json(etag, build):
+    """Answer 304 if the client already has this ETag, otherwise build the JSON body"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Revalidate every time; the ETag check is a single primary-key lookup
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/api/notifications')
 def get_notifications():
-    """Get recent notifications for the dashboard"""
+    """
+    Get notifications for the dashboard, newest first.
+    ?since_id= returns only newer ones, ?before_id= pages back; both use the id as a cursor.
+    """
     try:
-        notifications = Notification.get_recent(10)
-        return jsonify(notifications)
+        since_id = request.args.get('since_id', type=int)
+        before_id = request.args.get('before_id', type=int)
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        
+        # Each item carries a relative_time ("5 minutes ago"), so the list also changes every minute
+        etag = notifications_etag('list', since_id, before_id, limit, int(time.time() // 60))
+        return conditional_json(etag, lambda: Notification.get_page(since_id, before_id, limit))
     except Exception as e:
         print(f"Error getting notifications: {e}")
         return jsonify([])
 
+@app.route('/api/notifications/unread-count')
+@login_required
+@admin_required
+def get_unread_notifications_count():
+    """Get the number of unread notifications"""
+    etag = notifications_etag('unread')
+    return conditional_json(etag, lambda: {'unread': Notification.get_unread_count()})
+
+@app.route('/api/notifications/mark-read', methods=['POST'])
+@login_required
+@admin_required
+def mark_notifications_read():
+    """
+    Mark notifications as read in one update.
+    Body: {"ids": [...]} or {"up_to_id": n}; with neither, everything is marked read.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    up_to_id = data.get('up_to_id')
+    try:
+        if ids is not None:
+            ids = [int(notification_id) for notification_id in ids]
+        if up_to_id is not None:
+            up_to_id = int(up_to_id)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'ids must be a list of integers and up_to_id an integer'}), 400
+    
+    updated = Notification.mark_all_read(ids=ids, up_to_id=up_to_id)
+    if updated is None:
+        return jsonify({'success': False, 'error': 'Could not mark notifications as read'}), 500
+    return jsonify({'success': True, 'updated': updated, 'unread': Notification.get_unread_count()})
+
+@app.route('/api/notifications/stream')
+@login_required
+@admin_required
+def stream_notifications():
+    """Push new notifications to the dashboard as Server-Sent Events"""
+    if notification_hub.subscribers >= app.config['NOTIFICATION_STREAM_MAX_CLIENTS']:
+        return jsonify({'error': 'Too many open notification streams'}), 503, {'Retry-After': '30'}
+    
+    # Resume after the last event the browser saw, or start from the newest notification
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+    if last_id is None:
+        missed = []
+        last_id = Notification.get_latest_id()
+    else:
+        missed = Notification.get_since(last_id, limit=app.config['NOTIFICATION_STREAM_BACKLOG'])
+    
+    # Don't hold a pooled connection for the life of the stream
+    db.session.remove()
+    
+    def format_event(notification):
+        return f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(notification)}\n\n"
+    
+    def generate(last_id):
+        notification_hub.subscribe()
+        try:
+            yield "retry: 5000\n\n"
+            for notification in missed:
+                yield format_event(notification)
+                last_id = notification['id']
+            
+            ends_at = time.monotonic() + app.config['NOTIFICATION_STREAM_MAX_AGE']
+            while time.monotonic() < ends_at:
+                notifications = notification_hub.wait(last_id, app.config['NOTIFICATION_STREAM_KEEPALIVE'])
+                if not notifications:
+                    # Comment line keeps proxies from timing out and detects closed connections
+                    yield ": keepalive\n\n"
+                    continue
+                for notification in notifications:
+                    yield format_event(notification)
+                    last_id = notification['id']
+        finally:
+            notification_hub.unsubscribe()
+    
+    return Response(stream_with_context(generate(last_id)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/analytics/bot-filter')
+@login_required
+@admin_required
+def get_bot_filter_stats():
+    """Get the bot filter's blocked request counters for this worker"""
+    return jsonify(dict(bot_filter.stats(), enabled=app.config['BOT_FILTER_ENABLED']))
+
+def compute_analytics_summary():
+    """
+    Compute the dashboard summary from four small aggregate queries run
+    concurrently, instead of the full visitor and CV analytics
+    """
+    futures = {
+        name: analytics_summary_executor.submit(run_in_app_context, func)
+        for name, func in (
+            ('total_views', VisitorStat.get_total_views),
+            ('unique_visitors', VisitorStat.count_unique_visitors),
+            ('total_likes', BlogLike.get_total_likes_count),
+            ('total_downloads', CVDownload.get_total_count),
+        )
+    }
+    summary = {name: future.result() for name, future in futures.items()}
+    
+    # Calculate engagement rate based on downloads and likes
+    total_interactions = summary['total_likes'] + summary['total_downloads']
+    total_views = summary['total_views']
+    engagement_rate = (total_interactions / total_views * 100) if total_views > 0 else 0
+    summary['engagement_rate'] = round(engagement_rate, 1)
+    return summary
+
+# Counters that change whenever a number in the summary can: recorded visits
+# (views and unique visitors), the post listings (likes) and CV downloads
+ANALYTICS_SUMMARY_VERSIONS = [
+    SiteCounter.TOTAL_VIEWS,
+    SiteCounter.PAGE_TAG_PREFIX + Post.PAGE_TAG_POSTS,
+    SiteCounter.CV_DOWNLOADS_VERSION
+]
+
+def build_analytics_summary():
+    """The dashboard summary as seen by the current viewer"""
+    # Copy: the shared result is filtered per viewer below
+    summary = dict(analytics_summary_flight.do('summary', compute_analytics_summary))
+    
+    # Filter sensitive data for non-admin users
+    if not session.get('user_id') or session.get('role') != 'admin':
+        if summary['unique_visitors'] > 10:
+            summary['unique_visitors'] = f"{summary['unique_visitors']}+"
+        # Limit some metrics for privacy
+        summary['total_downloads'] = min(summary['total_downloads'], 50)
+    
+    return summary
+
 @app.route('/api/analytics/summary')
 def get_analytics_summary():
     """Get summary analytics data for dashboard"""
     try:
-        # Get basic stats that are safe to show
-        visitor_analytics = VisitorStat.get_analytics()
-        cv_analytics = CVDownload.get_analytics()
-        
-        # Calculate some derived metrics
-        total_views = visitor_analytics.get('total_views', 0) if visitor_analytics else 0
-        unique_visitors = visitor_analytics.get('unique_visitors', 0) if visitor_analytics else 0
-        
-        # Get total likes
-        total_likes = BlogLike.get_total_likes_count()
-        
-        # Calculate engagement rate based on downloads and likes
-        total_interactions = total_likes
-        if cv_analytics:
-            total_interactions += cv_analytics.get('total', 0)
-        
-        engagement_rate = (total_interactions / total_views * 100) if total_views > 0 else 0
-        
-        summary = {
-            'total_views': total_views,
-            'unique_visitors': unique_visitors,
-            'total_likes': total_likes,
-            'total_downloads': cv_analytics.get('total', 0) if cv_analytics else 0,
-            'engagement_rate': round(engagement_rate, 1)
-        }
-        
-        # Filter sensitive data for non-admin users
-        if not session.get('user_id') or session.get('role') != 'admin':
-            if summary['unique_visitors'] > 10:
-                summary['unique_visitors'] = f"{summary['unique_visitors']}+"
-            # Limit some metrics for privacy
-            summary['total_downloads'] = min(summary['total_downloads'], 50)
-        
-        return jsonify(summary)
+        # A 304 costs one site_counters lookup; the summary queries only run when something changed
+        versions = SiteCounter.get_many(ANALYTICS_SUMMARY_VERSIONS)
+        etag = content_etag('summary', session.get('role'), sorted(versions.items()))
+        return conditional_json(etag, build_analytics_summary)
     except Exception as e:
         print(f"Error getting analytics summary: {e}")
         return jsonify({
@@ -1200,8 +1606,12 @@ def get_analytics_summary():
 
 @app.route('/notifications-history')
 def notifications_history():
-    """Full notifications history page"""
-    notifications = Notification.get_recent(50)  # Get more notifications for the history page
+    """Full notifications history page, paged back with ?before_id="""
+    page_size = 50
+    before_id = request.args.get('before_id', type=int)
+    notifications = Notification.get_page(before_id=before_id, limit=page_size)
+    # Cursor for the next (older) page, if this one was full
+    older_id = notifications[-1]['id'] if len(notifications) == page_size else None
     
     # Filter sensitive information for non-admins
     if not session.get('user_id') or session.get('role') != 'admin':
@@ -1212,7 +1622,7 @@ def notifications_history():
                 notification['message'] = notification['message'].replace(notification['username'], 'Anonymous User')
                 notification['username'] = 'Anonymous'
     
-    return render_template('notifications_history.html', notifications=notifications)
+    return render_template('notifications_history.html', notifications=notifications, older_id=older_id, before_id=before_id)
 
 @app.route('/send-verification-link', methods=['POST'])
 def send_verification_link():
@@ -1271,16 +1681,13 @@ def send_verification_link():
         )
     )
     
-    try:
-        # Send email
-        mail.send(msg)
-        
+    # Sent by the background mail worker; delivery is recorded on the verification
+    if send_verification_email(verification_id, msg):
         return jsonify({
             'success': True,
             'message': 'Verification link sent. Please check your email to continue.'
         })
-    except Exception as e:
-        print(f"Error sending email: {e}")
+    else:
         return jsonify({
             'success': False,
             'message': 'Unable to send verification email. Please check your email address or try again later.'
@@ -1313,11 +1720,9 @@ def verify_download():
         # Mark token as used
         CVVerification.mark_as_used(token)
         
-        # Record the verified download
-        CVDownload.create(reason, None, request.remote_addr, email=email, is_verified=True)
-        
-        # Create notification
-        Notification.create_cv_download_notification('Verified User', True, reason)
+        # Record the verified download and notify, off the request path
+        record_cv_download(reason, 'Verified User', True, ip_address=request.remote_addr,
+                           email=email, is_verified=True)
         
         # Redirect to home with download parameter
         return redirect(url_for('home', download='cv'))
@@ -1346,5 +1751,61 @@ def get_app_base_url():
     # Final fallback - shouldn't reach here if configured correctly
     return "http://localhost:5000"
 
+# Maintenance commands (run with `flask <command>`)
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Apply pending migrations at deploy time, leaving databases that migrations do not manage alone"""
+    tables = inspect(db.engine).get_table_names()
+    if 'users' in tables and 'alembic_version' not in tables:
+        print("Database has tables but no migration revision (built outside migrations); skipping migrations. "
+              "Run `flask db stamp <revision>` for the schema it has, then `flask db upgrade`.")
+        return
+    from flask_migrate import upgrade
+    upgrade()
+
+@app.cli.command('classify-visits')
+def classify_visits_command():
+    """Classify visitor_stats rows recorded before page categories existed"""
+    updated = VisitorStat.backfill_categories()
+    print(f"Classified {updated} visitor_stats rows")
+
+@app.cli.command('reconcile-counts')
+def reconcile_counts_command():
+    """Recompute the stored like/comment counters on posts and comments"""
+    result = Post.reconcile_engagement_counts()
+    if result is None:
+        print("Reconciling engagement counters failed")
+    else:
+        print(f"Recomputed engagement counters for {result[0]} posts and {result[1]} comments")
+
+@app.cli.command('rollup-visits')
+@click.option('--rebuild', is_flag=True, help='Clear the daily rollups and recompute them from visitor_stats')
+def rollup_visits_command(rebuild):
+    """Roll finished days of visitor_stats up into the daily analytics tables"""
+    rolled = VisitorStat.rollup_days(rebuild=rebuild)
+    print(f"Rolled up {rolled} days of visitor stats")
+    if rebuild:
+        sketched = VisitorStat.rebuild_sketches()
+        print(f"Rebuilt unique visitor sketches for {sketched} days")
+
+@app.cli.command('count-unique-visitors')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='First day (inclusive)')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day (inclusive)')
+def count_unique_visitors_command(start, end):
+    """Compare the sketch estimate of unique visitors with an exact count"""
+    start_day = start.date() if start else None
+    end_day = end.date() if end else None
+    estimate = VisitorStat.count_unique_visitors(start_day, end_day)
+    exact = VisitorStat.count_unique_visitors(start_day, end_day, exact=True)
+    print(f"Unique visitors: {estimate} estimated, {exact} exact")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Write content-hashed copies of the static assets and responsive image variants to static/dist"""
+    manifest = assets.build(app.static_folder)
+    print(f"Fingerprinted {len(manifest)} static assets into static/{assets.DIST_DIR}")
+    image_manifest = images.build(app.static_folder)
+    print(f"Built variants of {len(image_manifest)} images into static/{assets.DIST_DIR}")
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Content-hashed copies of the static assets, for long-lived browser caching.
+
+`python assets.py` (or `flask build-assets`) copies every CSS, JS, image and
+font file under static/ to static/dist/ with a hash of its content in the
+name, e.g. css/style.css -> dist/css/style.3f2a9c1d8e4b.css, and writes
+static/dist/manifest.json mapping the original paths to the hashed ones.
+A changed file gets a new name, so the hashed files can be cached forever.
+
+It also concatenates and minifies the per-page bundles in BUNDLES into
+dist/bundles/, listed in the manifest as bundles/<name>.css and bundles/<name>.js.
+Every text file written gets .gz and .br copies for the static file server.
+"""
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+
+import rcssmin
+import rjsmin
+
+from static_files import write_precompressed
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+FINGERPRINT_EXTENSIONS = {
+    '.css', '.js',
+    '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.ttf'
+}
+# Not fingerprinted: the build output itself, and the CV, which has its own download route
+SKIP_DIRS = {DIST_DIR, 'pdf'}
+
+HASH_LENGTH = 12
+
+# Per-page bundles, in the order the files were loaded. Page CSS bundles repeat
+# the base stylesheets so each page needs exactly one stylesheet request.
+BASE_CSS = [
+    'css/main.css', 'css/hero.css', 'css/about.css', 'css/skills.css', 'css/timeline.css',
+    'css/projects.css', 'css/contact.css', 'css/flip-cards.css', 'css/admin.css'
+]
+BASE_JS = ['js/main.js', 'js/toggle_darkmode.js']
+BUNDLES = {
+    'css': {
+        'base': BASE_CSS,
+        'home': BASE_CSS + ['css/skills.css', 'css/blog.css', 'css/hero.css'],
+        'blog': BASE_CSS + ['css/blog.css'],
+        'form': BASE_CSS + ['css/form.css'],
+        'login': BASE_CSS + ['css/login.css'],
+        'notifications': BASE_CSS + ['css/notification.css'],
+    },
+    'js': {
+        'base': BASE_JS,
+        'home': BASE_JS + ['js/download_cv.js', 'js/particles-config.js', 'js/readMore.js'],
+        'blog': BASE_JS + ['js/blog.js'],
+        'add_entry': BASE_JS + ['js/features/preview_blog.js', 'js/blog-clear.js'],
+        'edit_post': BASE_JS + ['js/features/preview_blog.js'],
+    },
+}
+BUNDLE_DIR = 'bundles'
+
+CSS_URL_PATTERN = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+def hashed_name(path, content):
+    """css/style.css -> css/style.<hash>.css"""
+    root, ext = posixpath.splitext(path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+def find_assets(static_dir=STATIC_DIR):
+    """Paths (relative to static_dir, with forward slashes) of the files to fingerprint"""
+    assets = []
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            if os.path.splitext(name)[1].lower() in FINGERPRINT_EXTENSIONS:
+                path = os.path.relpath(os.path.join(root, name), static_dir)
+                assets.append(path.replace(os.sep, '/'))
+    return sorted(assets)
+
+def bundle_path(name, kind):
+    """Manifest key of a bundle, e.g. bundles/home.css"""
+    return f"{BUNDLE_DIR}/{name}.{kind}"
+
+def rewrite_css_urls(css_path, css, manifest, output_dir=None):
+    """
+    Point relative url() references in a stylesheet at the hashed files.
+    output_dir is where the rewritten stylesheet will live (relative to static/);
+    by default next to its hashed copy under dist/.
+    """
+    css_dir = posixpath.dirname(css_path)
+    if output_dir is None:
+        output_dir = posixpath.join(DIST_DIR, css_dir)
+
+    def replace(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return match.group(0)
+        path, sep, suffix = url.partition('?')
+        if not sep:
+            path, sep, suffix = url.partition('#')
+        if path.startswith('/static/'):
+            target = path[len('/static/'):]
+        elif path.startswith('/'):
+            return match.group(0)
+        else:
+            target = posixpath.normpath(posixpath.join(css_dir, path))
+        if target not in manifest:
+            return match.group(0)
+        # Relative to where the rewritten stylesheet itself will live
+        new_url = posixpath.relpath(manifest[target], output_dir)
+        return f"url({quote}{new_url}{sep}{suffix}{quote})"
+
+    return CSS_URL_PATTERN.sub(replace, css)
+
+def build_bundle(static_dir, kind, files, manifest):
+    """Concatenate and minify one bundle's source files"""
+    output_dir = posixpath.join(DIST_DIR, BUNDLE_DIR)
+    parts = []
+    for path in files:
+        with open(os.path.join(static_dir, *path.split('/')), encoding='utf-8') as f:
+            source = f.read()
+        if kind == 'css':
+            parts.append(rcssmin.cssmin(rewrite_css_urls(path, source, manifest, output_dir)))
+        else:
+            # Each file is a separate script; the semicolon keeps ASI from joining them
+            parts.append(rjsmin.jsmin(source) + ';')
+    return '\n'.join(parts).encode('utf-8')
+
+def write_output(static_dir, target, content):
+    """Write one built file (target is relative to static_dir) and its precompressed copies"""
+    target_file = os.path.join(static_dir, *target.split('/'))
+    os.makedirs(os.path.dirname(target_file), exist_ok=True)
+    with open(target_file, 'wb') as f:
+        f.write(content)
+    write_precompressed(target_file)
+
+def build(static_dir=STATIC_DIR):
+    """
+    Rebuild static/dist and its manifest. Stylesheets are done last so their
+    url() references can point at the already hashed images and fonts, and
+    the bundles after that.
+    Returns the manifest ({original path: hashed path}, relative to static/).
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+
+    assets = find_assets(static_dir)
+    manifest = {}
+    for path in sorted(assets, key=lambda p: p.endswith('.css')):
+        with open(os.path.join(static_dir, path), 'rb') as f:
+            content = f.read()
+        if path.endswith('.css'):
+            content = rewrite_css_urls(path, content.decode('utf-8'), manifest).encode('utf-8')
+
+        target = posixpath.join(DIST_DIR, hashed_name(path, content))
+        write_output(static_dir, target, content)
+        manifest[path] = target
+
+    for kind, bundles in BUNDLES.items():
+        for name, files in bundles.items():
+            path = bundle_path(name, kind)
+            content = build_bundle(static_dir, kind, files, manifest)
+            target = posixpath.join(DIST_DIR, hashed_name(path, content))
+            write_output(static_dir, target, content)
+            manifest[path] = target
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(static_dir=STATIC_DIR):
+    """Load the manifest written by build(), or {} if the assets have not been built"""
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error loading asset manifest: {e}")
+        return {}
+
+if __name__ == '__main__':
+    manifest = build()
+    print(f"Fingerprinted {len(manifest)} static assets into static/{DIST_DIR}")
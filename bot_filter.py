@@ -0,0 +1,58 @@
+"""
+WSGI middleware that turns away scanner probes before Flask sees them
+"""
+import re
+import threading
+
+# Named probe patterns, matched against the request path. Each becomes a named
+# group in one combined regex, so a single search both filters and says which matched.
+BOT_PATTERNS = [
+    ('xmlrpc', r'^/xmlrpc\.php$'),
+    ('wordpress', r'^/(?:wp-admin|wordpress|wp-includes|wp-content|wp|wp1)/|^/blog/wp-'),
+    ('legacy_paths', r'^/(?:cms|shop|site|test|2019)/'),
+    ('php', r'\.php\d?$'),
+    ('dotfiles', r'^/\.(?:env|git|svn|aws|ssh|DS_Store)'),
+]
+
+def compile_patterns(patterns):
+    """Combine (name, regex) pairs into one case-insensitive regex with a named group per pattern"""
+    return re.compile('|'.join(f'(?P<{name}>{regex})' for name, regex in patterns), re.IGNORECASE)
+
+BOT_PATTERN = compile_patterns(BOT_PATTERNS)
+
+class BotFilter:
+    """
+    Wraps a WSGI app and answers requests for known probe paths with a bare 404,
+    before routing, sessions or the database are involved.
+    Hit counters are kept per pattern and per worker process.
+    """
+
+    NOT_FOUND_BODY = b'Not Found'
+
+    def __init__(self, app, patterns=BOT_PATTERNS):
+        self.app = app
+        self.pattern = compile_patterns(patterns)
+        self.counts = {name: 0 for name, _ in patterns}
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        match = self.pattern.search(environ.get('PATH_INFO', ''))
+        if match is None:
+            return self.app(environ, start_response)
+
+        with self._lock:
+            self.counts[match.lastgroup] += 1
+        start_response('404 Not Found', [
+            ('Content-Type', 'text/plain'),
+            ('Content-Length', str(len(self.NOT_FOUND_BODY))),
+            ('Cache-Control', 'public, max-age=86400')
+        ])
+        return [self.NOT_FOUND_BODY]
+
+    def stats(self):
+        """Get the number of blocked requests, in total and per pattern"""
+        with self._lock:
+            return {
+                'blocked': sum(self.counts.values()),
+                'patterns': dict(self.counts)
+            }
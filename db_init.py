@@ -24,7 +24,7 @@ def update_admin_user(conn):
     hashed_password = generate_password_hash(password)
     try:
         conn.execute(
-            text('UPDATE users SET username = :username, email = :email, password = :password WHERE role = :role'),
+            text('UPDATE users SET username = :username, email = :email, password = :password, version = version + 1 WHERE role = :role'),
             {"username": username, "email": email, "password": hashed_password, "role": 'admin'}
         )
         return True
@@ -130,6 +130,15 @@ def init_db():
                     
                     print("WARNING: Using PostgreSQL schema for SQLite. Some features may not work correctly.")
             
+            # The schema files match the latest migration: record that, so `flask db upgrade`
+            # does not replay every revision over tables that already exist
+            try:
+                from flask_migrate import stamp
+                stamp()
+                print("Stamped database with the latest migration revision")
+            except Exception as e:
+                print(f"Error stamping database revision: {e}")
+            
             # Create admin user if none exists
             try:
                 result = db.session.execute(text('SELECT COUNT(*) as count FROM users'))
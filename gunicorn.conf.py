@@ -0,0 +1,18 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+Command-line flags (e.g. --workers in the Dockerfile start script) take precedence.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+# Threaded workers: an open notification stream (Server-Sent Events) parks one
+# thread waiting on a condition, not a whole process, and the background
+# write buffers and stream poller keep working without monkey patching.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# gthread workers heartbeat from the main thread, so long-lived streams don't trip this
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = 5
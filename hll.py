@@ -0,0 +1,68 @@
+"""
+HyperLogLog sketches for estimating distinct counts (unique visitors)
+"""
+import hashlib
+import math
+import zlib
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch.
+    With the default precision of 12 there are 4096 one-byte registers and the
+    standard error is about 1.6%. Sketches with the same precision can be merged,
+    so the unique count for a date range comes from merging daily sketches.
+    """
+
+    DEFAULT_PRECISION = 12
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.m)
+        else:
+            if len(registers) != self.m:
+                raise ValueError("HyperLogLog register count does not match precision")
+            self.registers = bytearray(registers)
+
+    def add(self, value):
+        """Add a value. Returns True if the sketch changed"""
+        # Stable 64-bit hash; Python's hash() is randomised per process
+        h = int.from_bytes(hashlib.sha1(str(value).encode('utf-8')).digest()[:8], 'big')
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - rest.bit_length() + 1 if rest else 64 - self.precision + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        """Merge another sketch into this one (union of the counted sets)"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Estimate the number of distinct values added"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        """Serialize as one precision byte followed by the compressed registers"""
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Load a sketch written by to_bytes (accepts bytes or a memoryview from psycopg2)"""
+        data = bytes(data)
+        return cls(precision=data[0], registers=zlib.decompress(data[1:]))
@@ -0,0 +1,145 @@
+"""
+Responsive variants of the raster images under static/images.
+
+`python images.py` (or `flask build-assets`, after the fingerprinting step)
+writes resized AVIF and WebP copies of every PNG/JPG/WebP image to
+static/dist/images/, e.g. images/about/me/me.png ->
+dist/images/about/me/me.640w.3f2a9c1d8e4b.webp, plus a tiny blurred placeholder
+for opaque images, and records them in static/dist/images.json:
+
+    {"images/about/me/me.png": {"width": 901, "height": 906, "placeholder": "data:...",
+                                "sources": [["image/avif", [["dist/...", 160], ...]], ...]}}
+
+The responsive_image macro in templates/macros/images.html turns an entry into
+a <picture> with srcset/sizes, explicit dimensions and lazy loading.
+Run it after assets.py, which clears static/dist.
+"""
+import base64
+import io
+import json
+import os
+import posixpath
+
+from PIL import Image, ImageFilter, ImageOps, features
+
+from assets import DIST_DIR, STATIC_DIR, hashed_name
+
+IMAGES_DIR = 'images'
+MANIFEST_NAME = 'images.json'
+SOURCE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
+
+# Target widths in pixels; an image never gets a variant wider than itself
+WIDTHS = [160, 320, 640, 960, 1280]
+
+# (MIME type, Pillow format, file extension, save options), best compression first.
+# AVIF needs a Pillow built with libavif; without it only WebP variants are made.
+FORMATS = [
+    ('image/avif', 'AVIF', '.avif', {'quality': 50, 'speed': 6}),
+    ('image/webp', 'WEBP', '.webp', {'quality': 75, 'method': 6}),
+]
+
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_BLUR = 1
+
+def available_formats():
+    return [fmt for fmt in FORMATS if features.check(fmt[1].lower())]
+
+def find_images(static_dir=STATIC_DIR):
+    """Paths (relative to static_dir, with forward slashes) of the images to make variants of"""
+    images = []
+    for root, dirs, files in os.walk(os.path.join(static_dir, IMAGES_DIR)):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in SOURCE_EXTENSIONS:
+                path = os.path.relpath(os.path.join(root, name), static_dir)
+                images.append(path.replace(os.sep, '/'))
+    return sorted(images)
+
+def is_opaque(image):
+    """Whether an image has no transparent pixels (a placeholder would show through otherwise)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        return image.convert('RGBA').getchannel('A').getextrema()[0] == 255
+    return True
+
+def resized(image, width):
+    if width >= image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+def encode(image, pillow_format, options):
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+def placeholder(image):
+    """A data: URI of a tiny blurred WebP, shown behind the image until it loads"""
+    thumbnail = resized(image.convert('RGB'), PLACEHOLDER_WIDTH).filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR))
+    data = encode(thumbnail, 'WEBP', {'quality': 40})
+    return 'data:image/webp;base64,' + base64.b64encode(data).decode('ascii')
+
+def build_image(static_dir, path, formats):
+    """Write one image's variants and return its manifest entry"""
+    with Image.open(os.path.join(static_dir, *path.split('/'))) as source:
+        # Apply any EXIF rotation so the variants and dimensions match what browsers display
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if not is_opaque(image) else 'RGB')
+
+    root = posixpath.splitext(path)[0]
+    widths = sorted({min(width, image.width) for width in WIDTHS})
+    sources = []
+    for mimetype, pillow_format, extension, options in formats:
+        variants = []
+        for width in widths:
+            content = encode(resized(image, width), pillow_format, options)
+            target = posixpath.join(DIST_DIR, hashed_name(f"{root}.{width}w{extension}", content))
+            target_file = os.path.join(static_dir, *target.split('/'))
+            os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            with open(target_file, 'wb') as f:
+                f.write(content)
+            variants.append([target, width])
+        sources.append([mimetype, variants])
+
+    return {
+        'width': image.width,
+        'height': image.height,
+        'placeholder': placeholder(image) if is_opaque(image) else None,
+        'sources': sources
+    }
+
+def build(static_dir=STATIC_DIR):
+    """
+    Write the variants of every image under static/images and the images manifest.
+    Returns the manifest ({original path: entry}).
+    """
+    formats = available_formats()
+    manifest = {}
+    for path in find_images(static_dir):
+        try:
+            manifest[path] = build_image(static_dir, path, formats)
+        except Exception as e:
+            # Templates fall back to the original image
+            print(f"Error building variants of {path}: {e}")
+
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    os.makedirs(dist_dir, exist_ok=True)
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(static_dir=STATIC_DIR):
+    """Load the manifest written by build(), or {} if the images have not been built"""
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error loading image manifest: {e}")
+        return {}
+
+if __name__ == '__main__':
+    manifest = build()
+    formats = ', '.join(fmt[1] for fmt in available_formats())
+    print(f"Built {formats} variants of {len(manifest)} images into static/{DIST_DIR}")
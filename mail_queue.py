@@ -0,0 +1,227 @@
+"""
+Background delivery of outgoing mail over a persistent SMTP connection
+"""
+import atexit
+import heapq
+import itertools
+import os
+import queue
+import smtplib
+import threading
+import time
+
+# The connection is gone or unusable: reconnect and try the message again straight away
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+def is_permanent(error):
+    """Whether retrying can't help: the server rejected the recipients, or answered with a 5xx code"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    code = getattr(error, 'smtp_code', None)
+    return isinstance(code, int) and 500 <= code < 600
+
+class MailQueue:
+    """
+    Bounded in-process queue of messages sent by a background thread.
+
+    connect_func() returns a context manager whose __enter__ gives an open
+    connection with send(message) (a Flask-Mail Connection). It is kept open
+    between batches and closed after idle_timeout seconds without mail, so a
+    burst of messages shares one TLS session and login. Failed messages are
+    retried with exponential backoff (backoff, 2x backoff, ... up to max_backoff)
+    until max_attempts, except permanent rejections. After each batch,
+    report_func receives a list of (key, status, attempts, error) with status
+    'sent', 'retrying' or 'failed'. When the queue is full put() returns False
+    instead of blocking. Messages still queued when the process exits are not sent.
+    """
+
+    def __init__(self, name, connect_func, report_func, context_func=None, max_size=500, batch_size=20,
+                 max_attempts=5, backoff=2.0, max_backoff=300.0, idle_timeout=60.0):
+        self.name = name
+        self.connect_func = connect_func
+        self.report_func = report_func
+        # Called around each batch, e.g. app.app_context (Flask-Mail needs an app context)
+        self.context_func = context_func
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._retries = []  # heap of (due, sequence, item)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+
+        self._connection = None
+        self._client = None
+        self._last_used = 0
+
+        # Counters exposed through stats()
+        self.queued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.connections = 0
+        self.batches = 0
+
+    def put(self, message, key=None):
+        """Queue a message; key identifies it in reports. Returns False if the queue was full"""
+        self._ensure_started()
+        item = {'key': key, 'message': message, 'attempts': 0}
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.queued += 1
+        return True
+
+    def stats(self):
+        """Get queue counters"""
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'retry_pending': len(self._retries),
+                'queued': self.queued,
+                'dropped': self.dropped,
+                'sent': self.sent,
+                'retried': self.retried,
+                'failed': self.failed,
+                'connections': self.connections,
+                'batches': self.batches,
+                'connected': self._client is not None
+            }
+
+    def stop(self):
+        """Stop the worker and close the connection"""
+        self._stopping.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._disconnect()
+
+    def _ensure_started(self):
+        """Start the worker lazily, once per process (gunicorn forks workers after import)"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-mail", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def _run(self):
+        """Background loop: send batches, retry what is due, and close the connection when idle"""
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                try:
+                    if self.context_func is not None:
+                        with self.context_func():
+                            self._send_batch(batch)
+                    else:
+                        self._send_batch(batch)
+                except Exception as e:
+                    print(f"Error in {self.name} mail worker: {e}")
+            elif self._client is not None and time.time() - self._last_used > self.idle_timeout:
+                self._disconnect()
+
+    def _next_batch(self):
+        """Wait for queued messages or the next due retry, then take up to batch_size"""
+        now = time.time()
+        timeout = self.idle_timeout if self._client is not None else 1.0
+        with self._lock:
+            if self._retries:
+                timeout = min(timeout, max(0, self._retries[0][0] - now))
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=max(timeout, 0.01)))
+        except queue.Empty:
+            pass
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        now = time.time()
+        with self._lock:
+            while self._retries and len(batch) < self.batch_size and self._retries[0][0] <= now:
+                batch.append(heapq.heappop(self._retries)[2])
+        return batch
+
+    def _send_batch(self, batch):
+        results = []
+        for item in batch:
+            item['attempts'] += 1
+            error = self._send(item['message'])
+            if error is None:
+                results.append((item['key'], 'sent', item['attempts'], None))
+                with self._lock:
+                    self.sent += 1
+            elif is_permanent(error) or item['attempts'] >= self.max_attempts:
+                print(f"Giving up on mail to {item['message'].recipients}: {error}")
+                results.append((item['key'], 'failed', item['attempts'], str(error)))
+                with self._lock:
+                    self.failed += 1
+            else:
+                delay = min(self.max_backoff, self.backoff * 2 ** (item['attempts'] - 1))
+                results.append((item['key'], 'retrying', item['attempts'], str(error)))
+                with self._lock:
+                    self.retried += 1
+                    heapq.heappush(self._retries, (time.time() + delay, next(self._sequence), item))
+        with self._lock:
+            self.batches += 1
+        try:
+            self.report_func(results)
+        except Exception as e:
+            print(f"Error reporting {self.name} mail status: {e}")
+
+    def _send(self, message):
+        """Send one message over the shared connection. Returns None, or the error"""
+        for reconnect in (False, True):
+            try:
+                if self._client is None:
+                    self._connect()
+                self._client.send(message)
+                self._last_used = time.time()
+                return None
+            except CONNECTION_ERRORS as e:
+                # Usually the server closed an idle connection: reconnect once before counting a failure
+                self._disconnect()
+                if reconnect:
+                    return e
+            except Exception as e:
+                # A rejected message leaves the session usable; anything else may not have
+                if not is_permanent(e):
+                    self._disconnect()
+                return e
+
+    def _connect(self):
+        self._connection = self.connect_func()
+        self._client = self._connection.__enter__()
+        self._last_used = time.time()
+        with self._lock:
+            self.connections += 1
+
+    def _disconnect(self):
+        connection, self._connection, self._client = self._connection, None, None
+        if connection is None:
+            return
+        try:
+            connection.__exit__(None, None, None)
+        except Exception:
+            # Already closed by the server
+            pass
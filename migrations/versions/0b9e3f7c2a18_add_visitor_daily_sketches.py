@@ -0,0 +1,35 @@
+"""Add visitor_daily_sketches for unique visitor estimates
+
+Revision ID: 0b9e3f7c2a18
+Revises: f2c6d8a1b953
+Create Date: 2026-10-18 13:17:44.602871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models import VisitorStat
+
+
+# revision identifiers, used by Alembic.
+revision = '0b9e3f7c2a18'
+down_revision = 'f2c6d8a1b953'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('visitor_daily_sketches',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sketch', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+
+    # Build sketches for existing visits (classified by e4b7a2c9d015)
+    bind = op.get_bind()
+    for day, sketch in VisitorStat.sketches_from_stats(bind).items():
+        VisitorStat.merge_sketch(bind, day, sketch)
+
+
+def downgrade():
+    op.drop_table('visitor_daily_sketches')
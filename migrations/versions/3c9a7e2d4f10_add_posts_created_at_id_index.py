@@ -0,0 +1,26 @@
+"""Add posts (created_at, id) index for keyset pagination
+
+Revision ID: 3c9a7e2d4f10
+Revises: b442551b42c4
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a7e2d4f10'
+down_revision = 'b442551b42c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.create_index('idx_posts_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_index('idx_posts_created_at_id')
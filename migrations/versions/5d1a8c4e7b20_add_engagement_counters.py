@@ -0,0 +1,60 @@
+"""Add denormalized like/comment counters to posts and comments
+
+Revision ID: 5d1a8c4e7b20
+Revises: 0b9e3f7c2a18
+Create Date: 2026-10-18 13:52:31.087245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1a8c4e7b20'
+down_revision = '0b9e3f7c2a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('anonymous_like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('registered_like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_like_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_comment_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_like_at', sa.DateTime(), nullable=True))
+
+    # Backfill from the existing likes and comments (same as `flask reconcile-counts`)
+    op.execute('''
+        UPDATE posts SET
+            like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id),
+            anonymous_like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id AND is_anonymous = TRUE),
+            registered_like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id AND is_anonymous = FALSE),
+            comment_count = (SELECT COUNT(*) FROM comments WHERE post_id = posts.id),
+            last_like_at = (SELECT MAX(created_at) FROM blog_likes WHERE post_id = posts.id),
+            last_comment_at = (SELECT MAX(created_at) FROM comments WHERE post_id = posts.id)
+    ''')
+    op.execute('''
+        UPDATE comments SET
+            like_count = (SELECT COUNT(*) FROM comment_likes WHERE comment_id = comments.id),
+            last_like_at = (SELECT MAX(created_at) FROM comment_likes WHERE comment_id = comments.id)
+    ''')
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_column('last_like_at')
+        batch_op.drop_column('like_count')
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('last_comment_at')
+        batch_op.drop_column('last_like_at')
+        batch_op.drop_column('comment_count')
+        batch_op.drop_column('registered_like_count')
+        batch_op.drop_column('anonymous_like_count')
+        batch_op.drop_column('like_count')
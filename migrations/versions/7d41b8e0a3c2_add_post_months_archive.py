@@ -0,0 +1,38 @@
+"""Add post_months archive table
+
+Revision ID: 7d41b8e0a3c2
+Revises: 3c9a7e2d4f10
+Create Date: 2026-10-18 10:03:27.551907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d41b8e0a3c2'
+down_revision = '3c9a7e2d4f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('post_months',
+    sa.Column('month_year', sa.String(length=7), nullable=False),
+    sa.Column('post_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('month_year')
+    )
+
+    # Backfill the archive from existing posts
+    if op.get_bind().dialect.name == 'postgresql':
+        month_expr = "to_char(created_at, 'YYYY-MM')"
+    else:
+        month_expr = "strftime('%Y-%m', created_at)"
+    op.execute(
+        f"INSERT INTO post_months (month_year, post_count) "
+        f"SELECT {month_expr}, COUNT(*) FROM posts WHERE created_at IS NOT NULL GROUP BY {month_expr}"
+    )
+
+
+def downgrade():
+    op.drop_table('post_months')
@@ -0,0 +1,71 @@
+"""Add unique constraints on blog_likes and comment_likes
+
+Revision ID: 9a4f2e6b8c31
+Revises: 5d1a8c4e7b20
+Create Date: 2026-10-18 14:26:09.531772
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4f2e6b8c31'
+down_revision = '5d1a8c4e7b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Empty anonymous IDs become NULL so they do not collide in the new constraint
+    op.execute("UPDATE blog_likes SET anonymous_id = NULL WHERE anonymous_id = ''")
+
+    # Remove duplicates left by the old check-then-insert, keeping the first like
+    op.execute('''
+        DELETE FROM blog_likes
+        WHERE user_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM blog_likes WHERE user_id IS NOT NULL GROUP BY post_id, user_id
+        )
+    ''')
+    op.execute('''
+        DELETE FROM blog_likes
+        WHERE anonymous_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM blog_likes WHERE anonymous_id IS NOT NULL GROUP BY post_id, anonymous_id
+        )
+    ''')
+    op.execute('''
+        DELETE FROM comment_likes
+        WHERE user_id IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM comment_likes WHERE user_id IS NOT NULL GROUP BY comment_id, user_id
+        )
+    ''')
+
+    # Bring the stored counters back in line with the remaining likes
+    op.execute('''
+        UPDATE posts SET
+            like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id),
+            anonymous_like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id AND is_anonymous = TRUE),
+            registered_like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id AND is_anonymous = FALSE),
+            last_like_at = (SELECT MAX(created_at) FROM blog_likes WHERE post_id = posts.id)
+    ''')
+    op.execute('''
+        UPDATE comments SET
+            like_count = (SELECT COUNT(*) FROM comment_likes WHERE comment_id = comments.id),
+            last_like_at = (SELECT MAX(created_at) FROM comment_likes WHERE comment_id = comments.id)
+    ''')
+
+    with op.batch_alter_table('blog_likes', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_blog_likes_post_user', ['post_id', 'user_id'])
+        batch_op.create_unique_constraint('uq_blog_likes_post_anonymous', ['post_id', 'anonymous_id'])
+
+    with op.batch_alter_table('comment_likes', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_comment_likes_comment_user', ['comment_id', 'user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('comment_likes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_comment_likes_comment_user', type_='unique')
+
+    with op.batch_alter_table('blog_likes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_blog_likes_post_anonymous', type_='unique')
+        batch_op.drop_constraint('uq_blog_likes_post_user', type_='unique')
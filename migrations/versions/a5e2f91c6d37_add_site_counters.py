@@ -0,0 +1,31 @@
+"""Add site_counters table for running totals
+
+Revision ID: a5e2f91c6d37
+Revises: 7d41b8e0a3c2
+Create Date: 2026-10-18 10:41:09.730512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5e2f91c6d37'
+down_revision = '7d41b8e0a3c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('site_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Seed the view counter from the existing history
+    op.execute("INSERT INTO site_counters (name, value) SELECT 'total_views', COUNT(*) FROM visitor_stats")
+
+
+def downgrade():
+    op.drop_table('site_counters')
@@ -0,0 +1,26 @@
+"""Add version stamp to users for cached user lookups
+
+Revision ID: b7c3e5d9f402
+Revises: 9a4f2e6b8c31
+Create Date: 2026-10-18 14:58:40.113926
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c3e5d9f402'
+down_revision = '9a4f2e6b8c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,34 @@
+"""Add known_visitors table for first-visit detection
+
+Revision ID: c81f3d5a9b64
+Revises: a5e2f91c6d37
+Create Date: 2026-10-18 11:20:52.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81f3d5a9b64'
+down_revision = 'a5e2f91c6d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('known_visitors',
+    sa.Column('ip_address', sa.String(length=45), nullable=False),
+    sa.Column('first_seen_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+    sa.PrimaryKeyConstraint('ip_address')
+    )
+
+    # Backfill from the visit history
+    op.execute(
+        "INSERT INTO known_visitors (ip_address, first_seen_at) "
+        "SELECT ip_address, MIN(created_at) FROM visitor_stats WHERE ip_address IS NOT NULL GROUP BY ip_address"
+    )
+
+
+def downgrade():
+    op.drop_table('known_visitors')
@@ -0,0 +1,30 @@
+"""Add partial index on unread notifications
+
+Revision ID: d3f8a6b1c745
+Revises: b7c3e5d9f402
+Create Date: 2026-10-18 15:21:07.482615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f8a6b1c745'
+down_revision = 'b7c3e5d9f402'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only unread rows are indexed, so the unread count and mark-all-read stay
+    # small however long the notification history gets
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('idx_notifications_unread', ['id'], unique=False,
+                              postgresql_where=sa.text('is_read = false'),
+                              sqlite_where=sa.text('is_read = false'))
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notifications_unread')
@@ -0,0 +1,51 @@
+"""Add page_category and is_bot to visitor_stats
+
+Revision ID: e4b7a2c9d015
+Revises: c81f3d5a9b64
+Create Date: 2026-10-18 12:02:15.448390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models import VisitorStat
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7a2c9d015'
+down_revision = 'c81f3d5a9b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('visitor_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('page_category', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('is_bot', sa.Boolean(), server_default=sa.false(), nullable=True))
+        batch_op.create_index('idx_visitor_stats_category_created_at', ['page_category', 'created_at'], unique=False)
+
+    # Classify existing rows, so the rollups and sketches built later count them
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text('SELECT id, page_visited FROM visitor_stats WHERE id > :last_id ORDER BY id LIMIT 1000'),
+            {"last_id": last_id}
+        ).fetchall()
+        if not rows:
+            break
+        VisitorStat.classify_rows(bind, rows)
+        last_id = rows[-1][0]
+
+    # The view counter was seeded from every row; from here on it only counts page views
+    op.execute(
+        "UPDATE site_counters SET value = (SELECT COUNT(*) FROM visitor_stats WHERE page_category = 'page') "
+        "WHERE name = 'total_views'"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('visitor_stats', schema=None) as batch_op:
+        batch_op.drop_index('idx_visitor_stats_category_created_at')
+        batch_op.drop_column('is_bot')
+        batch_op.drop_column('page_category')
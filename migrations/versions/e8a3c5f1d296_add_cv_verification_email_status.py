@@ -0,0 +1,34 @@
+"""Track verification email delivery on cv_verifications
+
+Revision ID: e8a3c5f1d296
+Revises: d3f8a6b1c745
+Create Date: 2026-10-18 15:48:36.215903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3c5f1d296'
+down_revision = 'd3f8a6b1c745'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Written by the background mail queue; email_status stays NULL for rows from
+    # before it, whose emails were sent inline with no record of the outcome
+    with op.batch_alter_table('cv_verifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('email_attempts', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('email_error', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('email_sent_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('cv_verifications', schema=None) as batch_op:
+        batch_op.drop_column('email_sent_at')
+        batch_op.drop_column('email_error')
+        batch_op.drop_column('email_attempts')
+        batch_op.drop_column('email_status')
@@ -0,0 +1,37 @@
+"""Add daily visitor rollup tables
+
+Revision ID: f2c6d8a1b953
+Revises: e4b7a2c9d015
+Create Date: 2026-10-18 12:41:07.215364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6d8a1b953'
+down_revision = 'e4b7a2c9d015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled on the next analytics request, or up front with `flask rollup-visits`
+    op.create_table('visitor_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('views', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('unique_visitors', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('visitor_daily_pages',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('page_visited', sa.Text(), nullable=False),
+    sa.Column('views', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('day', 'page_visited')
+    )
+
+
+def downgrade():
+    op.drop_table('visitor_daily_pages')
+    op.drop_table('visitor_daily_stats')
@@ -1,12 +1,24 @@
 from db_init import get_db_connection
 from werkzeug.security import check_password_hash, generate_password_hash
-from datetime import datetime
+from datetime import datetime, date, timedelta
+import calendar
+import re
 from flask import g, request
+from sqlalchemy import bindparam
 from sqlalchemy.sql import text
+from cache import TTLCache
+from hll import HyperLogLog
+from bot_filter import BOT_PATTERN
 
 class User:
     """User model for managing user operations"""
     
+    # Columns kept in the per-request user record (no password hash)
+    SLIM_COLUMNS = 'id, username, email, role, version, created_at'
+    
+    # Per-worker cache of slim user records, keyed by user id
+    cache = TTLCache(max_size=1000, ttl=60)
+    
     @staticmethod
     def create(username, email, password, role='subscriber'):
         """Create a new user in the database"""
@@ -69,6 +81,66 @@ class User:
             print(f"Error converting user row to dict: {e}")
             return None
     
+    @staticmethod
+    def get_cached(user_id, version=None):
+        """
+        Get a slim user record (no password hash) for the current request.
+        Served from the per-worker cache when possible; a cached record whose version
+        differs from the given one is stale and is reloaded. Entries expire after a
+        short TTL so changes made by other workers are picked up.
+        """
+        user = User.cache.get(user_id)
+        if user is not None and (version is None or user['version'] == version):
+            return user
+        
+        conn = get_db_connection()
+        try:
+            row = conn.execute(
+                text(f'SELECT {User.SLIM_COLUMNS} FROM users WHERE id = :user_id'), {"user_id": user_id}
+            ).fetchone()
+            if not row:
+                User.cache.delete(user_id)
+                return None
+            user = dict(row._mapping)
+            User.cache.set(user_id, user)
+            return user
+        except Exception as e:
+            print(f"Error loading user {user_id}: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return None
+    
+    @staticmethod
+    def update(user_id, username=None, email=None, role=None):
+        """
+        Update a user's profile or role and bump their version stamp,
+        so cached copies and session details are refreshed.
+        """
+        fields = {"username": username, "email": email, "role": role}
+        changes = {name: value for name, value in fields.items() if value is not None}
+        if not changes:
+            return False
+        
+        conn = get_db_connection()
+        try:
+            assignments = ', '.join(f'{name} = :{name}' for name in changes)
+            conn.execute(
+                text(f'UPDATE users SET {assignments}, version = version + 1 WHERE id = :user_id'),
+                dict(changes, user_id=user_id)
+            )
+            conn.commit()
+            User.cache.delete(user_id)
+            return True
+        except Exception as e:
+            print(f"Error updating user: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return False
+    
     @staticmethod
     def get_by_email(email):
         """Get user by email"""
@@ -196,6 +268,26 @@ class User:
 class Post:
     """Post model for blog post operations"""
     
+    # Page cache tag for every page that lists posts (home, blog)
+    PAGE_TAG_POSTS = 'posts'
+    
+    @staticmethod
+    def page_tags(post_id=None):
+        """Page cache tags for the post listings, plus one post's own page if given"""
+        tags = [Post.PAGE_TAG_POSTS]
+        if post_id is not None:
+            tags.append(f'post:{post_id}')
+        return tags
+    
+    @staticmethod
+    def _invalidate_pages(conn, post_id=None):
+        """
+        Expire cached pages showing this post (and the post listings).
+        Does not commit - the caller commits it together with the write.
+        """
+        for tag in Post.page_tags(post_id):
+            SiteCounter.increment(conn, SiteCounter.PAGE_TAG_PREFIX + tag)
+    
     @staticmethod
     def _convert_post_timestamps(post_dict):
         """Convert string timestamps to datetime objects in a post dict"""
@@ -207,52 +299,262 @@ class Post:
                 pass
         return post_dict
     
+    @staticmethod
+    def _month_bounds(month_year):
+        """Turn a 'YYYY-MM' string into a half-open [start, end) created_at range, or None if invalid"""
+        try:
+            start = datetime.strptime(month_year, '%Y-%m')
+        except (ValueError, TypeError):
+            return None
+        if start.month == 12:
+            end = start.replace(year=start.year + 1, month=1)
+        else:
+            end = start.replace(month=start.month + 1)
+        return start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')
+    
+    @staticmethod
+    def _month_key(created_at):
+        """Get the 'YYYY-MM' archive key for a created_at value (datetime or string)"""
+        if isinstance(created_at, datetime):
+            return created_at.strftime('%Y-%m')
+        return str(created_at)[:7] if created_at else None
+    
+    @staticmethod
+    def _sync_month_archive(conn, created_at):
+        """
+        Recount the posts in the month of created_at and store it in post_months.
+        Uses the created_at range index, so it only touches that month's posts.
+        Does not commit - the caller commits with its own write.
+        """
+        month_year = Post._month_key(created_at)
+        bounds = Post._month_bounds(month_year)
+        if not bounds:
+            return
+        
+        count = conn.execute(
+            text('SELECT COUNT(*) FROM posts WHERE created_at >= :start AND created_at < :end'),
+            {"start": bounds[0], "end": bounds[1]}
+        ).scalar() or 0
+        
+        if count > 0:
+            conn.execute(text('''
+                INSERT INTO post_months (month_year, post_count) VALUES (:month_year, :post_count)
+                ON CONFLICT (month_year) DO UPDATE SET post_count = excluded.post_count
+            '''), {"month_year": month_year, "post_count": count})
+        else:
+            conn.execute(text('DELETE FROM post_months WHERE month_year = :month_year'), {"month_year": month_year})
+    
+    @staticmethod
+    def rebuild_month_archive():
+        """Rebuild the whole post_months table from the posts table"""
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(text('SELECT created_at FROM posts WHERE created_at IS NOT NULL')).fetchall()
+            counts = {}
+            for row in rows:
+                month_year = Post._month_key(row[0])
+                counts[month_year] = counts.get(month_year, 0) + 1
+            
+            conn.execute(text('DELETE FROM post_months'))
+            for month_year, post_count in counts.items():
+                conn.execute(
+                    text('INSERT INTO post_months (month_year, post_count) VALUES (:month_year, :post_count)'),
+                    {"month_year": month_year, "post_count": post_count}
+                )
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error rebuilding month archive: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return False
+    
+    @staticmethod
+    def _adjust_like_counts(conn, post_id, is_anonymous, delta):
+        """
+        Apply a like (delta=1) or unlike (delta=-1) to the post's stored counters
+        and expire its cached pages.
+        Does not commit - the caller commits it together with the blog_likes write.
+        Returns the post's new like count.
+        """
+        if delta > 0:
+            last_like = 'CURRENT_TIMESTAMP'
+        else:
+            last_like = '(SELECT MAX(created_at) FROM blog_likes WHERE post_id = :post_id)'
+        Post._invalidate_pages(conn, post_id)
+        return conn.execute(text(f'''
+            UPDATE posts SET
+                like_count = like_count + :delta,
+                anonymous_like_count = anonymous_like_count + :anonymous_delta,
+                registered_like_count = registered_like_count + :registered_delta,
+                last_like_at = {last_like}
+            WHERE id = :post_id
+            RETURNING like_count
+        '''), {
+            "post_id": post_id,
+            "delta": delta,
+            "anonymous_delta": delta if is_anonymous else 0,
+            "registered_delta": 0 if is_anonymous else delta
+        }).scalar()
+    
+    @staticmethod
+    def _adjust_comment_count(conn, post_id, delta):
+        """
+        Apply a new (delta=1) or deleted (delta=-1) comment to the post's stored counters
+        and expire its cached pages.
+        Does not commit - the caller commits it together with the comments write.
+        """
+        if delta > 0:
+            last_comment = 'CURRENT_TIMESTAMP'
+        else:
+            last_comment = '(SELECT MAX(created_at) FROM comments WHERE post_id = :post_id)'
+        Post._invalidate_pages(conn, post_id)
+        conn.execute(text(f'''
+            UPDATE posts SET
+                comment_count = comment_count + :delta,
+                last_comment_at = {last_comment}
+            WHERE id = :post_id
+        '''), {"post_id": post_id, "delta": delta})
+    
+    @staticmethod
+    def reconcile_engagement_counts():
+        """
+        Recompute the stored like/comment counters on posts and comments from the
+        blog_likes, comments and comment_likes tables.
+        Returns (posts updated, comments updated), or None on error.
+        """
+        conn = get_db_connection()
+        try:
+            posts = conn.execute(text('''
+                UPDATE posts SET
+                    like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id),
+                    anonymous_like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id AND is_anonymous = TRUE),
+                    registered_like_count = (SELECT COUNT(*) FROM blog_likes WHERE post_id = posts.id AND is_anonymous = FALSE),
+                    comment_count = (SELECT COUNT(*) FROM comments WHERE post_id = posts.id),
+                    last_like_at = (SELECT MAX(created_at) FROM blog_likes WHERE post_id = posts.id),
+                    last_comment_at = (SELECT MAX(created_at) FROM comments WHERE post_id = posts.id)
+            ''')).rowcount
+            comments = conn.execute(text('''
+                UPDATE comments SET
+                    like_count = (SELECT COUNT(*) FROM comment_likes WHERE comment_id = comments.id),
+                    last_like_at = (SELECT MAX(created_at) FROM comment_likes WHERE comment_id = comments.id)
+            ''')).rowcount
+            conn.commit()
+            return posts, comments
+        except Exception as e:
+            print(f"Error reconciling engagement counts: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return None
+    
     @staticmethod
     def create(title, content, user_id=None):
         """Create a new blog post"""
+        from app import app
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        
         conn = get_db_connection()
-        cursor = conn.execute(
-            text('INSERT INTO posts (title, content, user_id) VALUES (:title, :content, :user_id)'),
-            {"title": title, "content": content, "user_id": user_id}
-        )
-        # For SQLite compatibility
-        if hasattr(cursor, 'lastrowid'):
-            post_id = cursor.lastrowid
-        else:
-            # For PostgreSQL
-            post_id = cursor.fetchone()[0] if cursor.returns_rows else None
+        try:
+            if is_postgres:
+                # PostgreSQL has no lastrowid; RETURNING also saves re-reading created_at
+                post_id, created_at = conn.execute(
+                    text('INSERT INTO posts (title, content, user_id) VALUES (:title, :content, :user_id) RETURNING id, created_at'),
+                    {"title": title, "content": content, "user_id": user_id}
+                ).fetchone()
+            else:
+                cursor = conn.execute(
+                    text('INSERT INTO posts (title, content, user_id) VALUES (:title, :content, :user_id)'),
+                    {"title": title, "content": content, "user_id": user_id}
+                )
+                post_id = cursor.lastrowid
+                created_at = conn.execute(
+                    text('SELECT created_at FROM posts WHERE id = :post_id'), {"post_id": post_id}
+                ).scalar()
             
-        conn.commit()
-        return post_id
+            # Keep the month archive in step with the new post, in the same transaction
+            Post._sync_month_archive(conn, created_at)
+            
+            Post._invalidate_pages(conn, post_id)
+            conn.commit()
+            return post_id
+        except Exception as e:
+            print(f"Error creating post: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            raise
+    
+    @staticmethod
+    def encode_cursor(post):
+        """Build an opaque pagination cursor from a post's (created_at, id) pair"""
+        created_at = post['created_at']
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat(sep='T')
+        return f"{str(created_at).replace(' ', 'T')}_{post['id']}"
     
     @staticmethod
-    def get_all(month_filter=None):
-        """Get all posts, with optional month filtering"""
+    def decode_cursor(cursor):
+        """Split a pagination cursor back into (created_at, id), or None if it is malformed"""
+        if not cursor or '_' not in cursor:
+            return None
+        created_at, _, post_id = cursor.rpartition('_')
+        if not post_id.isdigit():
+            return None
+        try:
+            # Validate the timestamp but keep the database's own text format for comparison
+            datetime.fromisoformat(created_at)
+        except ValueError:
+            return None
+        return created_at.replace('T', ' '), int(post_id)
+    
+    @staticmethod
+    def get_all(month_filter=None, before=None, after=None, limit=None):
+        """
+        Get posts newest first, with optional month filtering and keyset pagination.
+        before/after are (created_at, id) cursors: before returns older posts,
+        after returns newer posts. limit caps the number of rows returned.
+        """
         conn = get_db_connection()
         try:
-            # Check if we're using PostgreSQL or SQLite
-            from app import app
-            is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+            conditions = []
+            params = {}
             
             if month_filter:
-                if is_postgres:
-                    # PostgreSQL uses to_char
-                    query = text('''
-                        SELECT * FROM posts 
-                        WHERE to_char(created_at, 'YYYY-MM') = :month_filter
-                        ORDER BY created_at DESC
-                    ''')
-                else:
-                    # SQLite uses strftime
-                    query = text('''
-                        SELECT * FROM posts 
-                        WHERE strftime('%Y-%m', created_at) = :month_filter
-                        ORDER BY created_at DESC
-                    ''')
-                posts = conn.execute(query, {"month_filter": month_filter}).fetchall()
-            else:
-                query = text('SELECT * FROM posts ORDER BY created_at DESC')
-                posts = conn.execute(query).fetchall()
+                # Half-open created_at range so the (created_at, id) index can be used
+                bounds = Post._month_bounds(month_filter)
+                if not bounds:
+                    return []
+                conditions.append('created_at >= :month_start AND created_at < :month_end')
+                params["month_start"], params["month_end"] = bounds
+            
+            # Keyset pagination on (created_at, id) so each page is a bounded index range scan
+            order = 'DESC'
+            if before:
+                conditions.append('(created_at, id) < (:cursor_created_at, :cursor_id)')
+                params["cursor_created_at"], params["cursor_id"] = before
+            elif after:
+                conditions.append('(created_at, id) > (:cursor_created_at, :cursor_id)')
+                params["cursor_created_at"], params["cursor_id"] = after
+                order = 'ASC'
+            
+            query = 'SELECT * FROM posts'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += f' ORDER BY created_at {order}, id {order}'
+            if limit:
+                query += ' LIMIT :limit'
+                params["limit"] = limit
+            
+            posts = conn.execute(text(query), params).fetchall()
+            
+            # Newer pages are fetched oldest first, flip them back to newest first
+            if order == 'ASC':
+                posts = list(reversed(posts))
             
             # Convert to list of dicts
             result = []
@@ -277,6 +579,34 @@ class Post:
                 pass
             return []  # Return empty list on error
     
+    @staticmethod
+    def get_page(month_filter=None, before=None, after=None, page_size=10):
+        """
+        Get one page of posts using keyset pagination.
+        Returns (posts, older_cursor, newer_cursor); a cursor is None when there is no such page.
+        """
+        before = Post.decode_cursor(before)
+        after = Post.decode_cursor(after) if not before else None
+        
+        # Fetch one extra row to find out whether another page exists in that direction
+        posts = Post.get_all(month_filter, before=before, after=after, limit=page_size + 1)
+        has_more = len(posts) > page_size
+        if has_more:
+            # The extra row is the oldest for forward paging and the newest for backward paging
+            posts = posts[1:] if after else posts[:page_size]
+        
+        if not posts:
+            return [], None, None
+        
+        if after:
+            has_older, has_newer = True, has_more
+        else:
+            has_older, has_newer = has_more, bool(before)
+        
+        older_cursor = Post.encode_cursor(posts[-1]) if has_older else None
+        newer_cursor = Post.encode_cursor(posts[0]) if has_newer else None
+        return posts, older_cursor, newer_cursor
+    
     @staticmethod
     def get_latest(limit=2):
         """Get the latest n blog posts"""
@@ -323,80 +653,49 @@ class Post:
     def delete(post_id):
         """Delete a post by ID"""
         conn = get_db_connection()
-        conn.execute(text('DELETE FROM posts WHERE id = :post_id'), {"post_id": post_id})
-        conn.commit()
-        return True
+        try:
+            created_at = conn.execute(
+                text('SELECT created_at FROM posts WHERE id = :post_id'), {"post_id": post_id}
+            ).scalar()
+            conn.execute(text('DELETE FROM posts WHERE id = :post_id'), {"post_id": post_id})
+            
+            # Keep the month archive in step with the deleted post, in the same transaction
+            Post._sync_month_archive(conn, created_at)
+            
+            Post._invalidate_pages(conn, post_id)
+            conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error deleting post: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            raise
     
     @staticmethod
     def get_available_months():
-        """Get list of months that have posts"""
+        """Get list of months that have posts, read from the post_months archive"""
         conn = get_db_connection()
         
         try:
-            # Check if we're using PostgreSQL or SQLite
-            from app import app
-            is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
-            
-            if is_postgres:
-                # PostgreSQL version using date_trunc and to_char
-                query = text('''
-                    SELECT DISTINCT 
-                        to_char(created_at, 'YYYY-MM') as month_year,
-                        CASE 
-                            WHEN to_char(created_at, 'MM') = '01' THEN 'January ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '02' THEN 'February ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '03' THEN 'March ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '04' THEN 'April ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '05' THEN 'May ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '06' THEN 'June ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '07' THEN 'July ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '08' THEN 'August ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '09' THEN 'September ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '10' THEN 'October ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '11' THEN 'November ' || to_char(created_at, 'YYYY')
-                            WHEN to_char(created_at, 'MM') = '12' THEN 'December ' || to_char(created_at, 'YYYY')
-                            ELSE 'Unknown'
-                        END as month_name
-                    FROM posts
-                    WHERE created_at IS NOT NULL
-                    ORDER BY month_year DESC
-                ''')
-            else:
-                # SQLite version using strftime
-                query = text('''
-                    SELECT DISTINCT 
-                        strftime('%Y-%m', created_at) as month_year,
-                        case 
-                            when strftime('%m', created_at) = '01' then 'January ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '02' then 'February ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '03' then 'March ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '04' then 'April ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '05' then 'May ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '06' then 'June ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '07' then 'July ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '08' then 'August ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '09' then 'September ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '10' then 'October ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '11' then 'November ' || strftime('%Y', created_at)
-                            when strftime('%m', created_at) = '12' then 'December ' || strftime('%Y', created_at)
-                            else 'Unknown'
-                        end as month_name
-                    FROM posts
-                    WHERE created_at IS NOT NULL
-                    ORDER BY month_year DESC
-                ''')
-            
-            months = conn.execute(query).fetchall()
+            months = conn.execute(text('''
+                SELECT month_year, post_count
+                FROM post_months
+                WHERE post_count > 0
+                ORDER BY month_year DESC
+            ''')).fetchall()
             result = []
             
-            # Handle different row types safely
             for month in months:
                 try:
-                    if hasattr(month, "_mapping"):
-                        result.append(dict(month._mapping))
-                    else:
-                        # Create dict manually
-                        result.append({"month_year": month[0], "month_name": month[1]})
+                    month_year, post_count = month[0], month[1]
+                    year, month_number = month_year.split('-')
+                    result.append({
+                        "month_year": month_year,
+                        "month_name": f"{calendar.month_name[int(month_number)]} {year}",
+                        "post_count": post_count
+                    })
                 except Exception as e:
                     print(f"Error processing month: {e}")
                 
@@ -418,10 +717,22 @@ class Post:
                 text('UPDATE posts SET title = :title, content = :content WHERE id = :post_id'),
                 {"title": title, "content": content, "post_id": post_id}
             )
+            
+            # Re-sync the post's month so the archive heals if it ever drifted
+            created_at = conn.execute(
+                text('SELECT created_at FROM posts WHERE id = :post_id'), {"post_id": post_id}
+            ).scalar()
+            Post._sync_month_archive(conn, created_at)
+            
+            Post._invalidate_pages(conn, post_id)
             conn.commit()
             return True
         except Exception as e:
             print(f"Error updating post: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
             return False
             
     @staticmethod
@@ -444,17 +755,18 @@ class Post:
         """Get analytics for all blog posts"""
         conn = get_db_connection()
         try:
+            # Counters are stored on the post and kept up to date by the like/comment writes
             posts_analytics = conn.execute(text('''
                 SELECT 
                     p.id,
                     p.title,
                     p.view_count,
-                    (SELECT COUNT(*) FROM comments WHERE post_id = p.id) AS comment_count,
-                    (SELECT COUNT(*) FROM blog_likes WHERE post_id = p.id) AS total_likes,
-                    (SELECT COUNT(*) FROM blog_likes WHERE post_id = p.id AND is_anonymous = TRUE) AS anonymous_likes,
-                    (SELECT COUNT(*) FROM blog_likes WHERE post_id = p.id AND is_anonymous = FALSE) AS registered_likes,
-                    (SELECT MAX(created_at) FROM blog_likes WHERE post_id = p.id) AS last_like_date,
-                    (SELECT MAX(created_at) FROM comments WHERE post_id = p.id) AS last_comment_date,
+                    p.comment_count,
+                    p.like_count AS total_likes,
+                    p.anonymous_like_count AS anonymous_likes,
+                    p.registered_like_count AS registered_likes,
+                    p.last_like_at AS last_like_date,
+                    p.last_comment_at AS last_comment_date,
                     p.created_at
                 FROM posts p
                 ORDER BY p.created_at DESC
@@ -485,6 +797,86 @@ class Post:
                 pass
             return []  # Return empty list on error
 
+    @staticmethod
+    def load_engagement(post_ids, user_id=None):
+        """
+        Batch load comments, like counts and liked-by-user flags for several posts.
+        Runs a fixed number of queries regardless of how many posts are passed in.
+        Returns a dict keyed by post id with 'comments', 'like_count' and 'user_has_liked'.
+        """
+        engagement = {
+            post_id: {'comments': [], 'like_count': 0, 'user_has_liked': False}
+            for post_id in post_ids
+        }
+        if not post_ids:
+            return engagement
+
+        conn = get_db_connection()
+        try:
+            # All comments for the requested posts in one query
+            comments = conn.execute(text('''
+                SELECT c.*, u.username,
+                       c.liked_by_author,
+                       c.is_anonymous,
+                       c.author_name
+                FROM comments c
+                LEFT JOIN users u ON c.user_id = u.id
+                WHERE c.post_id IN :post_ids
+                ORDER BY c.created_at DESC
+            ''').bindparams(bindparam('post_ids', expanding=True)), {"post_ids": list(post_ids)}).fetchall()
+
+            comments_by_id = {}
+            for comment in comments:
+                comment_dict = Comment._convert_comment_timestamps(dict(comment._mapping))
+                comment_dict['user_has_liked'] = False
+                comments_by_id[comment_dict['id']] = comment_dict
+                if comment_dict['post_id'] in engagement:
+                    engagement[comment_dict['post_id']]['comments'].append(comment_dict)
+
+            # Like counts for all requested posts, stored on the posts themselves
+            like_counts = conn.execute(text('''
+                SELECT id, like_count
+                FROM posts
+                WHERE id IN :post_ids
+            ''').bindparams(bindparam('post_ids', expanding=True)), {"post_ids": list(post_ids)}).fetchall()
+
+            for row in like_counts:
+                if row[0] in engagement:
+                    engagement[row[0]]['like_count'] = row[1]
+
+            if user_id:
+                # Posts the current user has liked
+                liked_posts = conn.execute(text('''
+                    SELECT post_id FROM blog_likes
+                    WHERE user_id = :user_id AND post_id IN :post_ids
+                ''').bindparams(bindparam('post_ids', expanding=True)),
+                    {"user_id": user_id, "post_ids": list(post_ids)}).fetchall()
+
+                for row in liked_posts:
+                    if row[0] in engagement:
+                        engagement[row[0]]['user_has_liked'] = True
+
+                # Comments the current user has liked
+                if comments_by_id:
+                    liked_comments = conn.execute(text('''
+                        SELECT comment_id FROM comment_likes
+                        WHERE user_id = :user_id AND comment_id IN :comment_ids
+                    ''').bindparams(bindparam('comment_ids', expanding=True)),
+                        {"user_id": user_id, "comment_ids": list(comments_by_id)}).fetchall()
+
+                    for row in liked_comments:
+                        if row[0] in comments_by_id:
+                            comments_by_id[row[0]]['user_has_liked'] = True
+
+            return engagement
+        except Exception as e:
+            print(f"Error loading post engagement: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return engagement  # Return defaults on error
+
 class Comment:
     """Comment model for post comment operations"""
     
@@ -499,6 +891,30 @@ class Comment:
                 pass
         return comment_dict
     
+    @staticmethod
+    def _adjust_like_count(conn, comment_id, delta):
+        """
+        Apply likes (delta > 0) or unlikes (delta < 0) to the comment's stored counters
+        and expire the cached pages of its post.
+        Does not commit - the caller commits it together with the comment_likes write.
+        Returns the comment's new like count.
+        """
+        if delta > 0:
+            last_like = 'CURRENT_TIMESTAMP'
+        else:
+            last_like = '(SELECT MAX(created_at) FROM comment_likes WHERE comment_id = :comment_id)'
+        row = conn.execute(text(f'''
+            UPDATE comments SET
+                like_count = like_count + :delta,
+                last_like_at = {last_like}
+            WHERE id = :comment_id
+            RETURNING like_count, post_id
+        '''), {"comment_id": comment_id, "delta": delta}).fetchone()
+        if not row:
+            return None
+        Post._invalidate_pages(conn, row[1])
+        return row[0]
+    
     @staticmethod
     def create(post_id, content, user_id=None):
         """Create a new comment"""
@@ -513,7 +929,8 @@ class Comment:
         else:
             # For PostgreSQL
             comment_id = cursor.fetchone()[0] if cursor.returns_rows else None
-            
+        
+        Post._adjust_comment_count(conn, post_id, 1)
         conn.commit()
         return comment_id
     
@@ -531,7 +948,8 @@ class Comment:
         else:
             # For PostgreSQL
             comment_id = cursor.fetchone()[0] if cursor.returns_rows else None
-            
+        
+        Post._adjust_comment_count(conn, post_id, 1)
         conn.commit()
         return comment_id
     
@@ -541,7 +959,6 @@ class Comment:
         conn = get_db_connection()
         comments = conn.execute(text('''
             SELECT c.*, u.username,
-                   (SELECT COUNT(*) FROM comment_likes WHERE comment_id = c.id) AS like_count,
                    c.liked_by_author,
                    c.is_anonymous,
                    c.author_name
@@ -556,7 +973,11 @@ class Comment:
     def delete(comment_id):
         """Delete a comment by ID"""
         conn = get_db_connection()
-        conn.execute(text('DELETE FROM comments WHERE id = :comment_id'), {"comment_id": comment_id})
+        deleted = conn.execute(
+            text('DELETE FROM comments WHERE id = :comment_id RETURNING post_id'), {"comment_id": comment_id}
+        ).fetchall()
+        for row in deleted:
+            Post._adjust_comment_count(conn, row[0], -1)
         conn.commit()
         return True
         
@@ -565,10 +986,12 @@ class Comment:
         """Toggle the liked_by_author flag for a comment"""
         conn = get_db_connection()
         try:
-            conn.execute(
-                text('UPDATE comments SET liked_by_author = :liked WHERE id = :comment_id'),
+            updated = conn.execute(
+                text('UPDATE comments SET liked_by_author = :liked WHERE id = :comment_id RETURNING post_id'),
                 {"liked": liked, "comment_id": comment_id}
-            )
+            ).fetchall()
+            for row in updated:
+                Post._invalidate_pages(conn, row[0])
             conn.commit()
             return True
         except Exception as e:
@@ -579,53 +1002,127 @@ class BlogLike:
     """Blog like model for managing blog post likes"""
     
     @staticmethod
-    def create(post_id, user_id=None, username=None, is_anonymous=True):
-        """Create a new blog like"""
-        conn = get_db_connection()
+    def _insert(post_id, params, guard=''):
+        """
+        Insert a like for an existing post, bump the post's counters and write the
+        admin notification in one transaction.
+        Duplicates are rejected by the (post_id, user_id) and (post_id, anonymous_id) unique
+        constraints through ON CONFLICT DO NOTHING, so there is no check-then-insert race.
+        On PostgreSQL the insert, counter update and like count read are a single statement.
+        SQLite cannot write inside a CTE, so it runs INSERT ... RETURNING and then the counter update.
+        Returns {'like_id', 'like_count', 'post_title'} (like_id is None if already liked),
+        or None if the post does not exist. Database errors are raised after rolling back.
+        """
+        insert_sql = f'''
+            INSERT INTO blog_likes (post_id, user_id, username, is_anonymous, anonymous_id, ip_address)
+            SELECT id, :user_id, :username, :is_anonymous, :anonymous_id, :ip_address
+            FROM posts WHERE id = :post_id{guard}
+            ON CONFLICT DO NOTHING
+            RETURNING id, post_id
+        '''
+        params = dict(params, post_id=post_id)
         
-        # Check if like already exists for this user/post combination
-        if user_id:
-            existing = conn.execute(
-                text('SELECT id FROM blog_likes WHERE post_id = :post_id AND user_id = :user_id'),
-                {"post_id": post_id, "user_id": user_id}
-            ).fetchone()
-            
-            if existing:
-                return None  # User already liked this post
+        from app import app
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
         
+        conn = get_db_connection()
         try:
-            cursor = conn.execute(
-                text('INSERT INTO blog_likes (post_id, user_id, username, is_anonymous) VALUES (:post_id, :user_id, :username, :is_anonymous)'),
-                {"post_id": post_id, "user_id": user_id, "username": username, "is_anonymous": is_anonymous}
-            )
-            # For SQLite compatibility
-            if hasattr(cursor, 'lastrowid'):
-                like_id = cursor.lastrowid
+            if is_postgres:
+                row = conn.execute(text(f'''
+                    WITH new_like AS ({insert_sql}),
+                    counted AS (
+                        UPDATE posts SET
+                            like_count = like_count + 1,
+                            anonymous_like_count = anonymous_like_count + :anonymous_delta,
+                            registered_like_count = registered_like_count + :registered_delta,
+                            last_like_at = CURRENT_TIMESTAMP
+                        WHERE id IN (SELECT post_id FROM new_like)
+                        RETURNING like_count
+                    )
+                    SELECT (SELECT id FROM new_like) AS like_id,
+                           COALESCE((SELECT like_count FROM counted), p.like_count) AS like_count,
+                           p.title AS post_title
+                    FROM posts p
+                    WHERE p.id = :post_id
+                '''), dict(
+                    params,
+                    anonymous_delta=1 if params["is_anonymous"] else 0,
+                    registered_delta=0 if params["is_anonymous"] else 1
+                )).fetchone()
+                like_id = row[0] if row else None
+                if like_id:
+                    Post._invalidate_pages(conn, post_id)
             else:
-                # For PostgreSQL
-                like_id = cursor.fetchone()[0] if cursor.returns_rows else None
-                
+                inserted = conn.execute(text(insert_sql), params).fetchone()
+                like_id = inserted[0] if inserted else None
+                if like_id:
+                    Post._adjust_like_counts(conn, post_id, params["is_anonymous"], 1)
+                row = conn.execute(
+                    text('SELECT NULL, like_count, title FROM posts WHERE id = :post_id'), {"post_id": post_id}
+                ).fetchone()
+            
+            # The admin notification commits together with the like
+            if like_id and row:
+                Notification.create_post_like_notification(params["username"], params["is_anonymous"], row[2], conn=conn)
+            
             conn.commit()
-            return like_id
+            if not row:
+                return None
+            return {"like_id": like_id, "like_count": row[1], "post_title": row[2]}
         except Exception as e:
             print(f"Error creating blog like: {e}")
-            return None
+            try:
+                conn.rollback()
+            except:
+                pass
+            raise
+    
+    @staticmethod
+    def create(post_id, user_id=None, username=None, is_anonymous=True):
+        """
+        Like a post, once per user.
+        Returns {'like_id', 'like_count', 'post_title'} (like_id is None if the user
+        already liked the post), or None if the post does not exist. Raises on a database error.
+        """
+        return BlogLike._insert(post_id, {
+            "user_id": user_id,
+            "username": username,
+            "is_anonymous": is_anonymous,
+            "anonymous_id": None,
+            "ip_address": None
+        })
     
     @staticmethod
     def delete(like_id=None, post_id=None, user_id=None):
-        """Delete a blog like by ID or post/user combo"""
+        """
+        Delete a blog like by ID or post/user combo.
+        Returns the post's new like count, or None if no like was removed.
+        """
         conn = get_db_connection()
         try:
+            deleted = []
             if like_id:
-                conn.execute(text('DELETE FROM blog_likes WHERE id = :like_id'), {"like_id": like_id})
+                deleted = conn.execute(
+                    text('DELETE FROM blog_likes WHERE id = :like_id RETURNING post_id, is_anonymous'),
+                    {"like_id": like_id}
+                ).fetchall()
             elif post_id and user_id:
-                conn.execute(text('DELETE FROM blog_likes WHERE post_id = :post_id AND user_id = :user_id'), 
-                           {"post_id": post_id, "user_id": user_id})
+                deleted = conn.execute(
+                    text('DELETE FROM blog_likes WHERE post_id = :post_id AND user_id = :user_id RETURNING post_id, is_anonymous'),
+                    {"post_id": post_id, "user_id": user_id}
+                ).fetchall()
+            like_count = None
+            for row in deleted:
+                like_count = Post._adjust_like_counts(conn, row[0], bool(row[1]), -1)
             conn.commit()
-            return True
+            return like_count
         except Exception as e:
             print(f"Error deleting blog like: {e}")
-            return False
+            try:
+                conn.rollback()
+            except:
+                pass
+            return None
     
     @staticmethod
     def has_user_liked(post_id, user_id):
@@ -655,7 +1152,7 @@ class BlogLike:
         try:
             conn = get_db_connection()
             result = conn.execute(
-                text('SELECT COUNT(*) as count FROM blog_likes WHERE post_id = :post_id'),
+                text('SELECT like_count as count FROM posts WHERE id = :post_id'),
                 {"post_id": post_id}
             ).fetchone()
             
@@ -686,7 +1183,7 @@ class BlogLike:
         """Get the total count of all likes in the database"""
         try:
             conn = get_db_connection()
-            result = conn.execute(text('SELECT COUNT(*) as count FROM blog_likes')).fetchone()
+            result = conn.execute(text('SELECT COALESCE(SUM(like_count), 0) as count FROM posts')).fetchone()
             
             # Handle different result row types (dict-like or tuple)
             if result:
@@ -706,96 +1203,125 @@ class BlogLike:
 
     @staticmethod
     def create_anonymous(post_id, username='Anonymous', anonymous_id='', ip_address=None):
-        """Create a new anonymous blog like with tracking"""
-        conn = get_db_connection()
-        
-        # Check if like already exists for this anonymous user
-        if anonymous_id:
-            existing = conn.execute(
-                text('SELECT id FROM blog_likes WHERE post_id = :post_id AND anonymous_id = :anonymous_id'),
-                {"post_id": post_id, "anonymous_id": anonymous_id}
-            ).fetchone()
-            
-            if existing:
-                return None  # Already liked from this anonymous ID
-        
-        # Check if like already exists for this IP (additional check)
+        """
+        Like a post anonymously, once per anonymous ID and once per IP address.
+        Returns the same result as create().
+        """
+        # An IP that already left an anonymous like on this post is turned away inside the INSERT
+        guard = ''
         if ip_address:
-            existing_ip = conn.execute(
-                text('SELECT id FROM blog_likes WHERE post_id = :post_id AND ip_address = :ip_address AND is_anonymous = :is_anonymous'),
-                {"post_id": post_id, "ip_address": ip_address, "is_anonymous": True}
-            ).fetchone()
-            
-            if existing_ip:
-                return None  # Already liked from this IP
-        
-        try:
-            cursor = conn.execute(
-                text('INSERT INTO blog_likes (post_id, user_id, username, is_anonymous, anonymous_id, ip_address) VALUES (:post_id, :user_id, :username, :is_anonymous, :anonymous_id, :ip_address)'),
-                {"post_id": post_id, "user_id": None, "username": username, "is_anonymous": True, "anonymous_id": anonymous_id, "ip_address": ip_address}
-            )
-            # For SQLite compatibility
-            if hasattr(cursor, 'lastrowid'):
-                like_id = cursor.lastrowid
-            else:
-                # For PostgreSQL
-                like_id = cursor.fetchone()[0] if cursor.returns_rows else None
-                
-            conn.commit()
-            return like_id
-        except Exception as e:
-            print(f"Error creating anonymous blog like: {e}")
-            return None
+            guard = '''
+            AND NOT EXISTS (
+                SELECT 1 FROM blog_likes
+                WHERE post_id = :post_id AND ip_address = :ip_address AND is_anonymous = TRUE
+            )'''
+        return BlogLike._insert(post_id, {
+            "user_id": None,
+            "username": username,
+            "is_anonymous": True,
+            # Empty IDs are stored as NULL so they do not collide in the unique constraint
+            "anonymous_id": anonymous_id or None,
+            "ip_address": ip_address
+        }, guard)
 
 class CommentLike:
     """Comment like model for managing comment likes"""
     
     @staticmethod
-    def create(comment_id, user_id):
-        """Create a new comment like"""
-        conn = get_db_connection()
-        
-        # Check if like already exists for this user/comment combination
-        existing = conn.execute(
-            text('SELECT id FROM comment_likes WHERE comment_id = :comment_id AND user_id = :user_id'),
-            {"comment_id": comment_id, "user_id": user_id}
-        ).fetchone()
+    def create(comment_id, user_id, username=None):
+        """
+        Like a comment, once per user (enforced by the (comment_id, user_id) unique constraint).
+        The admin notification is written in the same transaction.
+        On PostgreSQL the insert, counter update and like count read are a single statement.
+        Returns {'like_id', 'like_count', 'post_title'} (like_id is None if already liked),
+        or None if the comment does not exist. Database errors are raised after rolling back.
+        """
+        insert_sql = '''
+            INSERT INTO comment_likes (comment_id, user_id)
+            SELECT id, :user_id FROM comments WHERE id = :comment_id
+            ON CONFLICT DO NOTHING
+            RETURNING id, comment_id
+        '''
+        params = {"comment_id": comment_id, "user_id": user_id}
         
-        if existing:
-            return None  # User already liked this comment
+        from app import app
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
         
+        conn = get_db_connection()
         try:
-            cursor = conn.execute(
-                text('INSERT INTO comment_likes (comment_id, user_id) VALUES (:comment_id, :user_id)'),
-                {"comment_id": comment_id, "user_id": user_id}
-            )
-            # For SQLite compatibility
-            if hasattr(cursor, 'lastrowid'):
-                like_id = cursor.lastrowid
+            if is_postgres:
+                row = conn.execute(text(f'''
+                    WITH new_like AS ({insert_sql}),
+                    counted AS (
+                        UPDATE comments SET
+                            like_count = like_count + 1,
+                            last_like_at = CURRENT_TIMESTAMP
+                        WHERE id IN (SELECT comment_id FROM new_like)
+                        RETURNING like_count
+                    )
+                    SELECT (SELECT id FROM new_like) AS like_id,
+                           COALESCE((SELECT like_count FROM counted), c.like_count) AS like_count,
+                           p.title AS post_title,
+                           c.post_id
+                    FROM comments c
+                    LEFT JOIN posts p ON p.id = c.post_id
+                    WHERE c.id = :comment_id
+                '''), params).fetchone()
+                like_id = row[0] if row else None
+                if like_id:
+                    Post._invalidate_pages(conn, row[3])
             else:
-                # For PostgreSQL
-                like_id = cursor.fetchone()[0] if cursor.returns_rows else None
-                
+                inserted = conn.execute(text(insert_sql), params).fetchone()
+                like_id = inserted[0] if inserted else None
+                if like_id:
+                    Comment._adjust_like_count(conn, comment_id, 1)
+                row = conn.execute(text('''
+                    SELECT NULL, c.like_count, p.title
+                    FROM comments c
+                    LEFT JOIN posts p ON p.id = c.post_id
+                    WHERE c.id = :comment_id
+                '''), {"comment_id": comment_id}).fetchone()
+            
+            # The admin notification commits together with the like
+            if like_id and row:
+                Notification.create_comment_like_notification(username, False, row[2] or "Unknown Post", conn=conn)
+            
             conn.commit()
-            return like_id
+            if not row:
+                return None
+            return {"like_id": like_id, "like_count": row[1], "post_title": row[2]}
         except Exception as e:
             print(f"Error creating comment like: {e}")
-            return None
+            try:
+                conn.rollback()
+            except:
+                pass
+            raise
     
     @staticmethod
     def delete(comment_id, user_id):
-        """Delete a comment like by comment_id and user_id"""
+        """
+        Delete a comment like by comment_id and user_id.
+        Returns the comment's new like count, or None if no like was removed.
+        """
         conn = get_db_connection()
         try:
-            conn.execute(
-                text('DELETE FROM comment_likes WHERE comment_id = :comment_id AND user_id = :user_id'),
+            deleted = conn.execute(
+                text('DELETE FROM comment_likes WHERE comment_id = :comment_id AND user_id = :user_id RETURNING id'),
                 {"comment_id": comment_id, "user_id": user_id}
-            )
+            ).fetchall()
+            like_count = None
+            if deleted:
+                like_count = Comment._adjust_like_count(conn, comment_id, -len(deleted))
             conn.commit()
-            return True
+            return like_count
         except Exception as e:
             print(f"Error deleting comment like: {e}")
-            return False
+            try:
+                conn.rollback()
+            except:
+                pass
+            return None
     
     @staticmethod
     def has_user_liked(comment_id, user_id):
@@ -814,7 +1340,7 @@ class CommentLike:
         try:
             conn = get_db_connection()
             result = conn.execute(
-                text('SELECT COUNT(*) as count FROM comment_likes WHERE comment_id = :comment_id'),
+                text('SELECT like_count as count FROM comments WHERE id = :comment_id'),
                 {"comment_id": comment_id}
             ).fetchone()
             
@@ -859,12 +1385,86 @@ class CVDownload:
             else:
                 # For PostgreSQL
                 download_id = cursor.fetchone()[0] if cursor.returns_rows else None
-                
+            
+            SiteCounter.increment(conn, SiteCounter.CV_DOWNLOADS_VERSION)
             conn.commit()
             return download_id
         except Exception as e:
             print(f"Error recording CV download: {e}")
             return None
+
+    # Rows per INSERT statement when writing a batch of queued downloads
+    INSERT_CHUNK_SIZE = 100
+
+    @staticmethod
+    def record_downloads(downloads):
+        """
+        Record a batch of CV downloads using multi-row INSERTs.
+        Each download is a dict with reason, user_id, username, ip_address, email,
+        is_verified and created_at. Their admin notifications (one batched insert)
+        and the cv_downloads_version bump are written in the same transaction.
+        Returns the number of rows written.
+        """
+        if not downloads:
+            return 0
+        conn = get_db_connection()
+        try:
+            now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            for start in range(0, len(downloads), CVDownload.INSERT_CHUNK_SIZE):
+                chunk = downloads[start:start + CVDownload.INSERT_CHUNK_SIZE]
+                values = []
+                params = {}
+                for i, download in enumerate(chunk):
+                    values.append(f"(:user_id_{i}, :reason_{i}, :is_anonymous_{i}, :ip_address_{i}, "
+                                  f":email_{i}, :is_verified_{i}, :created_at_{i})")
+                    params.update({
+                        f"user_id_{i}": download.get("user_id"),
+                        f"reason_{i}": download["reason"],
+                        f"is_anonymous_{i}": download.get("user_id") is None,
+                        f"ip_address_{i}": download.get("ip_address"),
+                        f"email_{i}": download.get("email"),
+                        f"is_verified_{i}": download.get("is_verified", False),
+                        f"created_at_{i}": download.get("created_at") or now
+                    })
+                conn.execute(
+                    text('INSERT INTO cv_downloads (user_id, reason, is_anonymous, ip_address, email, is_verified, created_at) VALUES '
+                         + ', '.join(values)),
+                    params
+                )
+
+            Notification._insert(conn, [{
+                "type": Notification.TYPE_CV_DOWNLOAD,
+                "message": Notification.cv_download_message(
+                    download.get("username"), download.get("is_anonymous", True), download["reason"]),
+                "user_id": None,
+                "username": download.get("username"),
+                "is_anonymous": download.get("is_anonymous", True),
+                "created_at": download.get("created_at") or now
+            } for download in downloads])
+            SiteCounter.increment(conn, SiteCounter.CV_DOWNLOADS_VERSION)
+            conn.commit()
+
+            # Let notification streams in this process see them without waiting for the next poll
+            from app import notification_hub
+            notification_hub.publish()
+            return len(downloads)
+        except Exception as e:
+            print(f"Error recording CV downloads: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 0
+
+    @staticmethod
+    def get_total_count():
+        """Get the total number of CV downloads"""
+        conn = get_db_connection()
+        try:
+            return conn.execute(text('SELECT COUNT(*) FROM cv_downloads')).scalar() or 0
+        except Exception as e:
+            print(f"Error getting CV download count: {e}")
+            return 0
     
     @staticmethod
     def get_analytics():
@@ -981,223 +1581,555 @@ class CVDownload:
 class VisitorStat:
     """Visitor statistics model for tracking page views"""
     
+    # Page categories stored in visitor_stats.page_category; only 'page' counts as a real page view
+    CATEGORY_PAGE = 'page'
+    CATEGORY_BOT = 'bot'
+    CATEGORY_SYSTEM = 'system'
+    CATEGORY_ASSET = 'asset'
+    CATEGORY_API = 'api'
+    CATEGORY_ADMIN = 'admin'
+    CATEGORY_ACTION = 'action'
+    
+    # Checked in order; the first matching pattern decides the category
+    PAGE_CATEGORY_PATTERNS = [
+        # WordPress probes and other scanner traffic (same patterns the bot filter blocks)
+        (CATEGORY_BOT, BOT_PATTERN),
+        (CATEGORY_SYSTEM, re.compile(
+            r'^/(robots\.txt|sitemap\.xml|favicon\.ico)$|^/apple-touch-icon|^/\.well-known/', re.IGNORECASE)),
+        (CATEGORY_ASSET, re.compile(r'^/static/')),
+        (CATEGORY_API, re.compile(r'^/api/')),
+        (CATEGORY_ADMIN, re.compile(r'^/(analytics|admin)')),
+        # Form posts, like buttons and other non-page endpoints
+        (CATEGORY_ACTION, re.compile(
+            r'^/post/(like|unlike|anonymous_like)/|^/(comment|delete|edit|add|update)'
+            r'|^/(download_cv|send-verification-link|verify-download|logout)$')),
+    ]
+    
+    # Requests in these categories are not recorded as visits at all
+    UNTRACKED_CATEGORIES = (CATEGORY_BOT, CATEGORY_SYSTEM, CATEGORY_ASSET, CATEGORY_API, CATEGORY_ADMIN, CATEGORY_ACTION)
+    
+    @staticmethod
+    def classify_page(page_path):
+        """Work out (page_category, is_bot) for a visited path"""
+        for category, pattern in VisitorStat.PAGE_CATEGORY_PATTERNS:
+            if pattern.search(page_path or ''):
+                return category, category == VisitorStat.CATEGORY_BOT
+        return VisitorStat.CATEGORY_PAGE, False
+    
+    # Rows per INSERT statement - keeps bound parameters well under SQLite's limit
+    INSERT_CHUNK_SIZE = 100
+    
+    # Per-worker cache of IPs already in known_visitors, so repeat visitors cost no extra query
+    known_ips = TTLCache(max_size=50000, ttl=6 * 3600)
+    
+    @staticmethod
+    def _clean_ip(ip_address):
+        """Keep only the client IP from a forwarded-for list and fit it into the column"""
+        # Clean up IP address - take only the first part if there are multiple IPs
+        if ip_address and ',' in ip_address:
+            # Split and take first IP, then trim whitespace
+            ip_address = ip_address.split(',')[0].strip()
+        
+        # Truncate IP if it's too long for the database
+        if ip_address and len(ip_address) > 45:
+            ip_address = ip_address[:45]
+        
+        return ip_address or 'unknown'
+    
+    @staticmethod
+    def _register_visitors(conn, ips):
+        """
+        Add IPs to known_visitors and return the ones that were not there before.
+        Cached IPs cost nothing; the rest are inserted with a single
+        insert-if-absent statement. Does not commit.
+        """
+        unknown = [ip for ip in ips if ip not in VisitorStat.known_ips]
+        new_ips = set()
+        
+        for start in range(0, len(unknown), VisitorStat.INSERT_CHUNK_SIZE):
+            chunk = unknown[start:start + VisitorStat.INSERT_CHUNK_SIZE]
+            values = ', '.join(f"(:ip_{i})" for i in range(len(chunk)))
+            params = {f"ip_{i}": ip for i, ip in enumerate(chunk)}
+            inserted = conn.execute(text(
+                f'INSERT INTO known_visitors (ip_address) VALUES {values} '
+                'ON CONFLICT (ip_address) DO NOTHING RETURNING ip_address'
+            ), params).fetchall()
+            new_ips.update(row[0] for row in inserted)
+        
+        return new_ips
+    
     @staticmethod
     def record_visit(ip_address, page_visited, country=None):
-        """Record a page visit"""
+        """Record a single page visit synchronously. Returns the number of rows written"""
+        written, _ = VisitorStat.record_visits([{
+            "ip_address": ip_address,
+            "page_visited": page_visited,
+            "country": country
+        }])
+        return written
+    
+    @staticmethod
+    def record_visits(visits):
+        """
+        Record a batch of page visits using multi-row INSERTs.
+        Each visit is a dict with ip_address, page_visited and optionally country and created_at.
+        The total_views counter is bumped by the rows that are page views (the same
+        rows get_total_views counts), and any view milestone notifications it
+        crosses are written, in the same transaction.
+        Returns (rows written, total views after this batch).
+        """
+        rows = []
+        for visit in visits:
+            page_visited = visit.get('page_visited') or '/'
+            page_category, is_bot = VisitorStat.classify_page(page_visited)
+            rows.append({
+                "ip_address": VisitorStat._clean_ip(visit.get('ip_address')),
+                "country": visit.get('country'),
+                "page_visited": page_visited,
+                "page_category": page_category,
+                "is_bot": is_bot,
+                "created_at": visit.get('created_at') or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            })
+        if not rows:
+            return 0, None
+        
         conn = get_db_connection()
         try:
-            # Clean up IP address - take only the first part if there are multiple IPs
-            if ip_address and ',' in ip_address:
-                # Split and take first IP, then trim whitespace
-                ip_address = ip_address.split(',')[0].strip()
+            new_ips = VisitorStat._register_visitors(conn, {row["ip_address"] for row in rows})
+            for row in rows:
+                # Only the first visit of a new IP in this batch counts as unique
+                row["is_unique"] = row["ip_address"] in new_ips
+                new_ips.discard(row["ip_address"])
+            
+            for start in range(0, len(rows), VisitorStat.INSERT_CHUNK_SIZE):
+                chunk = rows[start:start + VisitorStat.INSERT_CHUNK_SIZE]
+                values = []
+                params = {}
+                for i, row in enumerate(chunk):
+                    values.append(f"(:ip_address_{i}, :country_{i}, :page_visited_{i}, :page_category_{i}, "
+                                  f":is_bot_{i}, :is_unique_{i}, :created_at_{i})")
+                    for key, value in row.items():
+                        params[f"{key}_{i}"] = value
+                conn.execute(
+                    text('INSERT INTO visitor_stats (ip_address, country, page_visited, page_category, is_bot, is_unique, created_at) VALUES '
+                         + ', '.join(values)),
+                    params
+                )
+            
+            VisitorStat._update_sketches(conn, rows)
+            page_views = sum(1 for row in rows if row["page_category"] == VisitorStat.CATEGORY_PAGE)
+            total_views = SiteCounter.increment(conn, SiteCounter.TOTAL_VIEWS, page_views)
+            
+            # Milestone notifications commit together with the counter that reached them
+            for count in range(total_views - page_views + 1, total_views + 1):
+                if Notification.is_view_milestone(count):
+                    Notification.create_view_milestone_notification(count, conn=conn)
             
-            # Truncate IP if it's too long for the database
-            if ip_address and len(ip_address) > 45:
-                ip_address = ip_address[:45]
+            conn.commit()
             
-            # Check if this IP has visited before
-            is_unique = True  # Use boolean True instead of 1
+            # Only cache IPs once they are committed to known_visitors
+            for row in rows:
+                VisitorStat.known_ips.set(row["ip_address"], True)
+            return len(rows), total_views
+        except Exception as e:
+            print(f"Error recording visitor stats: {e}")
             try:
-                existing = conn.execute(
-                    text('SELECT id FROM visitor_stats WHERE ip_address = :ip_address'),
-                    {"ip_address": ip_address}
-                ).fetchone()
-                
-                if existing:
-                    is_unique = False  # Use boolean False instead of 0
-            except Exception as e:
-                print(f"Error checking for existing visitor: {e}")
-                conn.rollback()  # Important: roll back on error
-                is_unique = False  # Use boolean False instead of 0
+                conn.rollback()
+            except:
+                pass
+            return 0, None
+    
+    @staticmethod
+    def _update_sketches(conn, rows):
+        """
+        Add the page views in rows to the per-day unique visitor sketches (no commit).
+        The sketch row is locked while it is merged so concurrent workers do not lose updates.
+        """
+        ips_by_day = {}
+        for row in rows:
+            if row["page_category"] == VisitorStat.CATEGORY_PAGE:
+                ips_by_day.setdefault(str(row["created_at"])[:10], set()).add(row["ip_address"])
+        for day, ips in ips_by_day.items():
+            sketch = HyperLogLog()
+            for ip in ips:
+                sketch.add(ip)
+            VisitorStat.merge_sketch(conn, day, sketch)
+    
+    @staticmethod
+    def merge_sketch(conn, day, sketch):
+        """
+        Merge a sketch into the stored one for a day, creating it if there is none (no commit).
+        The row is locked while it is merged so concurrent workers do not lose updates.
+        """
+        from app import app
+        is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+        lock_clause = ' FOR UPDATE' if is_postgres else ''
+        
+        conn.execute(
+            text('INSERT INTO visitor_daily_sketches (day, sketch) VALUES (:day, :sketch) ON CONFLICT (day) DO NOTHING'),
+            {"day": day, "sketch": sketch.to_bytes()}
+        )
+        stored = HyperLogLog.from_bytes(conn.execute(
+            text('SELECT sketch FROM visitor_daily_sketches WHERE day = :day' + lock_clause),
+            {"day": day}
+        ).scalar())
+        registers = bytes(stored.registers)
+        stored.merge(sketch)
+        # Returning visitors usually leave the sketch unchanged, so skip the write
+        if stored.registers != registers:
+            conn.execute(
+                text('UPDATE visitor_daily_sketches SET sketch = :sketch WHERE day = :day'),
+                {"day": day, "sketch": stored.to_bytes()}
+            )
+    
+    @staticmethod
+    def sketches_from_stats(conn, batch_size=5000):
+        """Build a unique visitor sketch per day ('YYYY-MM-DD') from the page views in visitor_stats"""
+        sketches = {}
+        last_id = 0
+        while True:
+            rows = conn.execute(text('''
+                SELECT id, ip_address, created_at FROM visitor_stats
+                WHERE page_category = 'page' AND id > :last_id
+                ORDER BY id
+                LIMIT :batch_size
+            '''), {"last_id": last_id, "batch_size": batch_size}).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                sketches.setdefault(str(row[2])[:10], HyperLogLog()).add(row[1])
+            last_id = rows[-1][0]
+        return sketches
+    
+    @staticmethod
+    def rebuild_sketches(batch_size=5000):
+        """
+        Recompute the daily unique visitor sketches from visitor_stats.
+        Each day is merged into the stored sketch and committed on its own, so
+        visits that live workers add meanwhile are kept. Returns the number of days written.
+        """
+        conn = get_db_connection()
+        try:
+            sketches = VisitorStat.sketches_from_stats(conn, batch_size)
+            for day in sorted(sketches):
+                VisitorStat.merge_sketch(conn, day, sketches[day])
+                conn.commit()
+            return len(sketches)
+        except Exception as e:
+            print(f"Error rebuilding visitor sketches: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 0
+    
+    @staticmethod
+    def count_unique_visitors(start_day=None, end_day=None, exact=False):
+        """
+        Count unique visitors (by IP, page views only) between two dates, inclusive.
+        By default the estimate comes from merging the daily HyperLogLog sketches;
+        exact=True runs COUNT(DISTINCT ip_address) over visitor_stats instead, for audits.
+        """
+        conn = get_db_connection()
+        try:
+            conditions = []
+            params = {}
+            if exact:
+                conditions.append("page_category = 'page'")
+                if start_day:
+                    conditions.append("created_at >= :start")
+                    params["start"] = VisitorStat._day_bounds(start_day)[0]
+                if end_day:
+                    conditions.append("created_at < :end")
+                    params["end"] = VisitorStat._day_bounds(end_day)[1]
+                return conn.execute(
+                    text('SELECT COUNT(DISTINCT ip_address) FROM visitor_stats WHERE ' + ' AND '.join(conditions)),
+                    params
+                ).scalar() or 0
             
-            # Now insert the visitor record
+            if start_day:
+                conditions.append("day >= :start")
+                params["start"] = start_day.strftime('%Y-%m-%d')
+            if end_day:
+                conditions.append("day <= :end")
+                params["end"] = end_day.strftime('%Y-%m-%d')
+            query = 'SELECT sketch FROM visitor_daily_sketches'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            
+            merged = None
+            for row in conn.execute(text(query), params):
+                sketch = HyperLogLog.from_bytes(row[0])
+                merged = sketch if merged is None else merged.merge(sketch)
+            return merged.count() if merged else 0
+        except Exception as e:
+            print(f"Error counting unique visitors: {e}")
             try:
-                # For PostgreSQL, use RETURNING to get the ID
-                is_postgres = False
-                try:
-                    from app import app
-                    is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
-                except:
-                    pass
-
-                if is_postgres:
-                    # PostgreSQL version with RETURNING
-                    result = conn.execute(
-                        text('INSERT INTO visitor_stats (ip_address, country, page_visited, is_unique) VALUES (:ip_address, :country, :page_visited, :is_unique) RETURNING id'),
-                        {"ip_address": ip_address, "country": country, "page_visited": page_visited, "is_unique": is_unique}
-                    ).fetchone()
-                    
-                    visitor_id = result[0] if result else None
-                else:
-                    # SQLite version
-                    cursor = conn.execute(
-                        text('INSERT INTO visitor_stats (ip_address, country, page_visited, is_unique) VALUES (:ip_address, :country, :page_visited, :is_unique)'),
-                        {"ip_address": ip_address, "country": country, "page_visited": page_visited, "is_unique": is_unique}
-                    )
-                    visitor_id = cursor.lastrowid
+                conn.rollback()
+            except:
+                pass
+            return 0
+    
+    @staticmethod
+    def classify_rows(conn, rows):
+        """Set page_category and is_bot on a list of (id, page_visited) visitor_stats rows (no commit)"""
+        # Group ids by classification so each batch needs only a few UPDATEs
+        groups = {}
+        for row in rows:
+            groups.setdefault(VisitorStat.classify_page(row[1]), []).append(row[0])
+        for (page_category, is_bot), ids in groups.items():
+            conn.execute(
+                text('UPDATE visitor_stats SET page_category = :page_category, is_bot = :is_bot WHERE id IN :ids')
+                .bindparams(bindparam('ids', expanding=True)),
+                {"page_category": page_category, "is_bot": is_bot, "ids": ids}
+            )
+    
+    @staticmethod
+    def backfill_categories(batch_size=1000):
+        """
+        Classify visitor_stats rows recorded before page_category/is_bot existed.
+        Works through the table in id order, batch_size rows at a time. Returns the number of rows updated.
+        """
+        conn = get_db_connection()
+        updated = 0
+        last_id = 0
+        try:
+            while True:
+                rows = conn.execute(text('''
+                    SELECT id, page_visited FROM visitor_stats
+                    WHERE page_category IS NULL AND id > :last_id
+                    ORDER BY id
+                    LIMIT :batch_size
+                '''), {"last_id": last_id, "batch_size": batch_size}).fetchall()
+                if not rows:
+                    break
                 
+                VisitorStat.classify_rows(conn, rows)
                 conn.commit()
-                print(f"Recorded visit with ID: {visitor_id}")
-                return visitor_id
-            except Exception as e:
-                print(f"Error recording visitor stat: {e}")
-                conn.rollback()  # Important: roll back on error
-                return None
+                
+                updated += len(rows)
+                last_id = rows[-1][0]
+            return updated
         except Exception as e:
-            print(f"Error in record_visit: {e}")
+            print(f"Error backfilling visit categories: {e}")
             try:
-                conn.rollback()  # Final fallback
+                conn.rollback()
             except:
                 pass
-            return None
+            return updated
+    
+    # How long after midnight a day is left open for late buffered visits before it is rolled up
+    ROLLUP_GRACE = timedelta(minutes=10)
     
     @staticmethod
-    def get_analytics():
-        """Get visitor analytics"""
+    def _day_bounds(day):
+        """Get the [start, end) created_at range for a date"""
+        return day.strftime('%Y-%m-%d 00:00:00'), (day + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00')
+    
+    @staticmethod
+    def _to_date(value):
+        """Read a DATE column value (date in PostgreSQL, text in SQLite) as a date"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    
+    @staticmethod
+    def _last_rolled_day(conn):
+        """Get the last day stored in visitor_daily_stats, or None if nothing has been rolled up"""
+        value = conn.execute(text('SELECT MAX(day) FROM visitor_daily_stats')).scalar()
+        return VisitorStat._to_date(value) if value else None
+    
+    @staticmethod
+    def rollup_days(rebuild=False):
+        """
+        Aggregate finished days of page views into visitor_daily_stats and visitor_daily_pages.
+        Every day gets a row (even with zero views) so MAX(day) marks how far the rollup has got.
+        Rows of the day that have no page_category yet are classified first. A day another
+        worker has already rolled up is left as it is.
+        With rebuild=True the rollup tables are cleared and recomputed from visitor_stats.
+        Returns the number of days rolled up.
+        """
         conn = get_db_connection()
+        rolled = 0
         try:
-            # Check if we're using PostgreSQL or SQLite
-            from app import app
-            is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
+            if rebuild:
+                conn.execute(text('DELETE FROM visitor_daily_pages'))
+                conn.execute(text('DELETE FROM visitor_daily_stats'))
+                conn.commit()
             
-            # Define patterns to exclude (bot traffic, WordPress scans, etc.)
-            excluded_patterns = [
-                '/wp-admin/%',
-                '/wordpress/%',
-                '/wp-includes/%',
-                '/wp-content/%',
-                '/wp/%',
-                '/cms/%',
-                '/shop/%',
-                '/site/%',
-                '/test/%',
-                '/2019/%',
-                '/wp1/%',
-                '/blog/wp-%',
-                '%.php',
-                '/xmlrpc.php',
-                '/robots.txt',
-                '/sitemap.xml',
-                '/favicon.ico',
-                '/apple-touch-icon%',
-                '/.well-known/%',
-                '/api/%',
-                '/static/%',
-                '/analytics%',
-                '/admin%',
-                '/post/like/%',
-                '/post/unlike/%',
-                '/comment%',
-                '/delete%',
-                '/edit%',
-                '/add%',
-                '/update%',
-                '/download_cv',
-                '/send-verification-link',
-                '/verify-download',
-                '/post/anonymous_like/%',
-                '/logout'
-            ]
+            # Only roll up days whose grace period has passed
+            last_day = (datetime.utcnow() - VisitorStat.ROLLUP_GRACE).date() - timedelta(days=1)
             
-            # Build the WHERE clause to exclude unwanted patterns
-            where_conditions = []
-            for pattern in excluded_patterns:
-                where_conditions.append(f"page_visited NOT LIKE '{pattern}'")
+            last_rolled = VisitorStat._last_rolled_day(conn)
+            if last_rolled:
+                day = last_rolled + timedelta(days=1)
+            else:
+                first_visit = conn.execute(text('SELECT MIN(created_at) FROM visitor_stats')).scalar()
+                day = VisitorStat._to_date(first_visit) if first_visit else last_day
             
-            where_clause = " AND ".join(where_conditions)
+            while day <= last_day:
+                start, end = VisitorStat._day_bounds(day)
+                params = {"start": start, "end": end}
+                
+                unclassified = conn.execute(text('''
+                    SELECT id, page_visited FROM visitor_stats
+                    WHERE page_category IS NULL AND created_at >= :start AND created_at < :end
+                '''), params).fetchall()
+                VisitorStat.classify_rows(conn, unclassified)
+                
+                totals = conn.execute(text('''
+                    SELECT COUNT(*), COUNT(DISTINCT ip_address)
+                    FROM visitor_stats
+                    WHERE page_category = 'page' AND created_at >= :start AND created_at < :end
+                '''), params).fetchone()
+                pages = conn.execute(text('''
+                    SELECT page_visited, COUNT(*)
+                    FROM visitor_stats
+                    WHERE page_category = 'page' AND created_at >= :start AND created_at < :end
+                    GROUP BY page_visited
+                '''), params).fetchall()
+                
+                day_str = day.strftime('%Y-%m-%d')
+                conn.execute(
+                    text('INSERT INTO visitor_daily_stats (day, views, unique_visitors) VALUES (:day, :views, :unique_visitors) '
+                         'ON CONFLICT (day) DO NOTHING'),
+                    {"day": day_str, "views": totals[0] or 0, "unique_visitors": totals[1] or 0}
+                )
+                for page in pages:
+                    conn.execute(
+                        text('INSERT INTO visitor_daily_pages (day, page_visited, views) VALUES (:day, :page_visited, :views) '
+                             'ON CONFLICT (day, page_visited) DO NOTHING'),
+                        {"day": day_str, "page_visited": page[0], "views": page[1]}
+                    )
+                conn.commit()
+                
+                rolled += 1
+                day += timedelta(days=1)
+            return rolled
+        except Exception as e:
+            print(f"Error rolling up visitor stats: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return rolled
+    
+    @staticmethod
+    def _raw_since(conn):
+        """Start of the raw rows not yet covered by the daily rollups"""
+        last_rolled = VisitorStat._last_rolled_day(conn)
+        if last_rolled:
+            return VisitorStat._day_bounds(last_rolled + timedelta(days=1))[0]
+        return '0001-01-01 00:00:00'
+    
+    @staticmethod
+    def _count_page_views(conn, raw_since):
+        """Total page views: rolled-up days plus raw page rows since raw_since"""
+        rolled_views = conn.execute(text('SELECT SUM(views) FROM visitor_daily_stats')).scalar() or 0
+        raw_views = conn.execute(
+            text("SELECT COUNT(*) FROM visitor_stats WHERE page_category = 'page' AND created_at >= :raw_since"),
+            {"raw_since": raw_since}
+        ).scalar() or 0
+        return int(rolled_views) + raw_views
+    
+    @staticmethod
+    def get_total_views():
+        """
+        Total page views (excluding bots, assets and API calls) without the rest
+        of get_analytics. Does not roll up finished days first; the raw tail is
+        counted instead, so the result is the same.
+        """
+        conn = get_db_connection()
+        try:
+            return VisitorStat._count_page_views(conn, VisitorStat._raw_since(conn))
+        except Exception as e:
+            print(f"Error getting total views: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 0
+    
+    @staticmethod
+    def get_analytics(exact=False):
+        """
+        Get visitor analytics from the daily rollups plus the raw rows
+        recorded since the last rolled-up day.
+        Unique visitors are estimated from the daily sketches unless exact=True.
+        """
+        # Catch up on any finished days first; normally this is at most one day
+        VisitorStat.rollup_days()
+        
+        conn = get_db_connection()
+        try:
+            raw_since = VisitorStat._raw_since(conn)
+            
+            # Only count real page views; bots, assets, API calls and actions are classified at ingest
+            raw_where = "page_category = 'page' AND created_at >= :raw_since"
+            raw_params = {"raw_since": raw_since}
             
             # Total page views (excluding bot traffic)
-            total_views_query = f"SELECT COUNT(*) as count FROM visitor_stats WHERE {where_clause}"
-            result = conn.execute(text(total_views_query)).fetchone()
-            total_views = 0
-            try:
-                if hasattr(result, "_mapping"):
-                    total_views = result._mapping["count"]
-                else:
-                    total_views = result[0]
-            except Exception as e:
-                print(f"Error getting total views: {e}")
+            total_views = VisitorStat._count_page_views(conn, raw_since)
             
             # Unique visitors (excluding bot traffic)
-            unique_visitors_query = f"SELECT COUNT(DISTINCT ip_address) as count FROM visitor_stats WHERE {where_clause}"
-            result = conn.execute(text(unique_visitors_query)).fetchone()
-            unique_visitors = 0
-            try:
-                if hasattr(result, "_mapping"):
-                    unique_visitors = result._mapping["count"]
-                else:
-                    unique_visitors = result[0]
-            except Exception as e:
-                print(f"Error getting unique visitors: {e}")
+            unique_visitors = VisitorStat.count_unique_visitors(exact=exact)
             
-            # Most visited pages with better categorization (excluding bot traffic)
-            popular_pages_query = f"""
-                SELECT 
-                    page_visited, 
-                    COUNT(*) as count
+            # Most visited pages, merged from the rollups and the recent raw rows
+            page_counts = {}
+            page_rows = conn.execute(text('''
+                SELECT page_visited, SUM(views) as count
+                FROM visitor_daily_pages
+                GROUP BY page_visited
+            ''')).fetchall()
+            raw_page_rows = conn.execute(text(f"""
+                SELECT page_visited, COUNT(*) as count
                 FROM visitor_stats
-                WHERE {where_clause}
+                WHERE {raw_where}
                 GROUP BY page_visited
-                ORDER BY count DESC
-                LIMIT 10
-            """
-            popular_pages_rows = conn.execute(text(popular_pages_query)).fetchall()
+            """), raw_params).fetchall()
+            for row in list(page_rows) + list(raw_page_rows):
+                page_counts[row[0]] = page_counts.get(row[0], 0) + int(row[1] or 0)
             
             popular_pages = []
-            for row in popular_pages_rows:
+            for page_path, count in sorted(page_counts.items(), key=lambda item: item[1], reverse=True)[:10]:
                 try:
-                    if hasattr(row, "_mapping"):
-                        page_data = dict(row._mapping)
-                    else:
-                        page_data = {"page_visited": row[0], "count": row[1]}
-                    
                     # Improve page names for better readability
-                    page_path = page_data["page_visited"]
-                    page_name = VisitorStat._get_friendly_page_name(page_path)
-                    page_data["page_name"] = page_name
-                    page_data["page_path"] = page_path
-                    
-                    popular_pages.append(page_data)
+                    popular_pages.append({
+                        "page_visited": page_path,
+                        "count": count,
+                        "page_name": VisitorStat._get_friendly_page_name(page_path),
+                        "page_path": page_path
+                    })
                 except Exception as e:
                     print(f"Error processing popular page: {e}")
             
             # Views over time (last 7 days, excluding bot traffic)
-            if is_postgres:
-                # PostgreSQL date formatting
-                views_by_day_query = f"""
-                    SELECT 
-                        date(created_at) as date,
-                        COUNT(*) as count
-                    FROM visitor_stats
-                    WHERE created_at >= NOW() - INTERVAL '7 days'
-                        AND {where_clause}
-                    GROUP BY date
-                    ORDER BY date
-                """
-            else:
-                # SQLite date formatting
-                views_by_day_query = f"""
-                    SELECT 
-                        date(created_at) as date,
-                        COUNT(*) as count
-                    FROM visitor_stats
-                    WHERE created_at >= date('now', '-7 days')
-                        AND {where_clause}
-                    GROUP BY date
-                    ORDER BY date
-                """
+            week_start = datetime.utcnow().date() - timedelta(days=7)
+            views_by_date = {}
+            daily_rows = conn.execute(
+                text('SELECT day, views FROM visitor_daily_stats WHERE day >= :week_start ORDER BY day'),
+                {"week_start": week_start.strftime('%Y-%m-%d')}
+            ).fetchall()
+            for row in daily_rows:
+                views_by_date[VisitorStat._to_date(row[0]).strftime('%Y-%m-%d')] = row[1]
             
-            views_by_day_rows = conn.execute(text(views_by_day_query)).fetchall()
+            raw_day_rows = conn.execute(text(f"""
+                SELECT date(created_at) as date, COUNT(*) as count
+                FROM visitor_stats
+                WHERE {raw_where} AND created_at >= :week_since
+                GROUP BY date(created_at)
+            """), dict(raw_params, week_since=VisitorStat._day_bounds(week_start)[0])).fetchall()
+            for row in raw_day_rows:
+                day_str = VisitorStat._to_date(row[0]).strftime('%Y-%m-%d')
+                views_by_date[day_str] = views_by_date.get(day_str, 0) + row[1]
             
-            views_by_day = []
-            for row in views_by_day_rows:
-                try:
-                    if hasattr(row, "_mapping"):
-                        views_by_day.append(dict(row._mapping))
-                    else:
-                        views_by_day.append({"date": row[0], "count": row[1]})
-                except Exception as e:
-                    print(f"Error processing daily views: {e}")
+            views_by_day = [
+                {"date": day_str, "count": count}
+                for day_str, count in sorted(views_by_date.items())
+                if count
+            ]
             
             return {
                 'total_views': total_views,
@@ -1259,6 +2191,64 @@ class VisitorStat:
             clean_path = page_path.strip('/').replace('/', ' > ').title()
             return clean_path if clean_path else 'Unknown Page'
 
+class SiteCounter:
+    """Persistent named counters (e.g. total page views) kept in the site_counters table"""
+    
+    TOTAL_VIEWS = 'total_views'
+    NOTIFICATIONS_VERSION = 'notifications_version'
+    CV_DOWNLOADS_VERSION = 'cv_downloads_version'
+    # Prefix of the page cache tag versions (see Post.page_tags)
+    PAGE_TAG_PREFIX = 'page_tag:'
+    
+    @staticmethod
+    def increment(conn, name, amount=1):
+        """
+        Atomically add amount to a counter and return its new value.
+        Does not commit - call it inside the transaction of the write being counted.
+        """
+        conn.execute(text('''
+            INSERT INTO site_counters (name, value) VALUES (:name, :amount)
+            ON CONFLICT (name) DO UPDATE SET value = site_counters.value + excluded.value
+        '''), {"name": name, "amount": amount})
+        # The upsert holds the row lock, so this reads our own increment
+        return conn.execute(
+            text('SELECT value FROM site_counters WHERE name = :name'), {"name": name}
+        ).scalar() or 0
+    
+    @staticmethod
+    def get_many(names, conn=None):
+        """Get several counters in one query, as {name: value} (0 for those that don't exist yet)"""
+        values = {name: 0 for name in names}
+        if not values:
+            return values
+        if conn is None:
+            conn = get_db_connection()
+        rows = conn.execute(
+            text('SELECT name, value FROM site_counters WHERE name IN :names').bindparams(
+                bindparam('names', expanding=True)),
+            {"names": list(values)}
+        ).fetchall()
+        for row in rows:
+            values[row[0]] = row[1]
+        return values
+    
+    @staticmethod
+    def get(name):
+        """Get the current value of a counter (0 if it does not exist yet)"""
+        conn = get_db_connection()
+        try:
+            value = conn.execute(
+                text('SELECT value FROM site_counters WHERE name = :name'), {"name": name}
+            ).scalar()
+            return value or 0
+        except Exception as e:
+            print(f"Error getting counter {name}: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 0
+
 class Notification:
     """Notification model for admin dashboard notifications"""
     
@@ -1270,141 +2260,325 @@ class Notification:
     TYPE_VIEW_MILESTONE = 'view_milestone'
     TYPE_NEW_USER = 'new_user'
     
+    # Rows per INSERT statement when writing a batch from the outbox
+    INSERT_CHUNK_SIZE = 100
+    
+    @staticmethod
+    def create(type, message, user_id=None, username=None, is_anonymous=True, conn=None):
+        """
+        Create a new notification.
+        With conn the row is written in the caller's open transaction and commits
+        (or rolls back) together with the write that triggered it.
+        Otherwise it goes to the in-memory outbox and is written in a batch by a
+        background thread, so the request does not wait for it; returns None in that case.
+        """
+        notification = {
+            "type": type,
+            "message": message,
+            "user_id": user_id,
+            "username": username,
+            "is_anonymous": is_anonymous,
+            "created_at": datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        if conn is not None:
+            return Notification._insert(conn, [notification])
+        
+        from app import app, notification_outbox
+        if app.config['NOTIFICATION_OUTBOX_ENABLED'] and notification_outbox.put(notification):
+            return None
+        
+        # Outbox disabled or full: write it now
+        return Notification.write_batch([notification])
+    
     @staticmethod
-    def create(type, message, user_id=None, username=None, is_anonymous=True):
-        """Create a new notification"""
+    def _insert(conn, notifications):
+        """Insert notifications with multi-row INSERTs and bump the version (no commit). Returns the last id written"""
+        notification_id = None
+        for start in range(0, len(notifications), Notification.INSERT_CHUNK_SIZE):
+            chunk = notifications[start:start + Notification.INSERT_CHUNK_SIZE]
+            values = []
+            params = {}
+            for i, notification in enumerate(chunk):
+                values.append(f"(:type_{i}, :message_{i}, :user_id_{i}, :username_{i}, :is_anonymous_{i}, :is_read_{i}, :created_at_{i})")
+                params.update({
+                    f"type_{i}": notification["type"],
+                    f"message_{i}": notification["message"],
+                    f"user_id_{i}": notification.get("user_id"),
+                    f"username_{i}": notification.get("username"),
+                    f"is_anonymous_{i}": notification.get("is_anonymous", True),
+                    f"is_read_{i}": False,
+                    f"created_at_{i}": notification.get("created_at") or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+                })
+            rows = conn.execute(
+                text('INSERT INTO notifications (type, message, user_id, username, is_anonymous, is_read, created_at) VALUES '
+                     + ', '.join(values) + ' RETURNING id'),
+                params
+            ).fetchall()
+            if rows:
+                notification_id = max(row[0] for row in rows)
+        if notifications:
+            Notification._bump_version(conn)
+        return notification_id
+    
+    @staticmethod
+    def write_batch(notifications):
+        """Write a batch of queued notifications in one transaction. Returns the last id written"""
+        if not notifications:
+            return None
         conn = get_db_connection()
         try:
-            cursor = conn.execute(
-                text('INSERT INTO notifications (type, message, user_id, username, is_anonymous, is_read) VALUES (:type, :message, :user_id, :username, :is_anonymous, :is_read)'),
-                {"type": type, "message": message, "user_id": user_id, "username": username, "is_anonymous": is_anonymous, "is_read": False}
-            )
-            # For SQLite compatibility
-            if hasattr(cursor, 'lastrowid'):
-                notification_id = cursor.lastrowid
-            else:
-                # For PostgreSQL
-                notification_id = cursor.fetchone()[0] if cursor.returns_rows else None
-                
+            notification_id = Notification._insert(conn, notifications)
             conn.commit()
+            
+            # Let streams in this process see them without waiting for the next poll
+            from app import notification_hub
+            notification_hub.publish()
             return notification_id
         except Exception as e:
             print(f"Error creating notification: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
             return None
     
     @staticmethod
     def mark_as_read(notification_id):
         """Mark a notification as read"""
+        return Notification.mark_all_read(ids=[notification_id]) is not None
+    
+    @staticmethod
+    def mark_all_read(ids=None, up_to_id=None):
+        """
+        Mark notifications as read in one UPDATE: the given ids, everything up to
+        up_to_id, or all of them. Only unread rows are touched (via the partial index).
+        Returns the number of rows updated, or None on error.
+        """
         conn = get_db_connection()
         try:
-            conn.execute(
-                text('UPDATE notifications SET is_read = :is_read WHERE id = :notification_id'),
-                {"notification_id": notification_id, "is_read": True}
-            )
+            query = 'UPDATE notifications SET is_read = true WHERE is_read = false'
+            params = {}
+            if ids is not None:
+                if not ids:
+                    return 0
+                query += ' AND id IN :ids'
+                params["ids"] = list(ids)
+            if up_to_id is not None:
+                query += ' AND id <= :up_to_id'
+                params["up_to_id"] = up_to_id
+            
+            statement = text(query)
+            if ids is not None:
+                statement = statement.bindparams(bindparam("ids", expanding=True))
+            updated = conn.execute(statement, params).rowcount
+            if updated:
+                Notification._bump_version(conn)
             conn.commit()
-            return True
+            return updated
         except Exception as e:
-            print(f"Error marking notification as read: {e}")
-            return False
+            print(f"Error marking notifications as read: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return None
     
     @staticmethod
-    def get_recent(limit=10):
-        """Get recent notifications"""
+    def get_unread_count():
+        """Count unread notifications (served from the partial index on unread rows)"""
         conn = get_db_connection()
         try:
-            notifications = conn.execute(text('''
-                SELECT 
-                    id,
-                    type,
-                    message,
-                    username,
-                    is_anonymous,
-                    is_read,
-                    created_at
+            return conn.execute(text('SELECT COUNT(*) FROM notifications WHERE is_read = false')).scalar() or 0
+        except Exception as e:
+            print(f"Error counting unread notifications: {e}")
+            return 0
+    
+    @staticmethod
+    def _bump_version(conn):
+        """Advance the notifications version (used for ETags). Does not commit"""
+        return SiteCounter.increment(conn, SiteCounter.NOTIFICATIONS_VERSION)
+    
+    @staticmethod
+    def get_version():
+        """
+        Current notifications version. It changes whenever notifications are
+        written or marked read, so readers can answer conditional requests with
+        one primary-key lookup instead of querying the notifications table.
+        """
+        return SiteCounter.get(SiteCounter.NOTIFICATIONS_VERSION)
+    
+    @staticmethod
+    def _relative_time(created_at):
+        """Format a created_at value as '5 minutes ago' and so on"""
+        if isinstance(created_at, str):
+            try:
+                created_at = datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                # Try another format if the first one fails
+                created_at = datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S.%f')
+        
+        diff = datetime.now() - created_at
+        
+        if diff.days > 0:
+            return f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
+        elif diff.seconds >= 3600:
+            hours = diff.seconds // 3600
+            return f"{hours} hour{'s' if hours > 1 else ''} ago"
+        elif diff.seconds >= 60:
+            minutes = diff.seconds // 60
+            return f"{minutes} minute{'s' if minutes > 1 else ''} ago"
+        return "just now"
+    
+    @staticmethod
+    def get_page(since_id=None, before_id=None, limit=10):
+        """
+        Get a page of notifications, newest first, using id cursors on the primary key.
+        since_id returns only notifications newer than it (the oldest `limit` of them,
+        so a client repeating since_id=<newest id it has> never skips any);
+        before_id pages back through older ones.
+        """
+        conn = get_db_connection()
+        try:
+            conditions = []
+            params = {"limit": limit}
+            if since_id is not None:
+                conditions.append('id > :since_id')
+                params["since_id"] = since_id
+            if before_id is not None:
+                conditions.append('id < :before_id')
+                params["before_id"] = before_id
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+            order = 'ASC' if since_id is not None else 'DESC'
+            
+            rows = conn.execute(text(f'''
+                SELECT id, type, message, username, is_anonymous, is_read, created_at
                 FROM notifications
-                ORDER BY created_at DESC
+                {where}
+                ORDER BY id {order}
                 LIMIT :limit
-            '''), {"limit": limit}).fetchall()
+            '''), params).fetchall()
+            if since_id is not None:
+                rows = list(reversed(rows))
             
             # Convert to list of dicts with relative time
             result = []
-            for notification in notifications:
+            for row in rows:
                 try:
-                    # Handle different row types
-                    notification_dict = {}
-                    if hasattr(notification, "_mapping"):
-                        notification_dict = dict(notification._mapping)
-                    else:
-                        # Create a dict manually assuming column order matches query
-                        cols = ["id", "type", "message", "username", "is_anonymous", "is_read", "created_at"]
-                        notification_dict = {cols[i]: notification[i] for i in range(min(len(cols), len(notification)))}
-                    
-                    # Calculate relative time
-                    created_at = None
-                    if isinstance(notification_dict['created_at'], str):
-                        try:
-                            created_at = datetime.strptime(notification_dict['created_at'], '%Y-%m-%d %H:%M:%S')
-                        except ValueError:
-                            # Try another format if the first one fails
-                            created_at = datetime.strptime(notification_dict['created_at'], '%Y-%m-%d %H:%M:%S.%f')
-                    else:
-                        # Already a datetime object
-                        created_at = notification_dict['created_at']
-                    
-                    now = datetime.now()
-                    diff = now - created_at
-                    
-                    if diff.days > 0:
-                        relative_time = f"{diff.days} day{'s' if diff.days > 1 else ''} ago"
-                    elif diff.seconds >= 3600:
-                        hours = diff.seconds // 3600
-                        relative_time = f"{hours} hour{'s' if hours > 1 else ''} ago"
-                    elif diff.seconds >= 60:
-                        minutes = diff.seconds // 60
-                        relative_time = f"{minutes} minute{'s' if minutes > 1 else ''} ago"
-                    else:
-                        relative_time = "just now"
-                    
-                    notification_dict['relative_time'] = relative_time
+                    notification_dict = dict(row._mapping)
+                    notification_dict['relative_time'] = Notification._relative_time(notification_dict['created_at'])
                     result.append(notification_dict)
                 except Exception as e:
                     print(f"Error processing notification: {e}")
             
             return result
         except Exception as e:
-            print(f"Error getting recent notifications: {e}")
+            print(f"Error getting notifications: {e}")
             return []
+    
+    @staticmethod
+    def get_recent(limit=10):
+        """Get recent notifications"""
+        return Notification.get_page(limit=limit)
+    
+    @staticmethod
+    def get_since(after_id=None, limit=50):
+        """
+        Get notifications with an id greater than after_id, oldest first, for the
+        notification stream. Without after_id the latest `limit` are returned.
+        created_at is a UTC 'YYYY-MM-DD HH:MM:SS' string; clients format relative times.
+        """
+        conn = get_db_connection()
+        try:
+            if after_id is None:
+                rows = conn.execute(text('''
+                    SELECT id, type, message, username, is_anonymous, is_read, created_at
+                    FROM notifications
+                    ORDER BY id DESC
+                    LIMIT :limit
+                '''), {"limit": limit}).fetchall()
+                rows = list(reversed(rows))
+            else:
+                rows = conn.execute(text('''
+                    SELECT id, type, message, username, is_anonymous, is_read, created_at
+                    FROM notifications
+                    WHERE id > :after_id
+                    ORDER BY id
+                    LIMIT :limit
+                '''), {"after_id": after_id, "limit": limit}).fetchall()
             
+            result = []
+            for row in rows:
+                created_at = row[6]
+                if isinstance(created_at, datetime):
+                    created_at = created_at.strftime('%Y-%m-%d %H:%M:%S')
+                elif created_at:
+                    created_at = str(created_at)[:19]
+                result.append({
+                    "id": row[0],
+                    "type": row[1],
+                    "message": row[2],
+                    "username": row[3],
+                    "is_anonymous": bool(row[4]),
+                    "is_read": bool(row[5]),
+                    "created_at": created_at
+                })
+            return result
+        except Exception as e:
+            print(f"Error getting notifications since {after_id}: {e}")
+            return []
+    
     @staticmethod
-    def create_comment_notification(username, is_anonymous, post_title):
+    def get_latest_id():
+        """Get the id of the newest notification (0 if there are none)"""
+        conn = get_db_connection()
+        try:
+            return conn.execute(text('SELECT MAX(id) FROM notifications')).scalar() or 0
+        except Exception as e:
+            print(f"Error getting latest notification id: {e}")
+            return 0
+            
+    @staticmethod
+    def create_comment_notification(username, is_anonymous, post_title, conn=None):
         """Create a notification for a new comment"""
         user_display = 'Anonymous' if is_anonymous else username
         message = f"{user_display} posted a comment on '{post_title}'!"
-        return Notification.create(Notification.TYPE_COMMENT, message, username=username, is_anonymous=is_anonymous)
+        return Notification.create(Notification.TYPE_COMMENT, message, username=username, is_anonymous=is_anonymous, conn=conn)
     
     @staticmethod
-    def create_post_like_notification(username, is_anonymous, post_title):
+    def create_post_like_notification(username, is_anonymous, post_title, conn=None):
         """Create a notification for a post like"""
         user_display = 'Anonymous' if is_anonymous else username
         message = f"{user_display} liked your post '{post_title}'!"
-        return Notification.create(Notification.TYPE_LIKE_POST, message, username=username, is_anonymous=is_anonymous)
+        return Notification.create(Notification.TYPE_LIKE_POST, message, username=username, is_anonymous=is_anonymous, conn=conn)
     
     @staticmethod
-    def create_comment_like_notification(username, is_anonymous, post_title):
+    def create_comment_like_notification(username, is_anonymous, post_title, conn=None):
         """Create a notification for a comment like"""
         user_display = 'Anonymous' if is_anonymous else username
         message = f"{user_display} liked a comment on '{post_title}'!"
-        return Notification.create(Notification.TYPE_LIKE_COMMENT, message, username=username, is_anonymous=is_anonymous)
+        return Notification.create(Notification.TYPE_LIKE_COMMENT, message, username=username, is_anonymous=is_anonymous, conn=conn)
     
     @staticmethod
-    def create_cv_download_notification(username, is_anonymous, reason):
-        """Create a notification for a CV download"""
+    def cv_download_message(username, is_anonymous, reason):
+        """Message of a CV download notification"""
         user_display = 'Anonymous' if is_anonymous else username
-        message = f"{user_display} downloaded your CV for {reason}!"
-        return Notification.create(Notification.TYPE_CV_DOWNLOAD, message, username=username, is_anonymous=is_anonymous)
+        return f"{user_display} downloaded your CV for {reason}!"
+    
+    @staticmethod
+    def create_cv_download_notification(username, is_anonymous, reason, conn=None):
+        """Create a notification for a CV download"""
+        message = Notification.cv_download_message(username, is_anonymous, reason)
+        return Notification.create(Notification.TYPE_CV_DOWNLOAD, message, username=username, is_anonymous=is_anonymous, conn=conn)
+    
+    @staticmethod
+    def is_view_milestone(count):
+        """Check whether a total view count deserves a milestone notification"""
+        if count in [1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]:
+            return True
+        return count > 100 and count % 100 == 0
     
     @staticmethod
-    def create_view_milestone_notification(count):
+    def create_view_milestone_notification(count, conn=None):
         """Create a notification for a view milestone"""
         # Create different messages based on milestone type
         if count == 1:
@@ -1447,7 +2621,7 @@ class Notification:
             import random
             message = random.choice(messages)
         
-        return Notification.create(Notification.TYPE_VIEW_MILESTONE, message)
+        return Notification.create(Notification.TYPE_VIEW_MILESTONE, message, conn=conn)
     
     @staticmethod
     def create_daily_summary_notification():
@@ -1456,41 +2630,17 @@ class Notification:
             conn = get_db_connection()
             
             # Get today's stats
-            from app import app
-            is_postgres = 'postgresql' in app.config['SQLALCHEMY_DATABASE_URI']
-            
-            if is_postgres:
-                today_query = text('''
-                    SELECT COUNT(*) as views, COUNT(DISTINCT ip_address) as unique_visitors
-                    FROM visitor_stats 
-                    WHERE date(created_at) = CURRENT_DATE
-                        AND page_visited NOT LIKE '/api/%' 
-                        AND page_visited NOT LIKE '/static/%'
-                        AND page_visited NOT LIKE '/analytics%'
-                ''')
-            else:
-                today_query = text('''
-                    SELECT COUNT(*) as views, COUNT(DISTINCT ip_address) as unique_visitors
-                    FROM visitor_stats 
-                    WHERE date(created_at) = date('now')
-                        AND page_visited NOT LIKE '/api/%' 
-                        AND page_visited NOT LIKE '/static/%'
-                        AND page_visited NOT LIKE '/analytics%'
-                ''')
+            today = datetime.utcnow().date()
+            start, end = VisitorStat._day_bounds(today)
+            views = conn.execute(text('''
+                SELECT COUNT(*) FROM visitor_stats
+                WHERE page_category = 'page' AND created_at >= :start AND created_at < :end
+            '''), {"start": start, "end": end}).scalar() or 0
             
-            result = conn.execute(today_query).fetchone()
-            
-            if result:
-                if hasattr(result, "_mapping"):
-                    views = result._mapping["views"]
-                    unique_visitors = result._mapping["unique_visitors"]
-                else:
-                    views = result[0]
-                    unique_visitors = result[1]
-                
-                if views > 0:
-                    message = f"📊 Daily Summary: {views} views from {unique_visitors} unique visitors today!"
-                    return Notification.create(Notification.TYPE_VIEW_MILESTONE, message)
+            if views > 0:
+                unique_visitors = VisitorStat.count_unique_visitors(today, today)
+                message = f"📊 Daily Summary: {views} views from {unique_visitors} unique visitors today!"
+                return Notification.create(Notification.TYPE_VIEW_MILESTONE, message)
             
         except Exception as e:
             print(f"Error creating daily summary: {e}")
@@ -1514,14 +2664,23 @@ class Notification:
         return Notification.create(Notification.TYPE_VIEW_MILESTONE, message)
 
     @staticmethod
-    def create_new_user_notification(username):
+    def create_new_user_notification(username, conn=None):
         """Create a notification for a new registered user"""
         message = f"{username} is now a registered user!"
-        return Notification.create(Notification.TYPE_NEW_USER, message, username=username, is_anonymous=False)
+        return Notification.create(Notification.TYPE_NEW_USER, message, username=username, is_anonymous=False, conn=conn)
 
 class CVVerification:
     """CV Verification model for handling verification links"""
     
+    # Delivery status of the verification email (email_status)
+    EMAIL_QUEUED = 'queued'
+    EMAIL_RETRYING = 'retrying'
+    EMAIL_SENT = 'sent'
+    EMAIL_FAILED = 'failed'
+    
+    # Longest delivery error stored in email_error
+    EMAIL_ERROR_LENGTH = 500
+    
     @staticmethod
     def create(email, reason, token, expires_at):
         """Create a new verification entry"""
@@ -1538,16 +2697,16 @@ class CVVerification:
             if is_postgres:
                 # PostgreSQL-specific version with RETURNING
                 result = conn.execute(
-                    text('INSERT INTO cv_verifications (email, reason, token, expires_at) VALUES (:email, :reason, :token, :expires_at) RETURNING id'),
-                    {"email": email, "reason": reason, "token": token, "expires_at": expires_at}
+                    text('INSERT INTO cv_verifications (email, reason, token, expires_at, email_status) VALUES (:email, :reason, :token, :expires_at, :email_status) RETURNING id'),
+                    {"email": email, "reason": reason, "token": token, "expires_at": expires_at, "email_status": CVVerification.EMAIL_QUEUED}
                 ).fetchone()
                 
                 verification_id = result[0] if result else None
             else:
                 # SQLite version
                 cursor = conn.execute(
-                    text('INSERT INTO cv_verifications (email, reason, token, expires_at) VALUES (:email, :reason, :token, :expires_at)'),
-                    {"email": email, "reason": reason, "token": token, "expires_at": expires_at}
+                    text('INSERT INTO cv_verifications (email, reason, token, expires_at, email_status) VALUES (:email, :reason, :token, :expires_at, :email_status)'),
+                    {"email": email, "reason": reason, "token": token, "expires_at": expires_at, "email_status": CVVerification.EMAIL_QUEUED}
                 )
                 verification_id = cursor.lastrowid
                 
@@ -1581,8 +2740,9 @@ class CVVerification:
                     return dict(verification._mapping)
                 else:
                     # Create a dict manually from the row tuple
-                    # Assuming columns are: id, email, reason, token, is_used, expires_at, created_at
-                    columns = ["id", "email", "reason", "token", "is_used", "expires_at", "created_at"]
+                    # Assuming columns are: id, email, reason, token, is_used, expires_at, created_at, email_*
+                    columns = ["id", "email", "reason", "token", "is_used", "expires_at", "created_at",
+                               "email_status", "email_attempts", "email_error", "email_sent_at"]
                     return {columns[i]: verification[i] for i in range(min(len(columns), len(verification)))}
             except Exception as e:
                 print(f"Error converting verification row to dict: {e}")
@@ -1606,6 +2766,41 @@ class CVVerification:
             print(f"Error marking verification as used: {e}")
             return False
     
+    @staticmethod
+    def update_email_statuses(results):
+        """
+        Record verification email delivery results in one transaction.
+        results is a list of (verification id, status, attempts, error) as reported
+        by the mail queue; status is one of the EMAIL_* values.
+        """
+        results = [result for result in results if result[0] is not None]
+        if not results:
+            return 0
+        conn = get_db_connection()
+        try:
+            now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+            for verification_id, status, attempts, error in results:
+                conn.execute(
+                    text('UPDATE cv_verifications SET email_status = :status, email_attempts = :attempts, '
+                         'email_error = :error, email_sent_at = :sent_at WHERE id = :id'),
+                    {
+                        "id": verification_id,
+                        "status": status,
+                        "attempts": attempts,
+                        "error": error[:CVVerification.EMAIL_ERROR_LENGTH] if error else None,
+                        "sent_at": now if status == CVVerification.EMAIL_SENT else None
+                    }
+                )
+            conn.commit()
+            return len(results)
+        except Exception as e:
+            print(f"Error updating verification email status: {e}")
+            try:
+                conn.rollback()
+            except:
+                pass
+            return 0
+    
     @staticmethod
     def create_verified_download(verification_id):
         """Record a verified CV download"""
@@ -1631,7 +2826,8 @@ class CVVerification:
             else:
                 # For PostgreSQL
                 download_id = cursor.fetchone()[0] if cursor.returns_rows else None
-                
+            
+            SiteCounter.increment(conn, SiteCounter.CV_DOWNLOADS_VERSION)
             conn.commit()
             return download_id
         except Exception as e:
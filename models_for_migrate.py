@@ -8,17 +8,32 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), default='subscriber')
+    version = db.Column(db.Integer, nullable=False, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Post(db.Model):
     __tablename__ = 'posts'
+    __table_args__ = (
+        db.Index('idx_posts_created_at_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
     view_count = db.Column(db.Integer, default=0)
+    like_count = db.Column(db.Integer, nullable=False, default=0)
+    anonymous_like_count = db.Column(db.Integer, nullable=False, default=0)
+    registered_like_count = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+    last_like_at = db.Column(db.DateTime)
+    last_comment_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class PostMonth(db.Model):
+    __tablename__ = 'post_months'
+    month_year = db.Column(db.String(7), primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+
 class Comment(db.Model):
     __tablename__ = 'comments'
     id = db.Column(db.Integer, primary_key=True)
@@ -28,10 +43,16 @@ class Comment(db.Model):
     is_anonymous = db.Column(db.Boolean, default=False)
     author_name = db.Column(db.String(80))
     liked_by_author = db.Column(db.Boolean, default=False)
+    like_count = db.Column(db.Integer, nullable=False, default=0)
+    last_like_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class BlogLike(db.Model):
     __tablename__ = 'blog_likes'
+    __table_args__ = (
+        db.UniqueConstraint('post_id', 'user_id', name='uq_blog_likes_post_user'),
+        db.UniqueConstraint('post_id', 'anonymous_id', name='uq_blog_likes_post_anonymous'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
@@ -43,6 +64,9 @@ class BlogLike(db.Model):
 
 class CommentLike(db.Model):
     __tablename__ = 'comment_likes'
+    __table_args__ = (
+        db.UniqueConstraint('comment_id', 'user_id', name='uq_comment_likes_comment_user'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     comment_id = db.Column(db.Integer, db.ForeignKey('comments.id', ondelete='CASCADE'))
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
@@ -61,15 +85,51 @@ class CVDownload(db.Model):
 
 class VisitorStat(db.Model):
     __tablename__ = 'visitor_stats'
+    __table_args__ = (
+        db.Index('idx_visitor_stats_category_created_at', 'page_category', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     ip_address = db.Column(db.String(45))
     country = db.Column(db.String(80))
     page_visited = db.Column(db.String(255))
+    page_category = db.Column(db.String(20))
+    is_bot = db.Column(db.Boolean, default=False)
     is_unique = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class KnownVisitor(db.Model):
+    __tablename__ = 'known_visitors'
+    ip_address = db.Column(db.String(45), primary_key=True)
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class VisitorDailyStat(db.Model):
+    __tablename__ = 'visitor_daily_stats'
+    day = db.Column(db.Date, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    unique_visitors = db.Column(db.Integer, nullable=False, default=0)
+
+class VisitorDailyPage(db.Model):
+    __tablename__ = 'visitor_daily_pages'
+    day = db.Column(db.Date, primary_key=True)
+    page_visited = db.Column(db.Text, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+class VisitorDailySketch(db.Model):
+    __tablename__ = 'visitor_daily_sketches'
+    day = db.Column(db.Date, primary_key=True)
+    sketch = db.Column(db.LargeBinary, nullable=False)
+
+class SiteCounter(db.Model):
+    __tablename__ = 'site_counters'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('idx_notifications_unread', 'id',
+                 postgresql_where=db.text('is_read = false'), sqlite_where=db.text('is_read = false')),
+    )
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(20))
     message = db.Column(db.String(255))
@@ -87,4 +147,8 @@ class CVVerification(db.Model):
     token = db.Column(db.String(255))
     is_used = db.Column(db.Boolean, default=False)
     expires_at = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow) 
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    email_status = db.Column(db.String(20))
+    email_attempts = db.Column(db.Integer, nullable=False, default=0)
+    email_error = db.Column(db.Text)
+    email_sent_at = db.Column(db.DateTime)
\ No newline at end of file
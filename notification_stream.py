@@ -0,0 +1,114 @@
+"""
+In-process fan-out of new admin notifications to Server-Sent Events clients
+"""
+import os
+import threading
+from collections import deque
+
+class NotificationHub:
+    """
+    One background thread per worker process polls for notifications newer than
+    the last one it has seen and wakes every waiting stream, so the database sees
+    one small query per poll interval no matter how many dashboards are open.
+    The thread only queries while at least one stream is subscribed.
+    Notifications written by this process wake it immediately via publish().
+    A notification whose id commits after a higher id was already polled is not
+    pushed; it still shows up in the dashboard's list on the next page load.
+    """
+
+    def __init__(self, name, fetch_func, poll_interval=2.0, backlog=100):
+        # fetch_func(after_id) returns notifications with id > after_id, oldest first,
+        # or the latest ones when after_id is None
+        self.name = name
+        self.fetch_func = fetch_func
+        self.poll_interval = poll_interval
+
+        self._recent = deque(maxlen=backlog)
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        # Counters exposed through stats()
+        self.last_id = None
+        self.subscribers = 0
+        self.polls = 0
+        self.delivered = 0
+
+    def subscribe(self):
+        """Register a stream; starts the poller for this process if needed"""
+        self._ensure_started()
+        with self._lock:
+            self.subscribers += 1
+        self._wake.set()
+
+    def unsubscribe(self):
+        with self._lock:
+            self.subscribers -= 1
+
+    def publish(self):
+        """Ask the poller to look for new notifications now instead of at the next interval"""
+        self._wake.set()
+
+    def wait(self, after_id, timeout):
+        """Block until there are notifications newer than after_id, or timeout. Returns them oldest first"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._newer_than(after_id), timeout)
+            notifications = self._newer_than(after_id)
+        with self._lock:
+            self.delivered += len(notifications)
+        return notifications
+
+    def stats(self):
+        """Get hub counters"""
+        with self._lock:
+            return {
+                'subscribers': self.subscribers,
+                'last_id': self.last_id,
+                'polls': self.polls,
+                'delivered': self.delivered
+            }
+
+    def _newer_than(self, after_id):
+        return [n for n in self._recent if n['id'] > after_id]
+
+    def _ensure_started(self):
+        """Start the poller thread lazily, once per process (gunicorn forks workers after import)"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Background loop: poll while anyone is listening, otherwise sleep"""
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self.subscribers > 0:
+                self._poll()
+            else:
+                # Nobody listening: start again from the latest notifications next time
+                self.last_id = None
+
+    def _poll(self):
+        """Fetch new notifications and wake the waiting streams"""
+        try:
+            notifications = self.fetch_func(self.last_id)
+        except Exception as e:
+            print(f"Error polling {self.name}: {e}")
+            return
+        with self._lock:
+            self.polls += 1
+        if not notifications:
+            return
+        with self._cond:
+            if self.last_id is None:
+                self._recent.clear()
+            self._recent.extend(notifications)
+            self.last_id = notifications[-1]['id']
+            self._cond.notify_all()
@@ -0,0 +1,176 @@
+"""
+Cache of fully rendered pages with tag-based invalidation
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from cache import TTLCache
+
+class MemoryBackend:
+    """Entries in an in-process LRU; each gunicorn worker has its own"""
+
+    def __init__(self, max_size=500):
+        self._cache = TTLCache(max_size=max_size)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl):
+        self._cache.set(key, value, ttl=ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return {'backend': 'memory', 'entries': self._cache.stats()['size']}
+
+class DiskBackend:
+    """
+    Entries as JSON files in a directory, shared by every worker on the host, so
+    values must be JSON-serializable. The directory is created private (0700) and
+    refused if another user owns it or others can write to it, since anything
+    written there is served as a page.
+    Writes go through a temporary file and os.replace, so readers never see a
+    partial entry. The oldest files are pruned once there are more than max_entries.
+    """
+
+    SUFFIX = '.page'
+    PRUNE_EVERY = 100
+
+    def __init__(self, directory, max_entries=1000):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        st = os.stat(directory)
+        if hasattr(os, 'getuid') and (st.st_uid != os.getuid() or st.st_mode & 0o022):
+            raise PermissionError(f"Page cache directory {directory} must be owned by this user and not writable by others")
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + self.SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            expires_at, stored_key, value = stored['expires_at'], stored['key'], stored['value']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading page cache entry {path}: {e}")
+            return None
+        if stored_key != key:
+            return None
+        if expires_at < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'expires_at': time.time() + ttl, 'key': key, 'value': value}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing page cache entry {path}: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self._prune()
+
+    def _entries(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.SUFFIX)]
+
+    def _prune(self):
+        """Remove the least recently written entries beyond max_entries"""
+        try:
+            entries = self._entries()
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_entries]:
+                os.remove(entry.path)
+        except OSError as e:
+            print(f"Error pruning page cache: {e}")
+
+    def clear(self):
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        try:
+            entries = len(self._entries())
+        except OSError:
+            entries = None
+        return {'backend': 'disk', 'entries': entries}
+
+class PageCache:
+    """
+    Rendered pages stored with the versions of the tags they depend on
+    (e.g. 'posts', 'post:12'). tag_versions(tags) returns the current version of
+    each tag; writes bump the versions of the tags they affect, so an entry is
+    served only while every one of its tags is still at the version it was
+    rendered with. Keeping the versions outside the backend means an
+    invalidation is seen by every worker, whichever backend is used.
+    """
+
+    def __init__(self, backend, tag_versions, ttl=300):
+        self.backend = backend
+        self.tag_versions = tag_versions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, key, versions=None):
+        """
+        Get a cached page, or None if it is missing, expired or has a changed tag.
+        Pass the current versions of the page's tags if already read, to skip reading them again.
+        """
+        entry = self.backend.get(key)
+        if entry is not None and entry['tags']:
+            current = versions if versions is not None else self.tag_versions(list(entry['tags']))
+            if current != entry['tags']:
+                with self._lock:
+                    self.stale += 1
+                entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def versions(self, tags):
+        """Current versions of tags; read these before rendering and pass them to set()"""
+        return self.tag_versions(list(tags))
+
+    def set(self, key, page, versions):
+        """Store a rendered page (a dict of body text, status and mimetype) under the given tag versions"""
+        self.backend.set(key, dict(page, tags=versions), self.ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Get hit/miss counters and backend size"""
+        with self._lock:
+            counters = {'hits': self.hits, 'misses': self.misses, 'stale': self.stale}
+        counters.update(self.backend.stats())
+        return counters
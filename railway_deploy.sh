@@ -35,7 +35,7 @@ try:
         table_count_query = text("""
             SELECT COUNT(*) 
             FROM information_schema.tables 
-            WHERE table_schema = \'public\'
+            WHERE table_schema = '\''public'\''
         """)
         result = connection.execute(table_count_query)
         table_count = result.scalar()
@@ -55,7 +55,7 @@ try:
                 except Exception as e:
                     print(f"DEBUG: Table {table} check failed: {e}")
                     
-            print(f"DEBUG: Found {len(found_tables)} core tables: {', '.join(found_tables)}")
+            print(f"DEBUG: Found {len(found_tables)} core tables: {'\'', '\''.join(found_tables)}")
                     
             if len(found_tables) >= 2:
                 print("initialized")
@@ -70,7 +70,7 @@ except Exception as e:
 echo "Database status: $DB_STATUS"
 
 if [[ "$DB_STATUS" == "initialized" ]]; then
-    echo "Database already initialized with tables. Skipping migrations."
+    echo "Database already initialized with tables."
     
     # Set environment variable to skip database initialization entirely
     export SKIP_DB_INIT=true
@@ -101,7 +101,7 @@ try:
     if admin_username and admin_email and admin_password:
         with engine.connect() as conn:
             # Check if admin exists
-            result = conn.execute(text("SELECT COUNT(*) FROM users WHERE role = \'admin\'"))
+            result = conn.execute(text("SELECT COUNT(*) FROM users WHERE role = '\''admin'\''"))
             count = result.scalar()
             
             if count == 0:
@@ -118,13 +118,23 @@ try:
 except Exception as e:
     print(f"Error: {e}")
 '
-else
-    # Run database migrations
-    echo "Running database migrations..."
-    python -m flask db upgrade
+fi
+
+# Run database migrations (also on an existing database, so new revisions get applied).
+# A failure is reported but does not stop the app from starting.
+echo "Running database migrations..."
+if python -m flask upgrade-db; then
     echo "Migrations completed successfully"
+else
+    echo "WARNING: Database migrations failed (see the error above). Starting with the current schema."
 fi
 
+# Fingerprint static assets (content-hashed copies in static/dist, served as immutable)
+# and build the responsive image variants
+echo "Building static assets..."
+python assets.py
+python images.py
+
 # Start the application
 echo "Starting the application..."
 exec gunicorn app:app 
\ No newline at end of file
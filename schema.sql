@@ -4,10 +4,16 @@ PRAGMA foreign_keys = ON;
 -- Drop tables if they exist to avoid conflicts
 DROP TABLE IF EXISTS cv_verifications;
 DROP TABLE IF EXISTS visitor_stats;
+DROP TABLE IF EXISTS visitor_daily_sketches;
+DROP TABLE IF EXISTS visitor_daily_pages;
+DROP TABLE IF EXISTS visitor_daily_stats;
+DROP TABLE IF EXISTS known_visitors;
+DROP TABLE IF EXISTS site_counters;
 DROP TABLE IF EXISTS cv_downloads;
 DROP TABLE IF EXISTS comment_likes;
 DROP TABLE IF EXISTS blog_likes;
 DROP TABLE IF EXISTS comments;
+DROP TABLE IF EXISTS post_months;
 DROP TABLE IF EXISTS posts;
 DROP TABLE IF EXISTS users;
 
@@ -18,6 +24,7 @@ CREATE TABLE users (
     email TEXT NOT NULL UNIQUE,
     password TEXT NOT NULL,
     role TEXT DEFAULT 'subscriber' CHECK (role IN ('admin', 'subscriber')),
+    version INTEGER NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -28,10 +35,22 @@ CREATE TABLE posts (
     content TEXT NOT NULL,
     user_id INTEGER,
     view_count INTEGER DEFAULT 0,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    anonymous_like_count INTEGER NOT NULL DEFAULT 0,
+    registered_like_count INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    last_like_at TIMESTAMP,
+    last_comment_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
 );
 
+-- Post month archive (per-month post counts for the blog filter)
+CREATE TABLE post_months (
+    month_year TEXT PRIMARY KEY,
+    post_count INTEGER NOT NULL DEFAULT 0
+);
+
 -- Comments table
 CREATE TABLE comments (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,6 +60,8 @@ CREATE TABLE comments (
     content TEXT NOT NULL,
     liked_by_author BOOLEAN DEFAULT 0,
     is_anonymous BOOLEAN DEFAULT 0,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    last_like_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
@@ -57,7 +78,9 @@ CREATE TABLE blog_likes (
     ip_address TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+    CONSTRAINT uq_blog_likes_post_user UNIQUE (post_id, user_id),
+    CONSTRAINT uq_blog_likes_post_anonymous UNIQUE (post_id, anonymous_id)
 );
 
 -- Comment Likes table
@@ -68,7 +91,8 @@ CREATE TABLE comment_likes (
     is_anonymous BOOLEAN DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (comment_id) REFERENCES comments(id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+    CONSTRAINT uq_comment_likes_comment_user UNIQUE (comment_id, user_id)
 );
 
 -- CV Downloads table
@@ -90,10 +114,46 @@ CREATE TABLE visitor_stats (
     ip_address TEXT NOT NULL,
     country TEXT,
     page_visited TEXT NOT NULL,
+    page_category TEXT,
+    is_bot BOOLEAN DEFAULT 0,
     is_unique BOOLEAN DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Known visitors (one row per IP ever seen, for first-visit detection)
+CREATE TABLE known_visitors (
+    ip_address TEXT PRIMARY KEY,
+    first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Daily visitor rollups (one row per finished day, filled by VisitorStat.rollup_days)
+CREATE TABLE visitor_daily_stats (
+    day TEXT PRIMARY KEY,
+    views INTEGER NOT NULL DEFAULT 0,
+    unique_visitors INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE visitor_daily_pages (
+    day TEXT NOT NULL,
+    page_visited TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, page_visited)
+);
+
+-- Per-day HyperLogLog sketches of visitor IPs, merged to estimate unique visitors over any range
+CREATE TABLE visitor_daily_sketches (
+    day TEXT PRIMARY KEY,
+    sketch BLOB NOT NULL
+);
+
+-- Site counters (running totals kept alongside the rows they count)
+CREATE TABLE site_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO site_counters (name, value) VALUES ('total_views', 0);
+
 -- Notifications table
 CREATE TABLE notifications (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -115,11 +175,16 @@ CREATE TABLE cv_verifications (
     token TEXT NOT NULL UNIQUE,
     is_used BOOLEAN DEFAULT 0,
     expires_at TIMESTAMP NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    email_status VARCHAR(20),
+    email_attempts INTEGER NOT NULL DEFAULT 0,
+    email_error TEXT,
+    email_sent_at TIMESTAMP
 );
 
 -- Create indexes for faster queries
 CREATE INDEX idx_posts_user_id ON posts(user_id);
+CREATE INDEX idx_posts_created_at_id ON posts(created_at, id);
 CREATE INDEX idx_comments_post_id ON comments(post_id);
 CREATE INDEX idx_comments_user_id ON comments(user_id);
 CREATE INDEX idx_blog_likes_post_id ON blog_likes(post_id);
@@ -129,8 +194,11 @@ CREATE INDEX idx_comment_likes_user_id ON comment_likes(user_id);
 CREATE INDEX idx_cv_downloads_user_id ON cv_downloads(user_id);
 CREATE INDEX idx_visitor_stats_ip_address ON visitor_stats(ip_address);
 CREATE INDEX idx_visitor_stats_page_visited ON visitor_stats(page_visited);
+CREATE INDEX idx_visitor_stats_category_created_at ON visitor_stats(page_category, created_at);
 CREATE INDEX idx_notifications_type ON notifications(type);
 CREATE INDEX idx_notifications_created_at ON notifications(created_at);
+-- Partial index: only unread rows, for the unread count and mark-all-read
+CREATE INDEX idx_notifications_unread ON notifications(id) WHERE is_read = false;
 
 -- Optional: Insert a default admin user (password should be hashed in production)
 -- INSERT INTO users (username, email, password, role) 
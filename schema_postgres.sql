@@ -3,10 +3,16 @@
 -- Drop tables if they exist to avoid conflicts
 DROP TABLE IF EXISTS cv_verifications CASCADE;
 DROP TABLE IF EXISTS visitor_stats CASCADE;
+DROP TABLE IF EXISTS visitor_daily_sketches CASCADE;
+DROP TABLE IF EXISTS visitor_daily_pages CASCADE;
+DROP TABLE IF EXISTS visitor_daily_stats CASCADE;
+DROP TABLE IF EXISTS known_visitors CASCADE;
+DROP TABLE IF EXISTS site_counters CASCADE;
 DROP TABLE IF EXISTS cv_downloads CASCADE;
 DROP TABLE IF EXISTS comment_likes CASCADE;
 DROP TABLE IF EXISTS blog_likes CASCADE;
 DROP TABLE IF EXISTS comments CASCADE;
+DROP TABLE IF EXISTS post_months CASCADE;
 DROP TABLE IF EXISTS posts CASCADE;
 DROP TABLE IF EXISTS users CASCADE;
 
@@ -17,6 +23,7 @@ CREATE TABLE users (
     email VARCHAR(255) NOT NULL UNIQUE,
     password TEXT NOT NULL,
     role VARCHAR(20) DEFAULT 'subscriber' CHECK (role IN ('admin', 'subscriber')),
+    version INTEGER NOT NULL DEFAULT 1,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -27,10 +34,22 @@ CREATE TABLE posts (
     content TEXT NOT NULL,
     user_id INTEGER,
     view_count INTEGER DEFAULT 0,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    anonymous_like_count INTEGER NOT NULL DEFAULT 0,
+    registered_like_count INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    last_like_at TIMESTAMP,
+    last_comment_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
 );
 
+-- Post month archive (per-month post counts for the blog filter)
+CREATE TABLE post_months (
+    month_year VARCHAR(7) PRIMARY KEY,
+    post_count INTEGER NOT NULL DEFAULT 0
+);
+
 -- Comments table
 CREATE TABLE comments (
     id SERIAL PRIMARY KEY,
@@ -40,6 +59,8 @@ CREATE TABLE comments (
     content TEXT NOT NULL,
     liked_by_author BOOLEAN DEFAULT false,
     is_anonymous BOOLEAN DEFAULT false,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    last_like_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
@@ -56,7 +77,9 @@ CREATE TABLE blog_likes (
     ip_address VARCHAR(45),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (post_id) REFERENCES posts(id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+    CONSTRAINT uq_blog_likes_post_user UNIQUE (post_id, user_id),
+    CONSTRAINT uq_blog_likes_post_anonymous UNIQUE (post_id, anonymous_id)
 );
 
 -- Comment Likes table
@@ -67,7 +90,8 @@ CREATE TABLE comment_likes (
     is_anonymous BOOLEAN DEFAULT false,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (comment_id) REFERENCES comments(id) ON DELETE CASCADE,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+    CONSTRAINT uq_comment_likes_comment_user UNIQUE (comment_id, user_id)
 );
 
 -- CV Downloads table
@@ -89,10 +113,46 @@ CREATE TABLE visitor_stats (
     ip_address VARCHAR(45) NOT NULL,
     country VARCHAR(100),
     page_visited TEXT NOT NULL,
+    page_category VARCHAR(20),
+    is_bot BOOLEAN DEFAULT false,
     is_unique BOOLEAN DEFAULT true,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Known visitors (one row per IP ever seen, for first-visit detection)
+CREATE TABLE known_visitors (
+    ip_address VARCHAR(45) PRIMARY KEY,
+    first_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Daily visitor rollups (one row per finished day, filled by VisitorStat.rollup_days)
+CREATE TABLE visitor_daily_stats (
+    day DATE PRIMARY KEY,
+    views INTEGER NOT NULL DEFAULT 0,
+    unique_visitors INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE visitor_daily_pages (
+    day DATE NOT NULL,
+    page_visited TEXT NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, page_visited)
+);
+
+-- Per-day HyperLogLog sketches of visitor IPs, merged to estimate unique visitors over any range
+CREATE TABLE visitor_daily_sketches (
+    day DATE PRIMARY KEY,
+    sketch BYTEA NOT NULL
+);
+
+-- Site counters (running totals kept alongside the rows they count)
+CREATE TABLE site_counters (
+    name VARCHAR(50) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO site_counters (name, value) VALUES ('total_views', 0);
+
 -- Notifications table
 CREATE TABLE notifications (
     id SERIAL PRIMARY KEY,
@@ -114,11 +174,16 @@ CREATE TABLE cv_verifications (
     token TEXT NOT NULL UNIQUE,
     is_used BOOLEAN DEFAULT false,
     expires_at TIMESTAMP NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    email_status VARCHAR(20),
+    email_attempts INTEGER NOT NULL DEFAULT 0,
+    email_error TEXT,
+    email_sent_at TIMESTAMP
 );
 
 -- Create indexes for faster queries
 CREATE INDEX idx_posts_user_id ON posts(user_id);
+CREATE INDEX idx_posts_created_at_id ON posts(created_at, id);
 CREATE INDEX idx_comments_post_id ON comments(post_id);
 CREATE INDEX idx_comments_user_id ON comments(user_id);
 CREATE INDEX idx_blog_likes_post_id ON blog_likes(post_id);
@@ -128,5 +193,8 @@ CREATE INDEX idx_comment_likes_user_id ON comment_likes(user_id);
 CREATE INDEX idx_cv_downloads_user_id ON cv_downloads(user_id);
 CREATE INDEX idx_visitor_stats_ip_address ON visitor_stats(ip_address);
 CREATE INDEX idx_visitor_stats_page_visited ON visitor_stats(page_visited);
+CREATE INDEX idx_visitor_stats_category_created_at ON visitor_stats(page_category, created_at);
 CREATE INDEX idx_notifications_type ON notifications(type);
-CREATE INDEX idx_notifications_created_at ON notifications(created_at); 
\ No newline at end of file
+CREATE INDEX idx_notifications_created_at ON notifications(created_at); 
+-- Partial index: only unread rows, for the unread count and mark-all-read
+CREATE INDEX idx_notifications_unread ON notifications(id) WHERE is_read = false;
@@ -0,0 +1,106 @@
+"""
+Local SMTP sink for testing mail offline: accepts every message and saves it to a directory.
+
+    python smtp_sink.py --port 1025 --dir mail_sink
+
+Then run the app with MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=False and no
+MAIL_USERNAME/MAIL_PASSWORD. Each message is written as <timestamp>-<n>.eml.
+--fail N answers the first N messages with a temporary 451 error, to exercise retries.
+"""
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """One SMTP session: enough of RFC 5321 for smtplib (no STARTTLS or AUTH)"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('utf-8'))
+
+    def handle(self):
+        self.server.count_connection()
+        self.reply('220 smtp-sink ready')
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply('250-smtp-sink')
+                self.reply('250 8BITMIME')
+            elif verb in ('HELO', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                self.reply(self.server.deliver(mail_from, rcpt_to, self.read_data()))
+                mail_from, rcpt_to = None, []
+            elif verb == 'RSET':
+                mail_from, rcpt_to = None, []
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+    def read_data(self):
+        """Read the message up to the lone '.' line, undoing dot-stuffing"""
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                return b''.join(lines)
+            lines.append(line[1:] if line.startswith(b'..') else line)
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, directory, fail=0):
+        super().__init__(address, SMTPSinkHandler)
+        self.directory = directory
+        self.fail = fail
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.received = 0
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def deliver(self, mail_from, rcpt_to, data):
+        """Save a message and return the SMTP reply"""
+        with self._lock:
+            if self.fail > 0:
+                self.fail -= 1
+                return '451 Temporary failure (smtp-sink --fail)'
+            self.received += 1
+            number = self.received
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{number}.eml")
+        with open(path, 'wb') as f:
+            f.write(data)
+        print(f"Received message {number} from {mail_from} to {', '.join(rcpt_to)} -> {path}")
+        return '250 OK'
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local SMTP sink that saves messages to a directory')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--dir', default='mail_sink')
+    parser.add_argument('--fail', type=int, default=0, help='answer the first N messages with a 451 error')
+    args = parser.parse_args()
+
+    with SMTPSink((args.host, args.port), args.dir, fail=args.fail) as server:
+        print(f"SMTP sink listening on {args.host}:{args.port}, saving to {args.dir}/")
+        server.serve_forever()
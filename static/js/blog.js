@@ -76,6 +76,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 if (data.error === 'Already liked') {
                     // If already liked but UI doesn't show it, update UI
                     if (!liked) toggleLikeUI(button, true);
+                } else if (data.error === 'Like not found') {
+                    // Already unliked (e.g. in another tab), so show it as not liked
+                    if (liked) toggleLikeUI(button, false);
                 }
             }
         })
@@ -0,0 +1,322 @@
+"""
+WSGI middleware that serves static/ in front of Flask, with precompressed variants
+"""
+import gzip
+import mimetypes
+import os
+import stat
+import threading
+import zlib
+from datetime import datetime, timezone
+
+from werkzeug.http import http_date, is_resource_modified, parse_accept_header, parse_range_header
+from werkzeug.security import safe_join
+from werkzeug.utils import get_content_type
+
+try:
+    import brotli
+except ImportError:
+    # Without the Brotli package only gzip variants are made; prebuilt .br files are still served
+    brotli = None
+
+# Content-codings in order of preference, and the suffix of a file's precompressed copy
+ENCODINGS = ['br', 'gzip']
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+COMPRESSIBLE_TYPES = {
+    'application/javascript', 'application/json', 'application/manifest+json',
+    'application/xml', 'image/svg+xml', 'image/x-icon'
+}
+# Below this, compression saves less than the extra header costs
+MIN_COMPRESS_SIZE = 1024
+
+BLOCK_SIZE = 64 * 1024
+
+def is_compressible(mimetype):
+    return mimetype is not None and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+def compress(data, encoding, best=True):
+    """
+    Compress data with a content-coding. best=True is for build time; requests that
+    compress a file on first use get a faster level.
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=11 if best else 5)
+    return None
+
+def write_precompressed(path):
+    """
+    Write path.gz (and path.br with Brotli installed) next to a compressible file,
+    when they come out smaller. Returns the paths written.
+    """
+    if not is_compressible(mimetypes.guess_type(path)[0]):
+        return []
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    written = []
+    for encoding in ENCODINGS:
+        compressed = compress(data, encoding)
+        if compressed is not None and len(compressed) < len(data):
+            with open(path + ENCODING_SUFFIXES[encoding], 'wb') as f:
+                f.write(compressed)
+            written.append(path + ENCODING_SUFFIXES[encoding])
+    return written
+
+class _StaticFile:
+    """A file's headers and its variants: encoding (None for identity) -> (bytes or None, path or None, size)"""
+
+    def __init__(self, path, st):
+        self.path = path
+        self.mtime = st.st_mtime
+        self.size = st.st_size
+        self.last_modified = datetime.fromtimestamp(int(st.st_mtime), timezone.utc)
+        mimetype = mimetypes.guess_type(path)[0]
+        self.content_type = get_content_type(mimetype or 'application/octet-stream', 'utf-8')
+        self.compressible = is_compressible(mimetype)
+        self.etag = f"{int(st.st_mtime):x}-{st.st_size:x}-{zlib.adler32(path.encode('utf-8')):x}"
+        self.variants = {}
+
+    @property
+    def memory(self):
+        return sum(len(data) for data, _, _ in self.variants.values() if data is not None)
+
+    def drop_memory(self):
+        """Serve every variant from disk; variants that only exist in memory are dropped"""
+        self.variants = {encoding: (None, path, size) for encoding, (_, path, size) in self.variants.items() if path}
+
+class StaticFiles:
+    """
+    Wraps a WSGI app and serves GET/HEAD requests under prefix from directory
+    before Flask routing, sessions or request hooks run.
+
+    Files up to memory_max_file_size are held in memory (up to memory_limit bytes
+    per worker) along with gzip/brotli variants, which come from .gz/.br files
+    written at build time (see write_precompressed) or are compressed on first use.
+    Larger files are streamed from disk through the server's wsgi.file_wrapper, so
+    gunicorn sends them with sendfile. Identity responses support single byte Range
+    requests. Entries are reloaded when a file's mtime or size changes.
+    Anything that is not an existing file is passed through to the app.
+    """
+
+    def __init__(self, app, directory, prefix='/static/', cache_control='no-cache',
+                 immutable_prefix=None, immutable_cache_control=None,
+                 memory_max_file_size=256 * 1024, memory_limit=64 * 1024 * 1024):
+        self.app = app
+        self.directory = directory
+        self.prefix = prefix
+        self.cache_control = cache_control
+        self.immutable_prefix = immutable_prefix
+        self.immutable_cache_control = immutable_cache_control
+        self.memory_max_file_size = memory_max_file_size
+        self.memory_limit = memory_limit
+
+        self._files = {}
+        self._lock = threading.Lock()
+
+        # Counters exposed through stats()
+        self.memory_used = 0
+        self.served = 0
+        self.not_modified = 0
+        self.partial = 0
+        self.encodings = {'identity': 0, **{encoding: 0 for encoding in ENCODINGS}}
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix) or environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self.app(environ, start_response)
+        response = self.respond(environ, path[len(self.prefix):])
+        if response is None:
+            return self.app(environ, start_response)
+        status, headers, body = response
+        start_response(status, headers)
+        return body
+
+    def respond(self, environ, relative):
+        """
+        Build the response for a file under the directory as (status, headers, body),
+        or None if there is no such file. Also usable from a view that serves a file
+        after doing its own work (wrap it in a direct_passthrough Response so a
+        wsgi.file_wrapper body still reaches the server).
+        """
+        entry = self._lookup(relative)
+        if entry is None:
+            return None
+        try:
+            return self._serve(environ, relative, entry)
+        except OSError as e:
+            # Removed or unreadable since it was looked up
+            print(f"Error serving static file {relative}: {e}")
+            return None
+
+    def stats(self):
+        """Get served/304/206 counters, responses per encoding and memory use"""
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'memory_bytes': self.memory_used,
+                'served': self.served,
+                'not_modified': self.not_modified,
+                'partial': self.partial,
+                'encodings': dict(self.encodings)
+            }
+
+    def _lookup(self, relative):
+        """The entry for a file under the directory, (re)loading it if new or changed; None if not a file"""
+        path = safe_join(self.directory, relative)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        entry = self._files.get(path)
+        if entry is None or entry.mtime != st.st_mtime or entry.size != st.st_size:
+            entry = self._load(path, st)
+        return entry
+
+    def _load(self, path, st):
+        """Read a file and its variants, then account for its memory"""
+        entry = _StaticFile(path, st)
+        small = entry.size <= self.memory_max_file_size
+        data = None
+        if small:
+            with open(path, 'rb') as f:
+                data = f.read()
+        entry.variants[None] = (data, path, entry.size)
+
+        if entry.compressible and entry.size >= MIN_COMPRESS_SIZE:
+            for encoding in ENCODINGS:
+                variant_path = path + ENCODING_SUFFIXES[encoding]
+                try:
+                    variant_st = os.stat(variant_path)
+                except OSError:
+                    variant_st = None
+                if variant_st is not None and variant_st.st_mtime >= st.st_mtime:
+                    variant_data = None
+                    if variant_st.st_size <= self.memory_max_file_size:
+                        with open(variant_path, 'rb') as f:
+                            variant_data = f.read()
+                    entry.variants[encoding] = (variant_data, variant_path, variant_st.st_size)
+                elif data is not None:
+                    compressed = compress(data, encoding, best=False)
+                    if compressed is not None and len(compressed) < len(data):
+                        entry.variants[encoding] = (compressed, None, len(compressed))
+
+        with self._lock:
+            old = self._files.get(path)
+            if old is not None:
+                self.memory_used -= old.memory
+            if self.memory_used + entry.memory > self.memory_limit:
+                entry.drop_memory()
+            self.memory_used += entry.memory
+            self._files[path] = entry
+        return entry
+
+    def _choose_encoding(self, environ, entry):
+        """The most preferred variant the client accepts, or None for identity"""
+        if len(entry.variants) == 1:
+            return None
+        accept = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        best, best_quality = None, 0
+        for encoding in ENCODINGS:
+            if encoding in entry.variants:
+                quality = accept.quality(encoding)
+                if quality > best_quality:
+                    best, best_quality = encoding, quality
+        return best
+
+    def _byte_range(self, environ, etag, entry):
+        """
+        (start, stop) of a satisfiable single Range, 'unsatisfiable', or None to send the whole file.
+        Multiple ranges, and ranges whose If-Range no longer matches, get the whole file.
+        """
+        header = environ.get('HTTP_RANGE')
+        if not header:
+            return None
+        if_range = environ.get('HTTP_IF_RANGE')
+        if if_range and if_range not in (f'"{etag}"', http_date(entry.last_modified)):
+            return None
+        byte_range = parse_range_header(header)
+        if byte_range is None:
+            return None
+        bounds = byte_range.range_for_length(entry.size)
+        if bounds is None:
+            return 'unsatisfiable' if len(byte_range.ranges) == 1 else None
+        return bounds
+
+    def _serve(self, environ, relative, entry):
+        encoding = self._choose_encoding(environ, entry)
+        data, path, size = entry.variants[encoding]
+        etag = entry.etag if encoding is None else f"{entry.etag}-{encoding}"
+
+        if self.immutable_prefix and relative.startswith(self.immutable_prefix):
+            cache_control = self.immutable_cache_control
+        else:
+            cache_control = self.cache_control
+        headers = [('ETag', f'"{etag}"'), ('Last-Modified', http_date(entry.last_modified)),
+                   ('Cache-Control', cache_control)]
+        if len(entry.variants) > 1:
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        if not is_resource_modified(environ, etag, last_modified=entry.last_modified):
+            with self._lock:
+                self.not_modified += 1
+            return '304 Not Modified', headers, []
+
+        headers.append(('Content-Type', entry.content_type))
+        if encoding is None:
+            headers.append(('Accept-Ranges', 'bytes'))
+        else:
+            headers.append(('Content-Encoding', encoding))
+
+        status = '200 OK'
+        start, stop = 0, size
+        if encoding is None:
+            bounds = self._byte_range(environ, etag, entry)
+            if bounds == 'unsatisfiable':
+                return '416 Range Not Satisfiable', headers + [
+                    ('Content-Range', f"bytes */{size}"), ('Content-Length', '0')
+                ], []
+            if bounds is not None:
+                start, stop = bounds
+                status = '206 Partial Content'
+                headers.append(('Content-Range', f"bytes {start}-{stop - 1}/{size}"))
+        headers.append(('Content-Length', str(stop - start)))
+
+        f = None
+        if data is None and environ['REQUEST_METHOD'] != 'HEAD':
+            f = open(path, 'rb')
+        with self._lock:
+            self.served += 1
+            self.encodings[encoding or 'identity'] += 1
+            if status != '200 OK':
+                self.partial += 1
+
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return status, headers, []
+        if data is not None:
+            return status, headers, [data if stop - start == len(data) else data[start:stop]]
+        if start:
+            f.seek(start)
+        if stop == size and 'wsgi.file_wrapper' in environ:
+            # Runs to the end of the file, so the server can sendfile it
+            return status, headers, environ['wsgi.file_wrapper'](f, BLOCK_SIZE)
+        return status, headers, _read_file(f, stop - start)
+
+def _read_file(f, length):
+    """Yield length bytes from f's current position, then close it"""
+    try:
+        while length > 0:
+            chunk = f.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
@@ -0,0 +1,137 @@
+"""
+Write-behind buffer for moving non-critical database writes off the request path
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+class WriteBuffer:
+    """
+    Bounded in-process queue drained by a background thread.
+    Items are handed to flush_func in batches once batch_size items are queued
+    or flush_interval seconds have passed. When the queue is full new items are
+    dropped and counted instead of blocking the caller. A batch counts as failed
+    when flush_func raises or returns False.
+    """
+
+    def __init__(self, name, flush_func, max_size=10000, batch_size=100, flush_interval=2.0):
+        self.name = name
+        self.flush_func = flush_func
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+
+        # Counters exposed through stats()
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def put(self, item):
+        """Queue an item for writing. Returns False if the buffer was full and the item was dropped"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.queued += 1
+        return True
+
+    def flush(self):
+        """Write everything currently queued, in the calling thread"""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self, timeout=None):
+        """Stop the background thread and write whatever is still queued"""
+        self._stopping.set()
+        thread = self._thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout if timeout is not None else self.flush_interval + 5)
+        self.flush()
+
+    def stats(self):
+        """Get buffer counters"""
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'queued': self.queued,
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+                'batches': self.batches
+            }
+
+    def _ensure_started(self):
+        """Start the flusher thread lazily, once per process (gunicorn forks workers after import)"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked child: the parent's queue and thread are not usable here
+                self._queue = queue.Queue(maxsize=self.max_size)
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-flusher", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+
+    def _run(self):
+        """Background loop: collect a batch by size or time, then write it"""
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _collect(self):
+        """Wait for up to batch_size items or until flush_interval has passed"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.5)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _write(self, batch):
+        """Hand a batch to flush_func, never letting an error kill the thread"""
+        try:
+            ok = self.flush_func(batch) is not False
+        except Exception as e:
+            print(f"Error flushing {self.name} buffer ({len(batch)} items): {e}")
+            ok = False
+        with self._lock:
+            if ok:
+                self.written += len(batch)
+                self.batches += 1
+            else:
+                self.failed += len(batch)